@@ -1,18 +1,73 @@
+import operator
+import os
+import sqlite3
+import threading
+import time
 import streamlit as st
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 from database import BudgetDatabase
 
+RULE_OPERATORS = {
+    '>=': operator.ge,
+    '>': operator.gt,
+    '<=': operator.le,
+    '<': operator.lt,
+    '==': operator.eq
+}
+
+class AchievementMetrics(dict):
+    """Metric values for one evaluation, each computed on first lookup"""
+    
+    def __init__(self, system, transactions_df, today=None):
+        super().__init__()
+        self.system = system
+        self.transactions = transactions_df if transactions_df is not None else pd.DataFrame(
+            columns=['date', 'description', 'amount', 'category', 'type'])
+        self.today = pd.Timestamp(today or datetime.now()).normalize()
+    
+    def __missing__(self, name):
+        value = self[name] = getattr(self.system, f"metric_{name}")(self)
+        return value
+
 class AchievementSystem:
-    def __init__(self, db):
+    """Achievement catalog and the rules that award it.
+    
+    Every achievement with a "rule" names the metric it needs and the threshold
+    it must reach, e.g. ("streak", ">=", 7), or a list of such conditions that
+    must all hold. Metrics are metric_<name> methods; adding an achievement on an
+    existing metric costs no extra pass over the transactions.
+    """
+    
+    LEVELS = [
+        (0, "🌱 Beginner", "Just getting started!"),
+        (100, "🚀 Rising Star", "Making great progress!"),
+        (300, "💪 Money Manager", "You know what you're doing!"),
+        (600, "🧠 Financial Guru", "Impressive financial discipline!"),
+        (1000, "👑 Budget Master", "You've mastered personal finance!"),
+        (1500, "🏆 Legend", "Absolutely incredible achievement!")
+    ]
+    
+    # Earned achievements and points per (database file, user), shared by every
+    # AchievementSystem in the process and updated in place by award_achievement
+    _earned_cache = {}
+    _earned_cache_lock = threading.Lock()
+    
+    # Seconds before a cached entry is read again, so awards made by other worker processes show up
+    MAX_AGE = 60.0
+    
+    def __init__(self, db, user_id=None):
         self.db = db
+        self.user_id = user_id
         self.init_achievements_table()
         self.achievements_catalog = self.define_achievements()
+        self.rules = {aid: self.compile_rule(achievement['rule'])
+                      for aid, achievement in self.achievements_catalog.items() if 'rule' in achievement}
     
     def init_achievements_table(self):
         """Initialize achievements table in database"""
-        import sqlite3
-        conn = sqlite3.connect(self.db.db_path)
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -24,6 +79,28 @@ class AchievementSystem:
             )
         ''')
         
+        try:
+            # Owner of the achievement (NULL for the shared, single-user achievements)
+            cursor.execute('ALTER TABLE user_achievements ADD COLUMN user_id INTEGER')
+        except sqlite3.OperationalError:
+            # Column already exists
+            pass
+        
+        if cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_user_achievements_unique'"
+        ).fetchone() is None:
+            # Drop duplicate awards left by earlier racing inserts before enforcing one row per award
+            cursor.execute('''
+                DELETE FROM user_achievements WHERE id NOT IN (
+                    SELECT MIN(id) FROM user_achievements GROUP BY COALESCE(user_id, -1), achievement_id
+                )
+            ''')
+            # Expression index so the shared (NULL user_id) awards are unique too
+            cursor.execute('''
+                CREATE UNIQUE INDEX idx_user_achievements_unique
+                ON user_achievements (COALESCE(user_id, -1), achievement_id)
+            ''')
+        
         conn.commit()
         conn.close()
     
@@ -36,21 +113,24 @@ class AchievementSystem:
                 "description": "Add your first transaction",
                 "emoji": "🌱",
                 "category": "First Steps",
-                "points": 10
+                "points": 10,
+                "rule": ("transaction_count", ">=", 1)
             },
             "first_week": {
                 "name": "Week Warrior",
                 "description": "Track expenses for 7 days",
                 "emoji": "📅",
                 "category": "Consistency",
-                "points": 25
+                "points": 25,
+                "rule": ("tracked_days", ">=", 7)
             },
             "first_month": {
                 "name": "Monthly Master",
                 "description": "Track expenses for 30 days",
                 "emoji": "📆",
                 "category": "Consistency",
-                "points": 100
+                "points": 100,
+                "rule": ("tracked_days", ">=", 30)
             },
             
             # Savings Achievements
@@ -59,21 +139,24 @@ class AchievementSystem:
                 "description": "Save your first $100",
                 "emoji": "💯",
                 "category": "Savings",
-                "points": 50
+                "points": 50,
+                "rule": ("total_savings", ">=", 100)
             },
             "first_1000": {
                 "name": "Thousand Club",
                 "description": "Save $1,000",
                 "emoji": "🥇",
                 "category": "Savings",
-                "points": 200
+                "points": 200,
+                "rule": ("total_savings", ">=", 1000)
             },
             "emergency_fund": {
                 "name": "Safety Net",
                 "description": "Build 3-month emergency fund",
                 "emoji": "🛡️",
                 "category": "Savings",
-                "points": 500
+                "points": 500,
+                "rule": ("emergency_fund_months", ">=", 3)
             },
             
             # Budgeting Achievements
@@ -82,14 +165,16 @@ class AchievementSystem:
                 "description": "Stay under budget for 1 month",
                 "emoji": "🎯",
                 "category": "Budgeting",
-                "points": 75
+                "points": 75,
+                "rule": ("months_under_budget", ">=", 1)
             },
             "fifty_thirty_twenty": {
                 "name": "Rule Master",
                 "description": "Follow 50/30/20 rule perfectly",
                 "emoji": "⚖️",
                 "category": "Budgeting",
-                "points": 150
+                "points": 150,
+                "rule": ("fifty_thirty_twenty_months", ">=", 1)
             },
             
             # Transaction Achievements
@@ -98,14 +183,16 @@ class AchievementSystem:
                 "description": "Log 50 transactions",
                 "emoji": "🕵️",
                 "category": "Activity",
-                "points": 75
+                "points": 75,
+                "rule": ("transaction_count", ">=", 50)
             },
             "transaction_100": {
                 "name": "Tracking Titan",
                 "description": "Log 100 transactions",
                 "emoji": "📊",
                 "category": "Activity",
-                "points": 150
+                "points": 150,
+                "rule": ("transaction_count", ">=", 100)
             },
             
             # Special Achievements
@@ -114,165 +201,267 @@ class AchievementSystem:
                 "description": "Reduce coffee spending by 50%",
                 "emoji": "☕",
                 "category": "Mindful Spending",
-                "points": 100
+                "points": 100,
+                "rule": ("coffee_reduction", ">=", 0.5)
             },
             "goal_crusher": {
                 "name": "Goal Crusher",
                 "description": "Complete your first savings goal",
                 "emoji": "🎯",
                 "category": "Goals",
-                "points": 200
+                "points": 200,
+                "rule": ("completed_goals", ">=", 1)
             },
             "streak_7": {
                 "name": "Weekly Warrior",
                 "description": "7-day transaction streak",
                 "emoji": "🔥",
                 "category": "Consistency",
-                "points": 50
+                "points": 50,
+                "rule": ("streak", ">=", 7)
             },
             "streak_30": {
                 "name": "Monthly Legend",
                 "description": "30-day transaction streak",
                 "emoji": "🌟",
                 "category": "Consistency",
-                "points": 300
+                "points": 300,
+                "rule": ("streak", ">=", 30)
             }
         }
     
-    def check_and_award_achievements(self, transactions_df):
-        """Check for new achievements and award them"""
-        new_achievements = []
-        earned_achievements = self.get_earned_achievements()
-        
-        # First transaction
-        if "first_transaction" not in earned_achievements and not transactions_df.empty:
-            self.award_achievement("first_transaction")
-            new_achievements.append("first_transaction")
+    @staticmethod
+    def compile_rule(rule):
+        """Turn (metric, operator, value) or a list of them into a predicate over a metrics mapping"""
+        conditions = [rule] if isinstance(rule[0], str) else list(rule)
+        compiled = [(metric, RULE_OPERATORS[op], value) for metric, op, value in conditions]
         
-        # Transaction count achievements
-        total_transactions = len(transactions_df)
-        if "transaction_50" not in earned_achievements and total_transactions >= 50:
-            self.award_achievement("transaction_50")
-            new_achievements.append("transaction_50")
+        def predicate(metrics):
+            return all(compare(metrics[metric], value) for metric, compare, value in compiled)
         
-        if "transaction_100" not in earned_achievements and total_transactions >= 100:
-            self.award_achievement("transaction_100")
-            new_achievements.append("transaction_100")
-        
-        # Consistency achievements
-        if not transactions_df.empty:
-            streak = self.calculate_streak(transactions_df)
-            if "streak_7" not in earned_achievements and streak >= 7:
-                self.award_achievement("streak_7")
-                new_achievements.append("streak_7")
-            
-            if "streak_30" not in earned_achievements and streak >= 30:
-                self.award_achievement("streak_30")
-                new_achievements.append("streak_30")
-        
-        # Savings achievements
-        self.check_savings_achievements(transactions_df, earned_achievements, new_achievements)
-        
-        return new_achievements
+        predicate.metrics = tuple(metric for metric, _, _ in compiled)
+        return predicate
     
-    def check_savings_achievements(self, transactions_df, earned_achievements, new_achievements):
-        """Check savings-related achievements"""
-        if transactions_df.empty:
-            return
-        
-        # Calculate total savings
-        total_income = transactions_df[transactions_df['type'] == 'income']['amount'].sum()
-        total_expenses = transactions_df[transactions_df['type'] == 'expense']['amount'].sum()
-        total_savings = total_income - total_expenses
+    def evaluate(self, transactions_df, earned=(), today=None):
+        """Achievements whose rules now pass, leaving out those already earned.
         
-        # Savings milestones
-        if "first_100" not in earned_achievements and total_savings >= 100:
-            self.award_achievement("first_100")
-            new_achievements.append("first_100")
-        
-        if "first_1000" not in earned_achievements and total_savings >= 1000:
-            self.award_achievement("first_1000")
-            new_achievements.append("first_1000")
-        
-        # Emergency fund (3 months of expenses)
-        monthly_expenses = self.calculate_monthly_expenses(transactions_df)
-        if "emergency_fund" not in earned_achievements and total_savings >= (monthly_expenses * 3):
-            self.award_achievement("emergency_fund")
-            new_achievements.append("emergency_fund")
+        Metrics are computed on first use and shared by every rule that needs them,
+        so a metric only earned achievements depend on is never computed.
+        """
+        metrics = AchievementMetrics(self, transactions_df, today)
+        return [aid for aid, rule in self.rules.items() if aid not in earned and rule(metrics)]
+    
+    def check_and_award_achievements(self, transactions_df):
+        """Check for new achievements and award them"""
+        new_achievements = self.evaluate(transactions_df, self.earned_state()['earned'])
+        return self.award_achievements(new_achievements) if new_achievements else []
+    
+    # Metrics, looked up by name as metric_<name>(metrics)
+    
+    def metric_dates(self, metrics):
+        return pd.to_datetime(metrics.transactions['date'], format='mixed').dt.normalize()
+    
+    def metric_months(self, metrics):
+        return metrics['dates'].dt.to_period('M')
+    
+    def metric_transaction_count(self, metrics):
+        return len(metrics.transactions)
+    
+    def metric_tracked_days(self, metrics):
+        """Days from the first transaction to the latest, inclusive"""
+        dates = metrics['dates']
+        return (dates.max() - dates.min()).days + 1 if len(dates) else 0
+    
+    def metric_streak(self, metrics):
+        """Consecutive days with a transaction, counting back from today"""
+        offsets = np.unique((metrics.today - metrics['dates']).dt.days)
+        offsets = offsets[offsets >= 0]
+        gaps = np.flatnonzero(offsets != np.arange(len(offsets)))
+        return int(gaps[0]) if len(gaps) else len(offsets)
+    
+    def metric_current_month(self, metrics):
+        """The month still in progress, left out of the per-month rules"""
+        return metrics.today.to_period('M')
+    
+    def metric_monthly_totals(self, metrics):
+        """Income and expense per month, the basis of the budgeting metrics"""
+        df = metrics.transactions
+        totals = df.groupby([metrics['months'], df['type']])['amount'].sum().unstack(fill_value=0.0)
+        return totals.reindex(columns=['income', 'expense'], fill_value=0.0)
+    
+    def metric_total_savings(self, metrics):
+        totals = metrics['monthly_totals']
+        return totals['income'].sum() - totals['expense'].sum()
+    
+    def metric_emergency_fund_months(self, metrics):
+        """Savings as a multiple of average monthly expenses"""
+        expenses = metrics['monthly_totals']['expense']
+        monthly_expenses = expenses[expenses > 0].mean() if (expenses > 0).any() else 0
+        if monthly_expenses > 0:
+            return metrics['total_savings'] / monthly_expenses
+        return float('inf') if metrics['total_savings'] > 0 else 0
+    
+    def metric_category_spend(self, metrics):
+        """Expense per month (rows) and category (columns)"""
+        df = metrics.transactions
+        expenses = df['type'] == 'expense'
+        return df[expenses].groupby([metrics['months'][expenses], df.loc[expenses, 'category']])['amount'] \
+            .sum().unstack(fill_value=0.0)
+    
+    def metric_months_under_budget(self, metrics):
+        """Completed months in which every category with a budget target stayed within it"""
+        targets = self.db.get_budget_targets()
+        spend = metrics['category_spend']
+        spend = spend[spend.index < metrics['current_month']]
+        if targets.empty or spend.empty:
+            return 0
+        targets = targets.groupby('category')['monthly_target'].last()
+        spend = spend.reindex(columns=targets.index, fill_value=0.0)
+        return int((spend <= targets).all(axis=1).sum())
+    
+    def metric_fifty_thirty_twenty_months(self, metrics):
+        """Completed months with needs at most 50%, wants at most 30% and savings at least 20% of income"""
+        spend = metrics['category_spend']
+        spend = spend[spend.index < metrics['current_month']]
+        if spend.empty:
+            return 0
+        buckets = pd.Series(self.db.categories.buckets())
+        by_bucket = spend.T.groupby(buckets.reindex(spend.columns).fillna('other')).sum().T
+        income = metrics['monthly_totals']['income'].reindex(by_bucket.index, fill_value=0.0)
+        needs = by_bucket.get('needs', 0.0)
+        wants = by_bucket.get('wants', 0.0)
+        savings = income - by_bucket.sum(axis=1)
+        return int(((income > 0) & (needs <= 0.5 * income) & (wants <= 0.3 * income)
+                    & (savings >= 0.2 * income)).sum())
+    
+    def metric_coffee_reduction(self, metrics):
+        """Drop in coffee spending from the month before the latest completed month to that month"""
+        df = metrics.transactions
+        coffee = (df['type'] == 'expense') & df['description'].str.contains('coffee', case=False, na=False)
+        months = metrics['months']
+        completed = months[months < metrics['current_month']]
+        if not coffee.any() or completed.nunique() < 2:
+            return 0.0
+        monthly = df.loc[coffee, 'amount'].groupby(months[coffee]).sum()
+        latest = completed.max()
+        previous = monthly.get(latest - 1, 0.0)
+        return 1 - monthly.get(latest, 0.0) / previous if previous > 0 else 0.0
+    
+    def metric_completed_goals(self, metrics):
+        conn = self.db.connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM savings_goals WHERE is_completed").fetchone()[0]
+        except sqlite3.OperationalError:
+            # Goals table not created yet
+            return 0
+        finally:
+            conn.close()
     
     def calculate_streak(self, transactions_df):
         """Calculate current transaction streak"""
-        if transactions_df.empty:
-            return 0
-        
-        # Convert dates and sort
-        transactions_df['date'] = pd.to_datetime(transactions_df['date'])
-        transactions_df = transactions_df.sort_values('date', ascending=False)
-        
-        # Get unique dates
-        unique_dates = transactions_df['date'].dt.date.unique()
-        
-        # Calculate streak from today backwards
-        today = datetime.now().date()
-        streak = 0
-        
-        for i in range(len(unique_dates)):
-            expected_date = today - timedelta(days=i)
-            if expected_date in unique_dates:
-                streak += 1
-            else:
-                break
-        
-        return streak
+        return AchievementMetrics(self, transactions_df)['streak']
     
     def calculate_monthly_expenses(self, transactions_df):
         """Calculate average monthly expenses"""
-        if transactions_df.empty:
-            return 0
-        
-        expenses = transactions_df[transactions_df['type'] == 'expense']
-        if expenses.empty:
-            return 0
-        
-        # Group by month and calculate average
-        expenses['date'] = pd.to_datetime(expenses['date'])
-        monthly_expenses = expenses.groupby(expenses['date'].dt.to_period('M'))['amount'].sum()
-        
-        return monthly_expenses.mean() if not monthly_expenses.empty else 0
+        expenses = AchievementMetrics(self, transactions_df)['monthly_totals']['expense']
+        return expenses[expenses > 0].mean() if (expenses > 0).any() else 0
     
     def award_achievement(self, achievement_id):
-        """Award an achievement to the user"""
-        import sqlite3
-        conn = sqlite3.connect(self.db.db_path)
+        """Award an achievement to the user, returning False if it was already earned"""
+        return bool(self.award_achievements([achievement_id]))
+    
+    def award_achievements(self, achievement_ids):
+        """Award achievements in one transaction and return the ones that were new.
+        
+        The unique index makes each insert a no-op when the award already exists,
+        so concurrent checks for the same user never record it twice.
+        """
+        conn = self.db.connect()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            INSERT INTO user_achievements (achievement_id)
-            VALUES (?)
-        ''', (achievement_id,))
+        awarded = []
+        for achievement_id in dict.fromkeys(achievement_ids):
+            row = cursor.execute('''
+                INSERT INTO user_achievements (achievement_id, user_id)
+                VALUES (?, ?)
+                ON CONFLICT DO NOTHING
+                RETURNING achievement_id
+            ''', (achievement_id, self.user_id)).fetchone()
+            if row is not None:
+                awarded.append(achievement_id)
+        if awarded:
+            self.db.bump_data_version(cursor)
         
         conn.commit()
         conn.close()
-    
-    def get_earned_achievements(self):
-        """Get list of earned achievement IDs"""
-        import sqlite3
-        conn = sqlite3.connect(self.db.db_path)
         
+        # The cached entry, if any, takes the awards without a reload; ones another
+        # session recorded first are earned as well
+        with self._earned_cache_lock:
+            entry = self._earned_cache.get(self._cache_key())
+            if entry is not None:
+                for achievement_id in achievement_ids:
+                    if achievement_id not in entry['earned']:
+                        entry['earned'][achievement_id] = None
+                        entry['points'] += self.points_for(achievement_id)
+        return awarded
+    
+    def points_for(self, achievement_id):
+        achievement = self.achievements_catalog.get(achievement_id)
+        return achievement['points'] if achievement else 0
+    
+    def _cache_key(self):
+        return os.path.abspath(self.db.db_path), self.user_id
+    
+    def _load_earned(self):
+        conn = self.db.connect()
         try:
-            df = pd.read_sql_query("SELECT achievement_id FROM user_achievements", conn)
-            return df['achievement_id'].tolist()
-        except:
-            return []
+            rows = conn.execute(
+                "SELECT achievement_id FROM user_achievements WHERE user_id IS ? ORDER BY id", (self.user_id,)
+            ).fetchall()
+        except sqlite3.OperationalError:
+            rows = []
         finally:
             conn.close()
+        earned = dict.fromkeys(achievement_id for achievement_id, in rows)
+        return {'earned': earned, 'points': sum(map(self.points_for, earned)), 'loaded_at': time.monotonic()}
+    
+    def earned_state(self, refresh=False):
+        """Cached {'earned': {id: None}, 'points': total} of this user, loaded on first use"""
+        key = self._cache_key()
+        entry = self._earned_cache.get(key)
+        if refresh or entry is None or time.monotonic() - entry['loaded_at'] >= self.MAX_AGE:
+            entry = self._load_earned()
+            with self._earned_cache_lock:
+                self._earned_cache[key] = entry
+        return entry
+    
+    def reload(self):
+        """Read this user's achievements from the database again"""
+        return self.earned_state(refresh=True)
+    
+    @classmethod
+    def invalidate_path(cls, db_path):
+        """Forget cached achievements of a database file (e.g. after a restore)"""
+        path = os.path.abspath(db_path)
+        with cls._earned_cache_lock:
+            for key in [key for key in cls._earned_cache if key[0] == path]:
+                del cls._earned_cache[key]
+    
+    def get_earned_achievements(self):
+        """Get list of earned achievement IDs"""
+        return list(self.earned_state()['earned'])
+    
+    def get_total_points(self):
+        return self.earned_state()['points']
     
     def display_achievements(self):
         """Display achievement dashboard"""
         st.subheader("🏆 Your Achievements")
         
-        earned_achievements = self.get_earned_achievements()
-        total_points = sum(self.achievements_catalog[aid]['points'] for aid in earned_achievements)
+        state = self.earned_state()
+        earned_achievements = state['earned']
+        total_points = state['points']
         
         # Stats
         col1, col2, col3, col4 = st.columns(4)
@@ -342,22 +531,13 @@ class AchievementSystem:
     
     def get_user_level(self):
         """Calculate user level based on points"""
-        earned_achievements = self.get_earned_achievements()
-        total_points = sum(self.achievements_catalog[aid]['points'] for aid in earned_achievements)
-        
-        # Define levels
-        levels = [
-            (0, "🌱 Beginner", "Just getting started!"),
-            (100, "🚀 Rising Star", "Making great progress!"),
-            (300, "💪 Money Manager", "You know what you're doing!"),
-            (600, "🧠 Financial Guru", "Impressive financial discipline!"),
-            (1000, "👑 Budget Master", "You've mastered personal finance!"),
-            (1500, "🏆 Legend", "Absolutely incredible achievement!")
-        ]
-        
-        current_level = levels[0]
-        for points_required, title, description in levels:
-            if total_points >= points_required:
-                current_level = (points_required, title, description)
-        
-        return current_level, total_points 
\ No newline at end of file
+        total_points = self.get_total_points()
+        return self.level_for(total_points), total_points
+    
+    @classmethod
+    def level_for(cls, total_points):
+        current_level = cls.LEVELS[0]
+        for level in cls.LEVELS:
+            if total_points >= level[0]:
+                current_level = level
+        return current_level
@@ -0,0 +1,270 @@
+from datetime import datetime, timedelta, timezone
+
+def _bump(name, delta=1):
+    return f'''
+        INSERT INTO admin_counters (name, value) VALUES ({name}, {delta})
+        ON CONFLICT (name) DO UPDATE SET value = value + {delta};'''
+
+def _record_activity(user_id, timestamp):
+    # One row per user and day, week and month; admin_activity_insert counts new ones
+    return f'''
+        INSERT OR IGNORE INTO user_activity (period, user_id)
+        SELECT period, {user_id} FROM (
+            SELECT 'D:' || date({timestamp}) AS period
+            UNION ALL SELECT 'W:' || strftime('%Y-W%W', {timestamp})
+            UNION ALL SELECT 'M:' || strftime('%Y-%m', {timestamp})
+        ) WHERE {timestamp} IS NOT NULL;'''
+
+def _pages_bucket(pages):
+    return f'''(CASE WHEN {pages} IS NULL OR {pages} <= 0 THEN '0' WHEN {pages} = 1 THEN '1'
+                WHEN {pages} < 5 THEN '2-4' WHEN {pages} < 10 THEN '5-9'
+                WHEN {pages} < 20 THEN '10-19' ELSE '20+' END)'''
+
+class AdminMetrics:
+    """Admin statistics served from counters that triggers keep up to date.
+    
+    Every insert, login and page view adjusts a few rows in admin_counters from
+    within the writing transaction, so reading a statistic is a primary key
+    lookup no matter how many users or sessions there are. Daily, weekly and
+    monthly active users are counted once per user and period by way of the
+    user_activity table. Rolling windows count users by their last active day, kept
+    in user_last_active. Periods use SQLite's UTC timestamps.
+    """
+    
+    PERIOD_PREFIX = {'day': 'D', 'week': 'W', 'month': 'M'}
+    
+    PAGE_BUCKETS = ['0', '1', '2-4', '5-9', '10-19', '20+']
+    
+    TRIGGERS = {
+        'admin_users_insert': f'''
+            AFTER INSERT ON users BEGIN
+                {_bump("'users'")}
+                {_bump("'new_users:' || date(COALESCE(NEW.created_at, CURRENT_TIMESTAMP))")}
+                {_record_activity('NEW.id', 'NEW.last_login')}
+            END''',
+        'admin_users_delete': f'''
+            AFTER DELETE ON users BEGIN
+                {_bump("'users'", -1)}
+            END''',
+        'admin_users_login': f'''
+            AFTER UPDATE OF last_login ON users WHEN NEW.last_login IS NOT NULL BEGIN
+                {_record_activity('NEW.id', 'NEW.last_login')}
+            END''',
+        'admin_sessions_insert': f'''
+            AFTER INSERT ON user_sessions BEGIN
+                {_bump("'sessions'")}
+                {_bump("'sessions:' || date(NEW.session_start)")}
+                {_bump("'hour:' || CAST(strftime('%H', NEW.session_start) AS INTEGER)")}
+                {_bump("'pages:' || " + _pages_bucket('NEW.pages_visited'))}
+                {_record_activity('NEW.user_id', 'NEW.session_start')}
+            END''',
+        'admin_sessions_pages': f'''
+            AFTER UPDATE OF pages_visited ON user_sessions
+            WHEN {_pages_bucket('OLD.pages_visited')} != {_pages_bucket('NEW.pages_visited')} BEGIN
+                {_bump("'pages:' || " + _pages_bucket('OLD.pages_visited'), -1)}
+                {_bump("'pages:' || " + _pages_bucket('NEW.pages_visited'))}
+            END''',
+        'admin_sessions_delete': f'''
+            AFTER DELETE ON user_sessions BEGIN
+                {_bump("'sessions'", -1)}
+                {_bump("'sessions:' || date(OLD.session_start)", -1)}
+                {_bump("'hour:' || CAST(strftime('%H', OLD.session_start) AS INTEGER)", -1)}
+                {_bump("'pages:' || " + _pages_bucket('OLD.pages_visited'), -1)}
+            END''',
+        'admin_activity_insert': f'''
+            AFTER INSERT ON user_activity BEGIN
+                {_bump("'active:' || NEW.period")}
+            END''',
+        # Moves the user from the counter of their previous last active day to this day's
+        'admin_last_active': '''
+            AFTER INSERT ON user_activity WHEN NEW.period LIKE 'D:%' BEGIN
+                UPDATE admin_counters SET value = value - 1
+                WHERE name = (SELECT 'last_active:' || day FROM user_last_active
+                              WHERE user_id = NEW.user_id AND day < substr(NEW.period, 3));
+                INSERT INTO admin_counters (name, value)
+                SELECT 'last_active:' || substr(NEW.period, 3), 1
+                WHERE NOT EXISTS (SELECT 1 FROM user_last_active
+                                  WHERE user_id = NEW.user_id AND day >= substr(NEW.period, 3))
+                ON CONFLICT (name) DO UPDATE SET value = value + 1;
+                INSERT INTO user_last_active (user_id, day) VALUES (NEW.user_id, substr(NEW.period, 3))
+                ON CONFLICT (user_id) DO UPDATE SET day = excluded.day WHERE excluded.day > day;
+            END'''
+    }
+    
+    def __init__(self, db):
+        self.db = db
+    
+    @classmethod
+    def install(cls, cursor):
+        """Create the counter tables and triggers, filling the counters from existing rows once"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS admin_counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_activity (
+                period TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
+                PRIMARY KEY (period, user_id)
+            ) WITHOUT ROWID
+        ''')
+        upgrading = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_last_active'").fetchone() is None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_last_active (
+                user_id INTEGER PRIMARY KEY,
+                day TEXT NOT NULL
+            )
+        ''')
+        for name, body in cls.TRIGGERS.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {body}')
+        
+        if cursor.execute("SELECT 1 FROM admin_counters WHERE name = 'users'").fetchone() is None:
+            cls.backfill(cursor)
+        elif upgrading:
+            # Counters from before user_last_active existed; take last days from the activity
+            cursor.execute('''
+                INSERT INTO user_last_active (user_id, day)
+                SELECT user_id, MAX(substr(period, 3)) FROM user_activity WHERE period LIKE 'D:%' GROUP BY user_id
+            ''')
+            cursor.execute("INSERT INTO admin_counters SELECT 'last_active:' || day, COUNT(*) FROM user_last_active GROUP BY day")
+    
+    @staticmethod
+    def backfill(cursor):
+        """Recompute every counter from the users and user_sessions tables.
+        
+        Activity is rebuilt from the sessions and logins still on record, so users of
+        sessions deleted since drop out of the active counts for those periods.
+        """
+        cursor.execute('DELETE FROM admin_counters')
+        cursor.execute('DELETE FROM user_activity')
+        cursor.execute('DELETE FROM user_last_active')
+        cursor.execute("INSERT INTO admin_counters SELECT 'users', COUNT(*) FROM users")
+        cursor.execute("INSERT INTO admin_counters SELECT 'sessions', COUNT(*) FROM user_sessions")
+        cursor.execute('''
+            INSERT INTO admin_counters
+            SELECT 'new_users:' || date(created_at), COUNT(*) FROM users WHERE created_at IS NOT NULL GROUP BY 1
+        ''')
+        cursor.execute('''
+            INSERT INTO admin_counters
+            SELECT 'sessions:' || date(session_start), COUNT(*) FROM user_sessions
+            WHERE session_start IS NOT NULL GROUP BY 1
+        ''')
+        cursor.execute('''
+            INSERT INTO admin_counters
+            SELECT 'hour:' || CAST(strftime('%H', session_start) AS INTEGER), COUNT(*) FROM user_sessions
+            WHERE session_start IS NOT NULL GROUP BY 1
+        ''')
+        cursor.execute(f'''
+            INSERT INTO admin_counters
+            SELECT 'pages:' || {_pages_bucket('pages_visited')}, COUNT(*) FROM user_sessions GROUP BY 1
+        ''')
+        # The admin_activity_insert and admin_last_active triggers count these as they go in
+        for period, key in (('D:', "date(ts)"), ('W:', "strftime('%Y-W%W', ts)"), ('M:', "strftime('%Y-%m', ts)")):
+            cursor.execute(f'''
+                INSERT OR IGNORE INTO user_activity (period, user_id)
+                SELECT '{period}' || {key}, user_id FROM (
+                    SELECT user_id, session_start AS ts FROM user_sessions
+                    UNION ALL SELECT id, last_login FROM users
+                ) WHERE ts IS NOT NULL AND user_id IS NOT NULL
+            ''')
+    
+    def rebuild(self):
+        """Throw the counters away and recompute them (e.g. after editing tables by hand)"""
+        conn = self.db.connect()
+        self.backfill(conn.cursor())
+        conn.commit()
+        conn.close()
+    
+    # Reads
+    
+    def counters(self, names):
+        """Values of the named counters (0 for ones never incremented)"""
+        names = list(names)
+        conn = self.db.connect()
+        rows = conn.execute(
+            f"SELECT name, value FROM admin_counters WHERE name IN ({', '.join('?' * len(names))})", names
+        ).fetchall()
+        conn.close()
+        values = dict.fromkeys(names, 0)
+        values.update(rows)
+        return values
+    
+    @staticmethod
+    def period_key(period, at):
+        if period == 'day':
+            return 'D:' + at.strftime('%Y-%m-%d')
+        if period == 'week':
+            return 'W:' + at.strftime('%Y-W%W')
+        return 'M:' + at.strftime('%Y-%m')
+    
+    @staticmethod
+    def _now():
+        # Counters are keyed by SQLite's CURRENT_TIMESTAMP, which is UTC
+        return datetime.now(timezone.utc)
+    
+    def active_users(self, period='day', at=None):
+        """Distinct users active in the day, week or month containing `at` (default now)"""
+        key = 'active:' + self.period_key(period, at or self._now())
+        return self.counters([key])[key]
+    
+    def recent_active_users(self, days=30):
+        """Distinct users active in the last `days` days, today included"""
+        now = self._now()
+        names = [f"last_active:{(now - timedelta(days=offset)).strftime('%Y-%m-%d')}" for offset in range(days)]
+        return sum(self.counters(names).values())
+    
+    def activity_series(self, period='day', count=30, at=None):
+        """Active users, sessions (days only) and new users (days only) for the last `count` periods"""
+        import pandas as pd
+        at = at or self._now()
+        if period == 'day':
+            starts = [at - timedelta(days=offset) for offset in range(count)]
+        elif period == 'week':
+            starts = [at - timedelta(weeks=offset) for offset in range(count)]
+        else:
+            month = at.year * 12 + at.month - 1
+            starts = [at.replace(year=(month - offset) // 12, month=(month - offset) % 12 + 1, day=1)
+                      for offset in range(count)]
+        
+        keys = [self.period_key(period, start)[2:] for start in reversed(starts)]
+        names = [f'active:{self.PERIOD_PREFIX[period]}:{key}' for key in keys]
+        if period == 'day':
+            names += [f'sessions:{key}' for key in keys] + [f'new_users:{key}' for key in keys]
+        values = self.counters(names)
+        
+        series = pd.DataFrame({
+            'period': keys,
+            'active_users': [values[f'active:{self.PERIOD_PREFIX[period]}:{key}'] for key in keys]
+        })
+        if period == 'day':
+            series['sessions'] = [values[f'sessions:{key}'] for key in keys]
+            series['new_users'] = [values[f'new_users:{key}'] for key in keys]
+        return series
+    
+    def session_histograms(self):
+        """Sessions by UTC hour of day and by pages visited per session"""
+        names = [f'hour:{hour}' for hour in range(24)] + [f'pages:{bucket}' for bucket in self.PAGE_BUCKETS]
+        values = self.counters(names)
+        return {
+            'by_hour': [values[f'hour:{hour}'] for hour in range(24)],
+            'pages_per_session': {bucket: values[f'pages:{bucket}'] for bucket in self.PAGE_BUCKETS}
+        }
+    
+    def overview(self):
+        """Totals plus today's, this week's and this month's activity"""
+        now = self._now()
+        day = now.strftime('%Y-%m-%d')
+        names = {
+            'total_users': 'users',
+            'total_sessions': 'sessions',
+            'dau': 'active:' + self.period_key('day', now),
+            'wau': 'active:' + self.period_key('week', now),
+            'mau': 'active:' + self.period_key('month', now),
+            'sessions_today': f'sessions:{day}',
+            'new_users_today': f'new_users:{day}'
+        }
+        values = self.counters(names.values())
+        return {stat: values[name] for stat, name in names.items()}
@@ -0,0 +1,105 @@
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.fs
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+class AnalyticsQueries:
+    """Reports over the Parquet snapshot written by AnalyticsSnapshot.
+    
+    Filters are pushed down into the scan. Month ranges prune whole partitions,
+    and user and date filters skip row groups using their statistics. Files are
+    memory-mapped, and none of these reports touch the live SQLite database.
+    """
+    
+    def __init__(self, directory='analytics'):
+        if not PYARROW_AVAILABLE:
+            raise ImportError("Analytics queries need pyarrow: pip install pyarrow")
+        self.dataset_dir = Path(directory) / 'transactions'
+        self.filesystem = pyarrow.fs.LocalFileSystem(use_mmap=True)
+    
+    def dataset(self):
+        """The snapshot as a dataset, rediscovered so newly exported months show up"""
+        if not self.dataset_dir.exists():
+            raise FileNotFoundError(f"No analytics snapshot in {self.dataset_dir.parent}; run an export first")
+        partitioning = ds.partitioning(pa.schema([('month', pa.string())]), flavor='hive')
+        return ds.dataset(str(self.dataset_dir.resolve()), format='parquet', partitioning=partitioning,
+                          filesystem=self.filesystem)
+    
+    @staticmethod
+    def build_filter(start_month=None, end_month=None, user_ids=None, transaction_type=None):
+        """Dataset filter expression; month bounds are inclusive 'YYYY-MM' keys"""
+        conditions = []
+        if start_month:
+            conditions.append(ds.field('month') >= start_month)
+        if end_month:
+            conditions.append(ds.field('month') <= end_month)
+        if user_ids is not None:
+            conditions.append(ds.field('user_id').isin(list(user_ids)))
+        if transaction_type:
+            conditions.append(ds.field('type') == transaction_type)
+        
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+    
+    def scan(self, columns=None, **filters):
+        """Arrow table of the matching rows, reading only the requested columns"""
+        return self.dataset().to_table(columns=columns, filter=self.build_filter(**filters))
+    
+    def transactions(self, columns=None, **filters):
+        """Matching rows as a DataFrame"""
+        return self.scan(columns, **filters).to_pandas()
+    
+    def monthly_totals(self, start_month=None, end_month=None, user_ids=None):
+        """Income, expenses, transactions and active users per month"""
+        import pandas as pd
+        table = self.scan(['month', 'type', 'amount', 'user_id'], start_month=start_month, end_month=end_month,
+                          user_ids=user_ids)
+        table = table.set_column(table.schema.get_field_index('type'), 'type', pc.cast(table['type'], pa.string()))
+        totals = (table.group_by(['month', 'type'])
+                  .aggregate([('amount', 'sum')])
+                  .to_pandas()
+                  .pivot(index='month', columns='type', values='amount_sum'))
+        activity = table.group_by('month').aggregate([('amount', 'count'), ('user_id', 'count_distinct')]).to_pandas()
+        
+        result = pd.DataFrame({
+            'month': totals.index,
+            'income': totals.get('income', pd.Series(0.0, index=totals.index)).fillna(0.0).to_numpy(),
+            'expenses': totals.get('expense', pd.Series(0.0, index=totals.index)).fillna(0.0).to_numpy()
+        })
+        result = result.merge(activity.rename(columns={'amount_count': 'transactions',
+                                                       'user_id_count_distinct': 'active_users'}), on='month')
+        return result.sort_values('month').reset_index(drop=True)
+    
+    def category_totals(self, transaction_type='expense', **filters):
+        """Total amount per category, largest first"""
+        table = self.scan(['category', 'amount'], transaction_type=transaction_type, **filters)
+        table = table.set_column(0, 'category', pc.cast(table['category'], pa.string()))
+        totals = table.group_by('category').aggregate([('amount', 'sum')]).to_pandas()
+        return totals.rename(columns={'amount_sum': 'amount'}).sort_values('amount', ascending=False).reset_index(drop=True)
+    
+    def cohort_retention(self, start_month=None, end_month=None):
+        """Share of each first-month cohort with transactions N months later"""
+        import pandas as pd
+        active = (self.scan(['user_id', 'month'], start_month=start_month, end_month=end_month)
+                  .group_by(['user_id', 'month']).aggregate([])
+                  .to_pandas()
+                  .dropna())
+        if active.empty:
+            return pd.DataFrame()
+        
+        periods = pd.PeriodIndex(active['month'], freq='M')
+        active['period'] = periods.year * 12 + periods.month
+        first = active.groupby('user_id')['period'].transform('min')
+        active['cohort'] = active.groupby('user_id')['month'].transform('min')
+        active['months_since'] = active['period'] - first
+        
+        counts = active.pivot_table(index='cohort', columns='months_since', values='user_id', aggfunc='count')
+        return counts.div(counts[0], axis=0)
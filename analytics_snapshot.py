@@ -0,0 +1,164 @@
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from database import BudgetDatabase
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+class AnalyticsSnapshot:
+    """Month-partitioned Parquet copy of the transactions table for heavy reports.
+    
+    export() is incremental. Each month's rows are fingerprinted with a query
+    answered from an index alone (row count, highest id and sum of ids), and only
+    months whose fingerprint changed are rewritten. Months are read one at a time
+    on a read-only connection, so the live database never holds a read
+    transaction for more than one month's rows. Transactions are never edited in
+    place (only added and deleted), so the fingerprint catches every change.
+    """
+    
+    # Rows are sorted by user within a month so row group statistics can skip other users
+    ROW_GROUP_SIZE = 64 * 1024
+    
+    def __init__(self, db=None, directory='analytics'):
+        if not PYARROW_AVAILABLE:
+            raise ImportError("Analytics snapshots need pyarrow: pip install pyarrow")
+        self.db = db if isinstance(db, BudgetDatabase) else BudgetDatabase(db)
+        self.directory = Path(directory)
+        self.dataset_dir = self.directory / 'transactions'
+        self.manifest_path = self.directory / 'manifest.json'
+    
+    @staticmethod
+    def schema():
+        return pa.schema([
+            ('id', pa.int64()),
+            ('date', pa.date32()),
+            ('description', pa.string()),
+            ('amount', pa.float64()),
+            ('category', pa.dictionary(pa.int32(), pa.string())),
+            ('type', pa.dictionary(pa.int32(), pa.string())),
+            ('user_id', pa.int64())
+        ])
+    
+    def load_manifest(self):
+        if not self.manifest_path.exists():
+            return {'months': {}}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+    
+    def _connect(self):
+        return sqlite3.connect(f"file:{self.db.db_path}?mode=ro", uri=True)
+    
+    @staticmethod
+    def fingerprints(conn):
+        """Per-month (row count, max id, sum of ids) of the live transactions"""
+        rows = conn.execute('''
+            SELECT substr(date, 1, 7) AS month, COUNT(*), MAX(id), SUM(id)
+            FROM transactions GROUP BY month
+        ''').fetchall()
+        return {month: [count, max_id, id_sum] for month, count, max_id, id_sum in rows}
+    
+    def _month_table(self, conn, month):
+        import pandas as pd
+        start = f"{month}-01"
+        end = (pd.Period(month, 'M') + 1).strftime('%Y-%m-01')
+        df = pd.read_sql_query('''
+            SELECT id, date, description, amount, category, type, user_id
+            FROM transactions WHERE date >= ? AND date < ?
+            ORDER BY user_id, date, id
+        ''', conn, params=[start, end])
+        df['date'] = pd.to_datetime(df['date'], format='mixed').dt.date
+        df['user_id'] = df['user_id'].astype('Int64')
+        return pa.Table.from_pandas(df, schema=self.schema(), preserve_index=False)
+    
+    def _partition(self, month):
+        return self.dataset_dir / f"month={month}"
+    
+    def _write_month(self, table, month):
+        partition = self._partition(month)
+        partition.mkdir(parents=True, exist_ok=True)
+        # Dot-prefixed files are skipped by dataset discovery until renamed into place
+        temporary = partition / '.part-0.parquet.tmp'
+        pq.write_table(table, temporary, row_group_size=self.ROW_GROUP_SIZE, compression='zstd')
+        os.replace(temporary, partition / 'part-0.parquet')
+    
+    def _write_manifest(self, manifest):
+        temporary = self.directory / '.manifest.json.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temporary, self.manifest_path)
+    
+    def export(self):
+        """Bring the snapshot up to date; returns which months were rewritten or removed"""
+        start = time.perf_counter()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        manifest = self.load_manifest()
+        previous = manifest['months']
+        
+        conn = self._connect()
+        try:
+            current = self.fingerprints(conn)
+            changed = sorted(month for month, fingerprint in current.items() if previous.get(month) != fingerprint)
+            rows = 0
+            for month in changed:
+                table = self._month_table(conn, month)
+                self._write_month(table, month)
+                rows += table.num_rows
+        finally:
+            conn.close()
+        
+        removed = sorted(set(previous) - set(current))
+        for month in removed:
+            shutil.rmtree(self._partition(month), ignore_errors=True)
+        
+        manifest = {'months': current, 'exported_at': datetime.now().isoformat(timespec='seconds')}
+        self._write_manifest(manifest)
+        return {
+            'exported': changed,
+            'removed': removed,
+            'unchanged': len(current) - len(changed),
+            'rows': rows,
+            'seconds': time.perf_counter() - start
+        }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export transactions to a month-partitioned Parquet snapshot")
+    parser.add_argument('command', choices=['export', 'report'], help="Refresh the snapshot or print reports from it")
+    parser.add_argument('--db', default=None, help="Database file (defaults to DATABASE_PATH or budget_coach.db)")
+    parser.add_argument('--dir', default='analytics', help="Snapshot directory")
+    parser.add_argument('--interval', type=float, default=0, help="Keep exporting every N seconds")
+    args = parser.parse_args(argv)
+    
+    if not PYARROW_AVAILABLE:
+        print("❌ pyarrow is not installed. Run: pip install pyarrow")
+        return 1
+    
+    if args.command == 'report':
+        from analytics_queries import AnalyticsQueries
+        queries = AnalyticsQueries(args.dir)
+        print("📊 Monthly totals")
+        print(queries.monthly_totals().to_string(index=False))
+        print("\n👥 Cohort retention")
+        print(queries.cohort_retention().round(2).to_string())
+        return 0
+    
+    snapshot = AnalyticsSnapshot(args.db, args.dir)
+    while True:
+        stats = snapshot.export()
+        print(f"📦 Exported {len(stats['exported'])} months ({stats['rows']} rows), removed {len(stats['removed'])}, "
+              f"{stats['unchanged']} unchanged in {stats['seconds']:.2f}s")
+        if not args.interval:
+            return stats
+        time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()
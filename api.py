@@ -0,0 +1,301 @@
+import argparse
+import hashlib
+import json
+import threading
+from datetime import date
+from functools import partial
+from urllib.parse import parse_qs
+from async_database import AsyncBudgetDatabase
+
+try:
+    import uvicorn
+    UVICORN_AVAILABLE = True
+except ImportError:
+    UVICORN_AVAILABLE = False
+
+class HTTPError(Exception):
+    """Error returned to the client as a JSON body"""
+    
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def _json_default(value):
+    # numpy scalars, pandas Timestamps and dates
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _records(df):
+    """DataFrame rows as JSON-ready dicts, with missing values as null"""
+    return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+class BudgetAPI:
+    """Read-only JSON API over the budget data, served as an ASGI application.
+    
+    Data endpoints need an "Authorization: Bearer <session token>" header and
+    answer for the user the token belongs to. Every data response carries an ETag
+    built from the data versions it depends on, so a client repeating a request
+    with If-None-Match gets a 304 after a single version lookup, without the data
+    being read or analysed again.
+    """
+    
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 500
+    
+    CHARTS = {
+        'spending_by_category': 'create_spending_by_category_pie',
+        'monthly_trend': 'create_monthly_trend',
+        'daily_spending': 'create_daily_spending_bar',
+        'income_breakdown': 'create_income_breakdown',
+        'budget_vs_actual': 'create_budget_vs_actual_chart'
+    }
+    
+    def __init__(self, db=None, max_workers=4, timeout=30.0):
+        self._db = db
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._adb = None
+        self._lock = threading.Lock()
+        self._visualizer = None
+        
+        # path -> (handler, data the response depends on: 'user', 'shared' or None for
+        # public endpoints)
+        self.routes = {
+            '/api/health': (self.health, None),
+            '/api/transactions': (self.transactions, 'user'),
+            '/api/rollups/monthly': (self.monthly_rollups, 'user'),
+            '/api/analysis': (self.analysis, 'user'),
+            '/api/goals': (self.goals, 'shared'),
+            '/api/achievements': (self.achievements, 'shared')
+        }
+        for name in self.CHARTS:
+            self.routes[f'/api/charts/{name}'] = (partial(self.chart, name), 'user')
+    
+    @property
+    def adb(self):
+        """AsyncBudgetDatabase, opened on the first request"""
+        with self._lock:
+            if self._adb is None:
+                self._adb = AsyncBudgetDatabase(self._db, max_workers=self.max_workers, timeout=self.timeout)
+            return self._adb
+    
+    @property
+    def visualizer(self):
+        with self._lock:
+            if self._visualizer is None:
+                from visualizations import BudgetVisualizer
+                self._visualizer = BudgetVisualizer()
+            return self._visualizer
+    
+    def close(self):
+        if self._adb is not None:
+            self._adb.close()
+            self._adb = None
+    
+    # Parameters
+    
+    @staticmethod
+    def _int(params, name, default=None, minimum=None, maximum=None):
+        value = params.get(name)
+        if value in (None, ''):
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            raise HTTPError(400, f"'{name}' must be an integer")
+        if minimum is not None and value < minimum:
+            raise HTTPError(400, f"'{name}' must be at least {minimum}")
+        if maximum is not None and value > maximum:
+            raise HTTPError(400, f"'{name}' must be at most {maximum}")
+        return value
+    
+    @staticmethod
+    def _date(params, name, month=False):
+        value = params.get(name)
+        if not value:
+            return None
+        try:
+            if len(value) != (7 if month else 10):
+                raise ValueError(value)
+            date.fromisoformat(value + '-01' if month else value)
+        except ValueError:
+            raise HTTPError(400, f"'{name}' must be {'YYYY-MM' if month else 'YYYY-MM-DD'}")
+        return value
+    
+    def _filters(self, params, user_id):
+        return {
+            'start_date': self._date(params, 'start_date'),
+            'end_date': self._date(params, 'end_date'),
+            'user_id': user_id
+        }
+    
+    @staticmethod
+    def _bearer_token(request_headers):
+        scheme, _, token = request_headers.get('authorization', '').partition(' ')
+        return token.strip() if scheme.lower() == 'bearer' else None
+    
+    async def authenticate(self, request_headers):
+        """Id of the user whose session token the request carries; 401 without a valid one"""
+        token = self._bearer_token(request_headers)
+        user = await self.adb.run(self.adb.db.session_tokens.validate, token) if token else None
+        if user is None:
+            raise HTTPError(401, "A valid session token is required")
+        return user['id']
+    
+    # Handlers (run on the database executor)
+    
+    def health(self, params, user_id):
+        return {'status': 'ok'}
+    
+    def transactions(self, params, user_id):
+        page = self._int(params, 'page', 1, minimum=1)
+        page_size = self._int(params, 'page_size', self.DEFAULT_PAGE_SIZE, minimum=1, maximum=self.MAX_PAGE_SIZE)
+        df, total = self.adb.db.get_transactions_page(page, page_size, **self._filters(params, user_id))
+        return {
+            'items': _records(df),
+            'page': page,
+            'page_size': page_size,
+            'total': total,
+            'pages': -(-total // page_size)
+        }
+    
+    def monthly_rollups(self, params, user_id):
+        from budget_classifier import BudgetClassifier
+        df = self.adb.db.get_transactions(**self._filters(params, user_id))
+        summary = BudgetClassifier(self.adb.db.categories.buckets()).summarize(df).reset_index()
+        summary['month'] = summary['month'].astype(str)
+        return {'months': _records(summary.sort_values('month'))}
+    
+    def analysis(self, params, user_id):
+        from financial_advisor import FinancialAdvisor
+        month = self._date(params, 'month', month=True)
+        df = self.adb.db.get_transactions(user_id=user_id)
+        advisor = FinancialAdvisor(self.adb.db.categories.buckets())
+        month = month or advisor.classifier.current_month()
+        return {'month': month, **advisor.analyze_budget(df, month)}
+    
+    def chart(self, name, params, user_id):
+        df = self.adb.db.get_transactions(**self._filters(params, user_id))
+        create = getattr(self.visualizer, self.CHARTS[name])
+        if name == 'budget_vs_actual':
+            fig = create(df, self.adb.db.get_budget_targets())
+        else:
+            fig = create(df)
+        return {'chart': name, 'figure': None if fig is None else json.loads(fig.to_json())}
+    
+    def goals(self, params, user_id):
+        df = self.adb.goals.get_goals_with_projections()
+        return {'goals': _records(df)}
+    
+    def achievements(self, params, user_id):
+        system = self.adb.achievements
+        # The ETag already says the data changed, so skip the process-wide cache
+        system.reload()
+        earned = system.get_earned_achievements()
+        (points_required, title, description), total_points = system.get_user_level()
+        return {
+            'earned': [{'id': aid, **system.achievements_catalog[aid]}
+                       for aid in earned if aid in system.achievements_catalog],
+            'total_points': total_points,
+            'level': {'title': title, 'description': description, 'points_required': points_required}
+        }
+    
+    # ETags
+    
+    async def etag(self, path, query_string, dependency, user_id):
+        """Tag of the data versions a response depends on, its query, user and today's date"""
+        if dependency == 'shared':
+            scopes = ['shared']
+        else:
+            scopes = ['shared', f'user:{user_id}']
+        versions = await self.adb.run(self.adb.db.get_data_versions, scopes)
+        
+        # Goal countdowns and "current month" analyses change with the date alone
+        digest = hashlib.sha1(f"{path}?{query_string}|{user_id}|{date.today()}".encode()).hexdigest()[:16]
+        return '"' + '-'.join(str(versions[scope]) for scope in scopes) + f'-{digest}"'
+    
+    @staticmethod
+    def _matches(if_none_match, etag):
+        tags = {tag.strip() for tag in if_none_match.split(',')}
+        return '*' in tags or etag in tags or f'W/{etag}' in tags
+    
+    # ASGI
+    
+    async def handle(self, scope):
+        """Status, headers and body for one request"""
+        headers = [(b'content-type', b'application/json')]
+        try:
+            path = scope['path'].rstrip('/') or '/'
+            if path not in self.routes:
+                raise HTTPError(404, f"No such endpoint: {path}")
+            if scope['method'] not in ('GET', 'HEAD'):
+                headers.append((b'allow', b'GET, HEAD'))
+                raise HTTPError(405, "This API is read-only")
+            
+            handler, dependency = self.routes[path]
+            query_string = scope.get('query_string', b'').decode('latin-1')
+            params = {name: values[-1] for name, values in parse_qs(query_string).items()}
+            request_headers = {name.decode('latin-1').lower(): value.decode('latin-1')
+                               for name, value in scope.get('headers', [])}
+            
+            user_id = None
+            cache_headers = []
+            if dependency is not None:
+                try:
+                    user_id = await self.authenticate(request_headers)
+                except HTTPError:
+                    headers.append((b'www-authenticate', b'Bearer'))
+                    raise
+                etag = await self.etag(path, query_string, dependency, user_id)
+                cache_headers = [(b'etag', etag.encode()), (b'cache-control', b'private, no-cache')]
+                if self._matches(request_headers.get('if-none-match', ''), etag):
+                    return 304, cache_headers, b''
+            
+            payload = await self.adb.run(handler, params, user_id)
+            return 200, headers + cache_headers, json.dumps(payload, default=_json_default).encode()
+        except HTTPError as e:
+            return e.status, headers, json.dumps({'error': e.message}).encode()
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    self.close()
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+        
+        status, headers, body = await self.handle(scope)
+        headers = headers + [(b'content-length', str(len(body)).encode())]
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else body})
+
+# `uvicorn api:app` serves the database at DATABASE_PATH
+app = BudgetAPI()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the read-only Budget Coach JSON API")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to listen on")
+    parser.add_argument('--port', type=int, default=8000, help="Port to listen on")
+    parser.add_argument('--db', default=None, help="Database file (defaults to DATABASE_PATH or budget_coach.db)")
+    parser.add_argument('--threads', type=int, default=4, help="Database executor threads")
+    args = parser.parse_args(argv)
+    
+    if not UVICORN_AVAILABLE:
+        print("❌ uvicorn is not installed. Run: pip install uvicorn")
+        return 1
+    
+    print(f"🚀 Budget Coach API on http://{args.host}:{args.port}/api/health")
+    uvicorn.run(BudgetAPI(args.db, max_workers=args.threads), host=args.host, port=args.port)
+    return 0
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,10 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime, date, timedelta
-import plotly.express as px
-import plotly.graph_objects as go
-from database import BudgetDatabase
-from financial_advisor import FinancialAdvisor
-from visualizations import BudgetVisualizer
-from themes import ThemeManager
-from goals_tracker import SavingsGoalsTracker
-from achievements import AchievementSystem
-from calculators import FinancialCalculators
 from auth import AuthManager
 
+# Feature modules (and pandas/plotly behind them) are imported lazily, once the
+# page that needs them is selected, so cold starts only pay for the login form.
+
 # Page configuration
 st.set_page_config(
     page_title="💰 Budget Coach",
@@ -23,8 +16,13 @@ st.set_page_config(
 # Initialize authentication
 auth_manager = AuthManager()
 
-# Check authentication first
-if not auth_manager.is_authenticated():
+# Check authentication first (resuming from the session cookie if there is one)
+authenticated = auth_manager.is_authenticated()
+
+# Keep the browser's session cookie in step: set after login, rotated on resume, cleared on logout
+auth_manager.sync_token_cookie()
+
+if not authenticated:
     # Show login form if not authenticated
     auth_manager.login_form()
     st.stop()
@@ -38,18 +36,28 @@ auth_manager.show_user_welcome()
 # Initialize classes
 @st.cache_resource
 def init_app():
+    from database import BudgetDatabase
+    from themes import ThemeManager
     db = BudgetDatabase()
-    advisor = FinancialAdvisor()
-    visualizer = BudgetVisualizer()
     theme_manager = ThemeManager()
-    return db, advisor, visualizer, theme_manager
+    return db, theme_manager
+
+# Keyed on the category buckets, so a bucket edit (which refreshes the registry) builds a new advisor
+@st.cache_resource(max_entries=8)
+def get_advisor(category_buckets):
+    from financial_advisor import FinancialAdvisor
+    return FinancialAdvisor(dict(category_buckets))
 
-db, advisor, visualizer, theme_manager = init_app()
+@st.cache_resource
+def get_visualizer():
+    from visualizations import BudgetVisualizer
+    return BudgetVisualizer()
+
+db, theme_manager = init_app()
 
 # Initialize non-cached components
-goals_tracker = SavingsGoalsTracker(db)
+from achievements import AchievementSystem
 achievement_system = AchievementSystem(db)
-calculators = FinancialCalculators()
 
 # Apply theme and dynamic CSS
 current_theme = theme_manager.create_theme_toggle()
@@ -193,6 +201,7 @@ auth_manager.show_contact_info()
 # Main content based on selected page
 if page == "📊 Dashboard":
     st.markdown('<h1 class="main-header">💰 Budget Coach Dashboard</h1>', unsafe_allow_html=True)
+    visualizer = get_visualizer()
     
     # Get transactions with date filtering
     transactions_df = db.get_transactions(filter_start_date, filter_end_date)
@@ -271,8 +280,7 @@ elif page == "➕ Add Transaction":
         transaction_type = st.selectbox("Transaction Type", ["expense", "income"])
         
         # Get categories based on type
-        categories_df = db.get_categories(transaction_type)
-        category_options = categories_df['name'].tolist() if not categories_df.empty else []
+        category_options = list(db.categories.names(transaction_type))
         
         category = st.selectbox("Category", category_options)
         amount = st.number_input("Amount ($)", min_value=0.01, step=0.01, format="%.2f")
@@ -328,9 +336,11 @@ elif page == "➕ Add Transaction":
 
 elif page == "🎯 Savings Goals":
     st.markdown('<h1 class="main-header">🎯 Savings Goals Tracker</h1>', unsafe_allow_html=True)
+    from goals_tracker import SavingsGoalsTracker
+    goals_tracker = SavingsGoalsTracker(db)
     
     # Display goal statistics
-    goals_df = goals_tracker.get_goals()
+    goals_df = goals_tracker.get_goals_with_projections()
     goals_tracker.show_goal_stats(goals_df)
     
     # Progress chart
@@ -378,6 +388,8 @@ elif page == "🏆 Achievements":
 
 elif page == "🧮 Calculators":
     st.markdown('<h1 class="main-header">🧮 Financial Calculators</h1>', unsafe_allow_html=True)
+    from calculators import FinancialCalculators
+    calculators = FinancialCalculators()
     
     # Calculator selector
     calculator_type = st.selectbox(
@@ -401,6 +413,7 @@ elif page == "🧮 Calculators":
 
 elif page == "💰 Budget Targets":
     st.markdown('<h1 class="main-header">💰 Budget Targets</h1>', unsafe_allow_html=True)
+    visualizer = get_visualizer()
     
     # Budget targets management
     col1, col2 = st.columns(2)
@@ -409,10 +422,10 @@ elif page == "💰 Budget Targets":
         st.subheader("📝 Set Budget Targets")
         
         # Get expense categories for budget setting
-        expense_categories = db.get_categories('expense')
+        expense_categories = db.categories.names('expense')
         
-        if not expense_categories.empty:
-            category = st.selectbox("Category", expense_categories['name'].tolist())
+        if expense_categories:
+            category = st.selectbox("Category", list(expense_categories))
             monthly_target = st.number_input("Monthly Target ($)", min_value=0.01, step=10.00, format="%.2f")
             
             if st.button("💾 Set Budget Target", type="primary"):
@@ -456,6 +469,8 @@ elif page == "💰 Budget Targets":
 
 elif page == "📈 Analytics":
     st.markdown('<h1 class="main-header">📈 Financial Analytics</h1>', unsafe_allow_html=True)
+    advisor = get_advisor(tuple(sorted(db.categories.buckets().items())))
+    visualizer = get_visualizer()
     
     transactions_df = db.get_transactions(filter_start_date, filter_end_date)
     
@@ -484,31 +499,21 @@ elif page == "📈 Analytics":
             # 50/30/20 Analysis
             st.subheader("📊 50/30/20 Rule Analysis")
             
-            current_month = datetime.now().strftime('%Y-%m')
-            monthly_data = transactions_df[transactions_df['date'].str.startswith(current_month)]
-            
-            if not monthly_data.empty:
-                total_income = monthly_data[monthly_data['type'] == 'income']['amount'].sum()
-                
-                if total_income > 0:
-                    expense_by_category = monthly_data[monthly_data['type'] == 'expense'].groupby('category')['amount'].sum()
-                    
-                    needs_categories = ['Housing', 'Utilities', 'Food & Dining', 'Healthcare', 'Transportation']
-                    wants_categories = ['Entertainment', 'Shopping', 'Other']
-                    
-                    needs_spending = sum(expense_by_category.get(cat, 0) for cat in needs_categories)
-                    wants_spending = sum(expense_by_category.get(cat, 0) for cat in wants_categories)
-                    
-                    # Create 50/30/20 gauge chart
-                    gauge_chart = visualizer.create_50_30_20_gauge(total_income, needs_spending, wants_spending)
-                    if gauge_chart:
-                        st.plotly_chart(gauge_chart, use_container_width=True)
+            # Reuse the advisor's 50/30/20 split instead of re-classifying here
+            gauge_chart = visualizer.create_50_30_20_gauge(
+                budget_analysis['total_income'],
+                budget_analysis['needs_spending'],
+                budget_analysis['wants_spending']
+            )
+            if gauge_chart:
+                st.plotly_chart(gauge_chart, use_container_width=True)
         
         # Additional charts
         col1, col2 = st.columns(2)
         
         with col1:
-            daily_chart = visualizer.create_daily_spending_bar(transactions_df)
+            # Bucket size follows the date filter so "All Time" stays within the point budget
+            daily_chart = visualizer.create_daily_spending_bar(transactions_df, days=None)
             if daily_chart:
                 st.plotly_chart(daily_chart, use_container_width=True)
         
@@ -522,9 +527,12 @@ elif page == "📈 Analytics":
 
 elif page == "🎓 Financial Tips":
     st.markdown('<h1 class="main-header">🎓 Financial Education</h1>', unsafe_allow_html=True)
+    advisor = get_advisor(tuple(sorted(db.categories.buckets().items())))
     
-    # Get a random tip
-    tip = advisor.get_random_tip()
+    # Get the next tip from this session's non-repeating deck
+    if 'tip_deck' not in st.session_state:
+        st.session_state.tip_deck = advisor.new_tip_deck()
+    tip = advisor.get_random_tip(deck=st.session_state.tip_deck)
     
     st.markdown(f"""
     <div class="tip-card">
@@ -584,6 +592,26 @@ elif page == "⚙️ Settings":
         with col3:
             st.metric("📱 Total Sessions", user_stats['total_sessions'])
         
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("📅 DAU", user_stats['dau'])
+        with col2:
+            st.metric("🗓️ WAU", user_stats['wau'])
+        with col3:
+            st.metric("📆 MAU", user_stats['mau'])
+        
+        with st.expander("📈 Activity and session details"):
+            import pandas as pd
+            st.line_chart(db.admin_metrics.activity_series('day', 30).set_index('period'))
+            histograms = db.admin_metrics.session_histograms()
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write("**Sessions by hour (UTC)**")
+                st.bar_chart(histograms['by_hour'])
+            with col2:
+                st.write("**Pages per session**")
+                st.bar_chart(pd.Series(histograms['pages_per_session']))
+        
         st.info("💡 This analytics dashboard is only visible to the app creator.")
         st.markdown("---")
     
@@ -618,7 +646,7 @@ elif page == "⚙️ Settings":
                 # Clean up temp file
                 import os
                 os.remove(import_path)
-                
+            
             except Exception as e:
                 st.error(f"❌ Import failed: {str(e)}")
     
@@ -23,8 +23,13 @@ st.set_page_config(
 # Initialize authentication
 auth_manager = AuthManager()
 
-# Check authentication first
-if not auth_manager.is_authenticated():
+# Check authentication first (resuming from the session cookie if there is one)
+authenticated = auth_manager.is_authenticated()
+
+# Keep the browser's session cookie in step: set after login, rotated on resume, cleared on logout
+auth_manager.sync_token_cookie()
+
+if not authenticated:
     # Show login form if not authenticated
     auth_manager.login_form()
     st.stop()
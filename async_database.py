@@ -0,0 +1,270 @@
+import argparse
+import asyncio
+import tempfile
+import threading
+import time
+import weakref
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from database import BudgetDatabase, current_job
+
+class AsyncBudgetDatabase:
+    """asyncio facade over BudgetDatabase for APIs and background jobs.
+    
+    Blocking SQLite calls run on a dedicated thread pool so they never stall the
+    event loop. At most `max_pending` calls are queued or running at once. When a
+    call is cancelled or times out, its query is interrupted through the
+    connection's progress handler.
+    """
+    
+    def __init__(self, db=None, max_workers=4, max_pending=64, timeout=None):
+        self.db = db if isinstance(db, BudgetDatabase) else BudgetDatabase(db)
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix='budget-db')
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._goals = None
+        self._achievements = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        self.executor.shutdown(wait=True)
+    
+    @staticmethod
+    def _job(cancel_event, fn, args, kwargs):
+        if cancel_event.is_set():
+            raise CancelledError()
+        current_job.cancel_event = cancel_event
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            current_job.cancel_event = None
+    
+    async def run(self, fn, *args, timeout=None, **kwargs):
+        """Run a blocking call on the executor, interrupting it on cancellation or timeout"""
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.max_pending)
+        
+        cancel_event = threading.Event()
+        async with self._semaphores[loop]:
+            future = loop.run_in_executor(self.executor, self._job, cancel_event, fn, args, kwargs)
+            try:
+                return await asyncio.wait_for(future, self.timeout if timeout is None else timeout)
+            except (asyncio.CancelledError, asyncio.TimeoutError):
+                cancel_event.set()
+                raise
+    
+    @property
+    def goals(self):
+        """SavingsGoalsTracker, created on first use (it imports plotly)"""
+        with self._lock:
+            if self._goals is None:
+                from goals_tracker import SavingsGoalsTracker
+                self._goals = SavingsGoalsTracker(self.db)
+            return self._goals
+    
+    @property
+    def achievements(self):
+        """AchievementSystem, created on first use"""
+        with self._lock:
+            if self._achievements is None:
+                from achievements import AchievementSystem
+                self._achievements = AchievementSystem(self.db)
+            return self._achievements
+    
+    # Transactions
+    
+    async def add_transaction(self, date, description, amount, category, transaction_type, user_id=None, timeout=None):
+        return await self.run(self.db.add_transaction, date, description, amount, category, transaction_type,
+                              user_id, timeout=timeout)
+    
+    async def add_transactions(self, rows, timeout=None):
+        return await self.run(self.db.add_transactions, rows, timeout=timeout)
+    
+    async def get_transactions(self, start_date=None, end_date=None, user_id=None, timeout=None):
+        return await self.run(self.db.get_transactions, start_date, end_date, user_id, timeout=timeout)
+    
+    async def delete_transaction(self, transaction_id, timeout=None):
+        return await self.run(self.db.delete_transaction, transaction_id, timeout=timeout)
+    
+    async def import_from_csv(self, filepath, timeout=None):
+        return await self.run(self.db.import_from_csv, filepath, timeout=timeout)
+    
+    async def export_to_csv(self, filepath, timeout=None):
+        return await self.run(self.db.export_to_csv, filepath, timeout=timeout)
+    
+    # Categories
+    
+    async def get_categories(self, category_type=None, timeout=None):
+        return await self.run(self.db.get_categories, category_type, timeout=timeout)
+    
+    async def category_names(self, category_type=None, timeout=None):
+        return await self.run(self.db.categories.names, category_type, timeout=timeout)
+    
+    async def get_category_buckets(self, timeout=None):
+        return await self.run(self.db.get_category_buckets, timeout=timeout)
+    
+    async def set_category_bucket(self, category, bucket, timeout=None):
+        return await self.run(self.db.set_category_bucket, category, bucket, timeout=timeout)
+    
+    # Budget targets
+    
+    async def set_budget_target(self, category, monthly_target, timeout=None):
+        return await self.run(self.db.set_budget_target, category, monthly_target, timeout=timeout)
+    
+    async def get_budget_targets(self, timeout=None):
+        return await self.run(self.db.get_budget_targets, timeout=timeout)
+    
+    async def delete_budget_target(self, category, timeout=None):
+        return await self.run(self.db.delete_budget_target, category, timeout=timeout)
+    
+    # Savings goals
+    
+    async def add_goal(self, name, target_amount, target_date, category="General", emoji="🎯", timeout=None):
+        return await self.run(lambda: self.goals.add_goal(name, target_amount, target_date, category, emoji),
+                              timeout=timeout)
+    
+    async def get_goals(self, timeout=None):
+        return await self.run(lambda: self.goals.get_goals(), timeout=timeout)
+    
+    async def get_goals_with_projections(self, as_of=None, timeout=None):
+        return await self.run(lambda: self.goals.get_goals_with_projections(as_of), timeout=timeout)
+    
+    async def update_goal_progress(self, goal_id, amount_to_add, idempotency_key=None, timeout=None):
+        return await self.run(lambda: self.goals.update_goal_progress(goal_id, amount_to_add, idempotency_key),
+                              timeout=timeout)
+    
+    async def add_contributions(self, contributions, timeout=None):
+        return await self.run(lambda: self.goals.add_contributions(contributions), timeout=timeout)
+    
+    async def delete_goal(self, goal_id, timeout=None):
+        return await self.run(lambda: self.goals.delete_goal(goal_id), timeout=timeout)
+    
+    # Achievements
+    
+    async def get_earned_achievements(self, timeout=None):
+        return await self.run(lambda: self.achievements.get_earned_achievements(), timeout=timeout)
+    
+    async def check_and_award_achievements(self, transactions_df=None, timeout=None):
+        def check():
+            df = self.db.get_transactions() if transactions_df is None else transactions_df
+            return self.achievements.check_and_award_achievements(df)
+        return await self.run(check, timeout=timeout)
+    
+    async def get_user_level(self, timeout=None):
+        return await self.run(lambda: self.achievements.get_user_level(), timeout=timeout)
+    
+    # Users
+    
+    async def get_user_by_email(self, email, timeout=None):
+        return await self.run(self.db.get_user_by_email, email, timeout=timeout)
+    
+    async def create_user_with_password(self, email, name, password_hash, timeout=None):
+        return await self.run(self.db.create_user_with_password, email, name, password_hash, timeout=timeout)
+    
+    async def update_user_login(self, user_id, timeout=None):
+        return await self.run(self.db.update_user_login, user_id, timeout=timeout)
+    
+    async def start_user_session(self, user_id, timeout=None):
+        return await self.run(self.db.start_user_session, user_id, timeout=timeout)
+    
+    async def get_user_stats(self, timeout=None):
+        return await self.run(self.db.get_user_stats, timeout=timeout)
+
+# Benchmark
+
+async def _measure_loop_lag(stop, lags, interval=0.005):
+    """How late the event loop wakes a 5ms ticker, i.e. how long something blocked it"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - expected))
+
+class _BlockingCalls:
+    """Baseline for the benchmark: the same requests made directly on the event loop"""
+    
+    def __init__(self, db):
+        self.db = db
+    
+    def __getattr__(self, name):
+        async def call(*args, **kwargs):
+            if name == 'category_names':
+                return self.db.categories.names(*args, **kwargs)
+            return getattr(self.db, name)(*args, **kwargs)
+        return call
+
+async def _run_requests(adb, requests, n_users, concurrent):
+    async def request(index):
+        kind = index % 4
+        if kind == 0:
+            return await adb.get_transactions(user_id=index % n_users + 1)
+        if kind == 1:
+            return await adb.get_budget_targets()
+        if kind == 2:
+            return await adb.get_user_by_email(f"user{index % n_users + 1}@example.com")
+        return await adb.category_names('expense')
+    
+    if concurrent:
+        await asyncio.gather(*[request(index) for index in range(requests)])
+    else:
+        for index in range(requests):
+            await request(index)
+
+def benchmark(users=200, requests=400, worker_counts=(1, 2, 4, 8)):
+    """Mixed read requests per second, sequential vs concurrent, with event loop lag"""
+    from load_test import percentiles
+    from synthetic_data import SyntheticDataGenerator
+    
+    db = BudgetDatabase(tempfile.mktemp(suffix='.db'))
+    SyntheticDataGenerator(n_users=users, years=1).load(db)
+    
+    async def scenario(adb, concurrent):
+        stop = asyncio.Event()
+        lags = []
+        ticker = asyncio.create_task(_measure_loop_lag(stop, lags))
+        # Let the ticker start sleeping before the requests begin
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        await _run_requests(adb, requests, users, concurrent)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await ticker
+        return requests / elapsed, percentiles(lags).get('p99', 0.0)
+    
+    results = []
+    print(f"{'workers':>8} {'mode':>11} {'requests/s':>11} {'loop lag p99 ms':>16}")
+    throughput, lag = asyncio.run(scenario(_BlockingCalls(db), False))
+    results.append({'workers': 0, 'mode': 'blocking', 'requests_per_s': throughput, 'loop_lag_p99_ms': lag})
+    print(f"{'-':>8} {'blocking':>11} {throughput:>11.1f} {lag:>16.1f}")
+    for workers in worker_counts:
+        with AsyncBudgetDatabase(db, max_workers=workers) as adb:
+            for concurrent in (False, True):
+                throughput, lag = asyncio.run(scenario(adb, concurrent))
+                mode = 'concurrent' if concurrent else 'sequential'
+                results.append({'workers': workers, 'mode': mode, 'requests_per_s': throughput, 'loop_lag_p99_ms': lag})
+                print(f"{workers:>8} {mode:>11} {throughput:>11.1f} {lag:>16.1f}")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark concurrent async requests against BudgetDatabase")
+    parser.add_argument('--users', type=int, default=200, help="Synthetic users in the benchmark database")
+    parser.add_argument('--requests', type=int, default=400, help="Requests per scenario")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8], help="Executor sizes to compare")
+    args = parser.parse_args(argv)
+    return benchmark(args.users, args.requests, args.workers)
+
+if __name__ == "__main__":
+    main()
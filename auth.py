@@ -4,9 +4,26 @@ import hashlib
 import secrets
 from database import BudgetDatabase
 
+# Cookie carrying the session token, so a refresh or reconnect stays signed in
+TOKEN_COOKIE = 'budget_coach_session'
+
+# Writes the session cookie in the browser, or deletes it when there is no token. The
+# token is passed as data rather than markup and never appears in the page URL
+TOKEN_COOKIE_JS = """
+export default function({ data }) {
+    const secure = location.protocol === 'https:' ? '; Secure' : '';
+    document.cookie = data.token
+        ? `${data.name}=${data.token}; Path=/; Max-Age=${data.max_age}; SameSite=Strict${secure}`
+        : `${data.name}=; Path=/; Max-Age=0; SameSite=Strict${secure}`;
+}
+"""
+
+_token_cookie_component = None
+
 class AuthManager:
     def __init__(self):
         self.db = BudgetDatabase()
+        self.tokens = self.db.session_tokens
     
     def is_valid_email(self, email):
         """Validate email format"""
@@ -23,13 +40,15 @@ class AuthManager:
             return False, "Password must contain at least one number"
         return True, "Password is strong"
     
-    def hash_password(self, password):
+    @staticmethod
+    def hash_password(password):
         """Hash password with salt for security"""
         salt = secrets.token_hex(16)
         hashed = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000)
         return salt + hashed.hex()
     
-    def verify_password(self, password, stored_hash):
+    @staticmethod
+    def verify_password(password, stored_hash):
         """Verify password against stored hash"""
         if not stored_hash or len(stored_hash) < 32:
             return False
@@ -191,26 +210,66 @@ class AuthManager:
                             else:
                                 st.error("❌ Failed to create account. Please try again.")
     
-    def _authenticate_user(self, user):
-        """Set session state for authenticated user"""
+    def _authenticate_user(self, user, token=None):
+        """Set session state for authenticated user, issuing a session token unless resuming with a new one"""
         st.session_state.authenticated = True
         st.session_state.user_id = user['id']
         st.session_state.user_email = user['email']
         st.session_state.user_name = user['name']
-        st.session_state.is_new_user = user.get('login_count', 0) <= 1
+        st.session_state.is_new_user = token is None and user.get('login_count', 0) <= 1
+        
+        if token is None:
+            token = self.tokens.issue(user['id'])
+        st.session_state.auth_token = token
         
         # Start session tracking
         session_id = self.db.start_user_session(user['id'])
         st.session_state.session_id = session_id
     
+    def _cookie_token(self):
+        """Session token the browser sent when this session connected"""
+        return st.context.cookies.get(TOKEN_COOKIE)
+    
+    def resume_session(self):
+        """Sign in from the session cookie without checking the password again.
+        
+        Tried once per session. The token is swapped for a new one on every resume,
+        so a copied cookie stops working once either copy has been used.
+        """
+        if st.session_state.get('resume_attempted'):
+            return False
+        st.session_state.resume_attempted = True
+        token = self._cookie_token()
+        if not token:
+            return False
+        user, new_token = self.tokens.rotate(token)
+        if user is None:
+            return False
+        self._authenticate_user(user, new_token)
+        return True
+    
+    def sync_token_cookie(self):
+        """Store the current session token in the browser's cookie, or clear the cookie once signed out"""
+        global _token_cookie_component
+        if _token_cookie_component is None:
+            _token_cookie_component = st.components.v2.component('session_cookie', js=TOKEN_COOKIE_JS)
+        _token_cookie_component(
+            data={'name': TOKEN_COOKIE, 'token': st.session_state.get('auth_token'), 'max_age': self.tokens.TTL},
+            key='session_cookie'
+        )
+    
     def logout(self):
         """Handle user logout with notification"""
         user_name = st.session_state.get('user_name', 'User')
         
+        # Revoke the session token; the next run clears the cookie
+        if 'auth_token' in st.session_state:
+            self.tokens.revoke(st.session_state.auth_token)
+        
         # Clear session state
         keys_to_clear = [
             'authenticated', 'user_id', 'user_email', 'user_name', 
-            'is_new_user', 'session_id'
+            'is_new_user', 'session_id', 'auth_token'
         ]
         for key in keys_to_clear:
             if key in st.session_state:
@@ -221,8 +280,8 @@ class AuthManager:
         st.rerun()
     
     def is_authenticated(self):
-        """Check if user is authenticated"""
-        return st.session_state.get('authenticated', False)
+        """Check if user is authenticated, resuming a session from its token if there is one"""
+        return st.session_state.get('authenticated', False) or self.resume_session()
     
     def get_current_user(self):
         """Get current user information"""
@@ -0,0 +1,179 @@
+import argparse
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from database import BudgetDatabase
+
+class SnapshotService:
+    """Online, compressed and verified snapshots of the budget database with retention.
+    
+    Snapshots are taken with BudgetDatabase.backup, a few pages per step with a
+    pause in between, so a multi-GB copy is spread out instead of competing with
+    the dashboard's queries. Every snapshot is integrity-checked before it is
+    kept, and restore checks it again before anything is overwritten.
+    """
+    
+    PREFIX = 'budget_coach-'
+    
+    def __init__(self, db=None, directory='backups', keep=7, compress=True, pages=256, sleep=0.005,
+                 interval=24 * 3600, quiet=False):
+        self.db = db if isinstance(db, BudgetDatabase) else BudgetDatabase(db)
+        self.directory = Path(directory)
+        self.keep = keep
+        self.compress = compress
+        self.pages = pages
+        self.sleep = sleep
+        self.interval = interval
+        self.quiet = quiet
+        self.history = []
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def log(self, message):
+        if not self.quiet:
+            print(message)
+    
+    @staticmethod
+    def verify(path):
+        """Raise ValueError unless the database file passes an integrity check"""
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            result = conn.execute('PRAGMA integrity_check').fetchone()[0]
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        except sqlite3.DatabaseError as e:
+            raise ValueError(f"{path} is not a usable database: {e}")
+        finally:
+            conn.close()
+        if result != 'ok':
+            raise ValueError(f"{path} failed the integrity check: {result}")
+        if 'transactions' not in tables:
+            raise ValueError(f"{path} has no transactions table")
+    
+    def snapshots(self):
+        """Snapshot files, newest first"""
+        if not self.directory.exists():
+            return []
+        return sorted((path for path in self.directory.iterdir()
+                       if path.name.startswith(self.PREFIX) and path.suffix in ('.db', '.gz')), reverse=True)
+    
+    def snapshot(self):
+        """Take, verify, compress and keep one snapshot; returns its stats"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = self.PREFIX + datetime.now().strftime('%Y%m%d-%H%M%S-%f') + '.db'
+        partial = self.directory / (name + '.partial')
+        compressed_partial = self.directory / (name + '.gz.partial')
+        stats = {'started_at': datetime.now().isoformat(timespec='seconds')}
+        
+        start = time.perf_counter()
+        try:
+            self.db.backup(partial, pages=self.pages, sleep=self.sleep)
+            stats['backup_seconds'] = time.perf_counter() - start
+            stats['database_bytes'] = partial.stat().st_size
+            self.verify(partial)
+            
+            # Only complete, verified snapshots ever get their final name
+            if self.compress:
+                final = self.directory / (name + '.gz')
+                with open(partial, 'rb') as source, gzip.open(compressed_partial, 'wb', compresslevel=6) as target:
+                    shutil.copyfileobj(source, target, 1024 * 1024)
+                os.replace(compressed_partial, final)
+                partial.unlink()
+            else:
+                final = self.directory / name
+                os.replace(partial, final)
+        finally:
+            for leftover in (partial, compressed_partial):
+                if leftover.exists():
+                    leftover.unlink()
+        
+        stats.update(path=str(final), snapshot_bytes=final.stat().st_size, seconds=time.perf_counter() - start)
+        self.history.append(stats)
+        self.log(f"💾 Snapshot {final.name}: {stats['database_bytes'] / 1e6:.1f} MB in {stats['seconds']:.1f}s")
+        self.prune()
+        return stats
+    
+    def prune(self):
+        """Delete all but the newest `keep` snapshots"""
+        removed = self.snapshots()[self.keep:]
+        for path in removed:
+            path.unlink()
+        return removed
+    
+    def restore(self, path=None):
+        """Verify a snapshot (the newest by default) and copy it over the live database"""
+        path = Path(path) if path else next(iter(self.snapshots()), None)
+        if path is None:
+            raise FileNotFoundError(f"No snapshots in {self.directory}")
+        
+        with tempfile.TemporaryDirectory() as workdir:
+            candidate = path
+            if path.suffix == '.gz':
+                candidate = Path(workdir) / path.stem
+                with gzip.open(path, 'rb') as source, open(candidate, 'wb') as target:
+                    shutil.copyfileobj(source, target, 1024 * 1024)
+            self.verify(candidate)
+            self.db.restore_from(candidate, pages=self.pages, sleep=self.sleep)
+        
+        self.log(f"♻️ Restored {self.db.db_path} from {path.name}")
+        return path
+    
+    def run(self):
+        """Take a snapshot every `interval` seconds until stop() is called"""
+        while not self._stop.is_set():
+            try:
+                self.snapshot()
+            except Exception as e:
+                self.log(f"❌ Snapshot failed: {e}")
+            self._stop.wait(self.interval)
+    
+    def start(self):
+        """Run scheduled snapshots on a background thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name='snapshot-service', daemon=True)
+        self._thread.start()
+        return self._thread
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Take, list and restore Budget Coach database snapshots")
+    parser.add_argument('command', choices=['snapshot', 'list', 'restore', 'schedule'], help="What to do")
+    parser.add_argument('snapshot_path', nargs='?', help="Snapshot to restore (defaults to the newest)")
+    parser.add_argument('--db', default=None, help="Database file (defaults to DATABASE_PATH or budget_coach.db)")
+    parser.add_argument('--dir', default='backups', help="Snapshot directory")
+    parser.add_argument('--keep', type=int, default=7, help="Snapshots to keep")
+    parser.add_argument('--no-compress', action='store_true', help="Keep snapshots as plain .db files")
+    parser.add_argument('--pages', type=int, default=256, help="Pages copied per backup step")
+    parser.add_argument('--sleep', type=float, default=0.005, help="Seconds to pause between backup steps")
+    parser.add_argument('--interval', type=float, default=24 * 3600, help="Seconds between scheduled snapshots")
+    args = parser.parse_args(argv)
+    
+    service = SnapshotService(args.db, directory=args.dir, keep=args.keep, compress=not args.no_compress,
+                              pages=args.pages, sleep=args.sleep, interval=args.interval)
+    if args.command == 'snapshot':
+        return service.snapshot()
+    if args.command == 'list':
+        for path in service.snapshots():
+            print(f"{path.name}  {path.stat().st_size / 1e6:.1f} MB")
+        return service.snapshots()
+    if args.command == 'restore':
+        return service.restore(args.snapshot_path)
+    
+    print(f"⏰ Snapshotting every {args.interval:.0f}s into {args.dir} (Ctrl+C to stop)")
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        service.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import threading
+import time
+
+class CategoryRegistry:
+    """Process-wide cache of the categories table with typed lookups"""
+    
+    _instances = {}
+    _instances_lock = threading.Lock()
+    
+    # Seconds before the table is read again, so edits made by other worker processes show up
+    MAX_AGE = 60.0
+    
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._snapshot = None
+        self._generation = 0
+    
+    @classmethod
+    def get(cls, db_path):
+        """Shared registry for a database file"""
+        key = os.path.abspath(db_path)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(db_path)
+            return cls._instances[key]
+    
+    @classmethod
+    def invalidate_path(cls, db_path):
+        """Drop the cached categories of a database file after a category write"""
+        registry = cls._instances.get(os.path.abspath(db_path))
+        if registry is not None:
+            registry.invalidate()
+    
+    def invalidate(self):
+        self._generation += 1
+        self._loaded_at = None
+    
+    def _load(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        # Older databases (and streamlit_app.py's schema) may lack the color and bucket columns
+        rows = [dict(row) for row in conn.execute("SELECT * FROM categories ORDER BY name")]
+        conn.close()
+        
+        by_type = {}
+        for row in rows:
+            by_type.setdefault(row['type'], []).append(row['name'])
+        
+        return {
+            'names': tuple(row['name'] for row in rows),
+            'by_type': {category_type: tuple(names) for category_type, names in by_type.items()},
+            'types': {row['name']: row['type'] for row in rows},
+            'colors': {row['name']: row.get('color') for row in rows},
+            'buckets': {row['name']: row.get('bucket') for row in rows}
+        }
+    
+    def snapshot(self):
+        """Current categories, reloading them if invalidated or older than MAX_AGE"""
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.MAX_AGE:
+            return self._snapshot
+        
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.MAX_AGE:
+                generation = self._generation
+                self._snapshot = self._load()
+                # An invalidation that raced with the load forces another one next time
+                if generation == self._generation:
+                    self._loaded_at = time.monotonic()
+            return self._snapshot
+    
+    def names(self, category_type=None):
+        """Sorted category names, optionally only 'income' or 'expense' ones"""
+        snapshot = self.snapshot()
+        if category_type is None:
+            return snapshot['names']
+        return snapshot['by_type'].get(category_type, ())
+    
+    def category_type(self, name):
+        """'income' or 'expense', or None for an unknown category"""
+        return self.snapshot()['types'].get(name)
+    
+    def color(self, name, default=None):
+        """Chart color of a category"""
+        return self.snapshot()['colors'].get(name) or default
+    
+    def bucket(self, name):
+        """50/30/20 bucket of a category, or None when unclassified"""
+        return self.snapshot()['buckets'].get(name)
+    
+    def buckets(self):
+        """Bucket of every classified category"""
+        return {name: bucket for name, bucket in self.snapshot()['buckets'].items() if bucket}
+    
+    def __contains__(self, name):
+        return name in self.snapshot()['types']
@@ -0,0 +1,133 @@
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+class SQLiteConnectionPool:
+    """Pooled read connections plus a single writer thread for one SQLite file.
+
+    Readers run concurrently on their own connections (WAL lets them read while a
+    write is in progress). All writes are queued to one writer thread, which
+    applies whatever has queued up in a single transaction; each job runs in its
+    own savepoint so a failing job does not undo the others.
+    """
+
+    # Most jobs the writer applies per commit
+    MAX_BATCH = 100
+
+    def __init__(self, db_path, max_idle_readers=8, busy_timeout=5.0):
+        self.db_path = db_path
+        self.max_idle_readers = max_idle_readers
+        self.busy_timeout = busy_timeout
+        self._idle_readers = queue.LifoQueue()
+        self._jobs = queue.Queue()
+        self._closed = False
+
+        self._writer_connection = sqlite3.connect(db_path, timeout=busy_timeout, isolation_level=None,
+                                                  check_same_thread=False)
+        self._writer_connection.execute('PRAGMA journal_mode = WAL')
+        self._writer = threading.Thread(target=self._write_loop, name='sqlite-writer', daemon=True)
+        self._writer.start()
+
+    def _connect_reader(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=False)
+        conn.execute('PRAGMA query_only = ON')
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """A read-only connection used by one thread at a time"""
+        try:
+            conn = self._idle_readers.get_nowait()
+        except queue.Empty:
+            conn = self._connect_reader()
+
+        try:
+            yield conn
+        finally:
+            # Leave no read transaction open, or the WAL can't be checkpointed
+            conn.rollback()
+            if self._closed or self._idle_readers.qsize() >= self.max_idle_readers:
+                conn.close()
+            else:
+                self._idle_readers.put(conn)
+
+    def read_sql(self, query, params=()):
+        """Run a SELECT on a pooled reader and return a DataFrame"""
+        import pandas as pd
+        with self.reader() as conn:
+            return pd.read_sql_query(query, conn, params=params)
+
+    def fetchall(self, query, params=()):
+        with self.reader() as conn:
+            return conn.execute(query, params).fetchall()
+
+    def submit(self, job):
+        """Queue job(conn) for the writer thread and return a Future of its result"""
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        future = Future()
+        self._jobs.put((job, future))
+        return future
+
+    def write(self, sql, params=()):
+        """Execute one write statement and wait for it to commit; returns lastrowid"""
+        return self.submit(lambda conn: conn.execute(sql, params).lastrowid).result()
+
+    def _write_loop(self):
+        conn = self._writer_connection
+        running = True
+        while running:
+            batch = [self._jobs.get()]
+            while len(batch) < self.MAX_BATCH:
+                try:
+                    batch.append(self._jobs.get_nowait())
+                except queue.Empty:
+                    break
+
+            if None in batch:
+                running = False
+                batch = [item for item in batch if item is not None]
+            if not batch:
+                continue
+
+            results = []
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                for job, future in batch:
+                    conn.execute('SAVEPOINT job')
+                    try:
+                        results.append((future, job(conn), None))
+                        conn.execute('RELEASE job')
+                    except Exception as e:
+                        conn.execute('ROLLBACK TO job')
+                        conn.execute('RELEASE job')
+                        results.append((future, None, e))
+                conn.execute('COMMIT')
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                results = [(future, None, e) for _, future in batch]
+
+            # Callers only see their result once the transaction is durable
+            for future, result, error in results:
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+
+        conn.close()
+
+    def close(self):
+        """Finish queued writes, stop the writer and close every connection"""
+        if self._closed:
+            return
+        self._closed = True
+        self._jobs.put(None)
+        self._writer.join()
+        while True:
+            try:
+                self._idle_readers.get_nowait().close()
+            except queue.Empty:
+                break
@@ -1,18 +1,48 @@
+import os
 import sqlite3
-import pandas as pd
+import sys
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
+from admin_metrics import AdminMetrics
+from category_registry import CategoryRegistry
+from session_tokens import SessionTokenStore
+
+# pandas is imported inside the methods that need it so that the login page,
+# which only looks up users, does not pay for importing it on cold start
+
+# Per-thread state of the job running on a worker thread; AsyncBudgetDatabase sets
+# `cancel_event` so connections opened by the job can be interrupted mid-query
+current_job = threading.local()
 
 class BudgetDatabase:
-    def __init__(self, db_path="budget_coach.db"):
-        self.db_path = db_path
+    # Column order of the rows add_transactions inserts
+    TRANSACTION_COLUMNS = ['date', 'description', 'amount', 'category', 'type', 'user_id']
+    
+    def __init__(self, db_path=None):
+        # DATABASE_PATH lets deployments and load tests point every component at one file
+        self.db_path = db_path or os.getenv('DATABASE_PATH', 'budget_coach.db')
         self.init_database()
     
+    def connect(self):
+        """Open a connection, interruptible when the current job gets cancelled"""
+        conn = sqlite3.connect(self.db_path)
+        cancel_event = getattr(current_job, 'cancel_event', None)
+        if cancel_event is not None:
+            # Checked every 1000 VM instructions; returning True aborts the statement
+            conn.set_progress_handler(cancel_event.is_set, 1000)
+        return conn
+    
     def init_database(self):
         """Initialize the database with required tables"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
+        # Lets maintenance return deleted pages to the OS in small steps; this only
+        # takes effect on a new, empty file (see MaintenanceScheduler for older ones)
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        
         # Create transactions table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS transactions (
@@ -74,6 +104,24 @@ class BudgetDatabase:
             # Column already exists
             pass
         
+        try:
+            # 50/30/20 bucket: 'needs', 'wants', 'savings' or NULL when unclassified
+            cursor.execute('ALTER TABLE categories ADD COLUMN bucket TEXT')
+        except sqlite3.OperationalError:
+            # Column already exists
+            pass
+        
+        try:
+            # Owner of the transaction (NULL for rows created before multi-user support)
+            cursor.execute('ALTER TABLE transactions ADD COLUMN user_id INTEGER')
+        except sqlite3.OperationalError:
+            # Column already exists
+            pass
+        
+        # Indexes for date-range listing and per-user history
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_user_date ON transactions (user_id, date)')
+        
         # Create user sessions table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS user_sessions (
@@ -86,74 +134,290 @@ class BudgetDatabase:
             )
         ''')
         
+        # Counters behind the admin statistics, kept current by triggers
+        AdminMetrics.install(cursor)
+        
+        # Signed session tokens that let returning browsers skip the password check
+        SessionTokenStore.install(cursor)
+        
+        # Write counters behind the API's ETags: 'all' changes on every write, 'shared' on
+        # writes to data not owned by one user and 'user:<id>' on that user's transactions
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS data_versions (
+                scope TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            )
+        ''')
+        
         # Insert default categories if they don't exist
         default_expense_categories = [
-            ('Housing', 'expense', '#ff7f0e'),
-            ('Transportation', 'expense', '#2ca02c'),
-            ('Food & Dining', 'expense', '#d62728'),
-            ('Entertainment', 'expense', '#9467bd'),
-            ('Shopping', 'expense', '#8c564b'),
-            ('Healthcare', 'expense', '#e377c2'),
-            ('Education', 'expense', '#7f7f7f'),
-            ('Utilities', 'expense', '#bcbd22'),
-            ('Other', 'expense', '#17becf')
+            ('Housing', 'expense', '#ff7f0e', 'needs'),
+            ('Transportation', 'expense', '#2ca02c', 'needs'),
+            ('Food & Dining', 'expense', '#d62728', 'needs'),
+            ('Entertainment', 'expense', '#9467bd', 'wants'),
+            ('Shopping', 'expense', '#8c564b', 'wants'),
+            ('Healthcare', 'expense', '#e377c2', 'needs'),
+            ('Education', 'expense', '#7f7f7f', None),
+            ('Utilities', 'expense', '#bcbd22', 'needs'),
+            ('Other', 'expense', '#17becf', 'wants')
         ]
         
         default_income_categories = [
-            ('Salary', 'income', '#2ca02c'),
-            ('Freelance', 'income', '#1f77b4'),
-            ('Investment', 'income', '#ff7f0e'),
-            ('Other Income', 'income', '#9467bd')
+            ('Salary', 'income', '#2ca02c', None),
+            ('Freelance', 'income', '#1f77b4', None),
+            ('Investment', 'income', '#ff7f0e', None),
+            ('Other Income', 'income', '#9467bd', None)
         ]
         
-        for category, cat_type, color in default_expense_categories + default_income_categories:
+        for category, cat_type, color, bucket in default_expense_categories + default_income_categories:
             cursor.execute('''
-                INSERT OR IGNORE INTO categories (name, type, color) 
-                VALUES (?, ?, ?)
-            ''', (category, cat_type, color))
+                INSERT OR IGNORE INTO categories (name, type, color, bucket) 
+                VALUES (?, ?, ?, ?)
+            ''', (category, cat_type, color, bucket))
+            
+            # Backfill buckets for databases created before the bucket column existed
+            if bucket:
+                cursor.execute('''
+                    UPDATE categories SET bucket = ? WHERE name = ? AND bucket IS NULL
+                ''', (bucket, category))
         
         conn.commit()
         conn.close()
+        CategoryRegistry.invalidate_path(self.db_path)
     
-    def add_transaction(self, date, description, amount, category, transaction_type):
-        """Add a new transaction to the database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO transactions (date, description, amount, category, type)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (date, description, amount, category, transaction_type))
+    @property
+    def categories(self):
+        """Process-wide cached categories (names by type, color and bucket by name)"""
+        return CategoryRegistry.get(self.db_path)
+    
+    def enable_wal(self):
+        """Switch the database file to write-ahead logging so several processes can share it"""
+        conn = self.connect()
+        # WAL is persistent, so every later connection (in any process) uses it
+        journal_mode = conn.execute('PRAGMA journal_mode = WAL').fetchone()[0]
+        conn.close()
+        return journal_mode
+    
+    @staticmethod
+    def _paced(progress, sleep):
+        """Backup progress callback that pauses between steps (the sleep argument of
+        Connection.backup only applies while the source is busy)"""
+        def step(status, remaining, total):
+            if progress is not None:
+                progress(status, remaining, total)
+            if remaining:
+                time.sleep(sleep)
+        return step
+    
+    def backup(self, target_path, pages=256, sleep=0.005, progress=None):
+        """Copy the live database to target_path `pages` pages at a time, sleeping between steps.
+        
+        In WAL mode the copy reads one pinned snapshot: writers are never blocked and
+        their commits do not restart it. In rollback-journal mode the lock is released
+        between steps, so a concurrent write restarts the copy from the first page.
+        """
+        source = self.connect()
+        target = sqlite3.connect(target_path)
+        try:
+            if source.execute('PRAGMA journal_mode').fetchone()[0] == 'wal':
+                source.execute('BEGIN')
+                source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+            source.backup(target, pages=pages, progress=self._paced(progress, sleep))
+            # A self-contained file, with no -wal/-shm companions to copy along
+            target.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            if source.in_transaction:
+                source.rollback()
+            target.close()
+            source.close()
+    
+    def restore_from(self, snapshot_path, pages=256, sleep=0.005):
+        """Replace the contents of the live database with a snapshot file"""
+        conn = self.connect()
+        live_versions = dict(conn.execute('SELECT scope, version FROM data_versions').fetchall())
+        source = sqlite3.connect(snapshot_path)
+        try:
+            # Writes through SQLite's locking, so open connections see the old or the new data
+            source.backup(conn, pages=pages, progress=self._paced(None, sleep))
+        finally:
+            source.close()
         
+        # The snapshot's counters are older than ones clients may hold ETags for,
+        # so move every counter past both to keep a stale ETag from matching
+        try:
+            restored_versions = dict(conn.execute('SELECT scope, version FROM data_versions').fetchall())
+        except sqlite3.OperationalError:
+            # Snapshot taken before the data_versions table existed
+            restored_versions = {}
+        conn.close()
+        self.init_database()
+        conn = self.connect()
+        conn.executemany('''
+            INSERT INTO data_versions (scope, version) VALUES (?, ?)
+            ON CONFLICT (scope) DO UPDATE SET version = excluded.version
+        ''', [(scope, max(live_versions.get(scope, 0), restored_versions.get(scope, 0)) + 1)
+              for scope in set(live_versions) | set(restored_versions)])
         conn.commit()
         conn.close()
+        
+        # Drop process-wide state cached from the replaced data. Achievements are only
+        # cached once their module has been loaded, so it is not imported just for this
+        SessionTokenStore.invalidate_path(self.db_path)
+        if 'achievements' in sys.modules:
+            sys.modules['achievements'].AchievementSystem.invalidate_path(self.db_path)
     
-    def get_transactions(self, start_date=None, end_date=None):
-        """Get transactions from the database"""
-        conn = sqlite3.connect(self.db_path)
+    @staticmethod
+    def bump_data_version(cursor, user_id=None):
+        """Count a write to a user's (or the shared) data, inside the writer's transaction"""
+        scope = 'shared' if user_id is None else f'user:{int(user_id)}'
+        cursor.executemany('''
+            INSERT INTO data_versions (scope, version) VALUES (?, 1)
+            ON CONFLICT (scope) DO UPDATE SET version = version + 1
+        ''', [('all',), (scope,)])
+    
+    def get_data_versions(self, scopes):
+        """Current write counter of each scope (0 if never written)"""
+        scopes = list(scopes)
+        conn = self.connect()
+        rows = conn.execute(
+            f"SELECT scope, version FROM data_versions WHERE scope IN ({', '.join('?' * len(scopes))})",
+            scopes
+        ).fetchall()
+        conn.close()
+        versions = dict.fromkeys(scopes, 0)
+        versions.update(rows)
+        return versions
+    
+    def add_transaction(self, date, description, amount, category, transaction_type, user_id=None):
+        """Add a new transaction to the database and return its id"""
+        return self.add_transactions([(date, description, amount, category, transaction_type, user_id)])[0]
+    
+    @classmethod
+    def _transaction_rows(cls, rows):
+        """Parameter tuples for add_transactions from tuples, dicts, a DataFrame or an Arrow table"""
+        if hasattr(rows, 'to_pandas'):
+            rows = rows.to_pandas()
+        
+        if hasattr(rows, 'columns'):
+            missing = [column for column in cls.TRANSACTION_COLUMNS[:5] if column not in rows.columns]
+            if missing:
+                raise ValueError(f"Transactions are missing columns: {missing}")
+            
+            import pandas as pd
+            columns = []
+            for column in cls.TRANSACTION_COLUMNS:
+                if column not in rows.columns:
+                    columns.append([None] * len(rows))
+                    continue
+                values = rows[column]
+                if column == 'date' and pd.api.types.is_datetime64_any_dtype(values):
+                    values = values.dt.strftime('%Y-%m-%d')
+                if column == 'user_id':
+                    # A user_id column with gaps arrives as floats; ids must stay integers
+                    values = values.astype('Int64')
+                if values.hasnans:
+                    values = values.astype(object).where(values.notna(), None)
+                # tolist() yields Python scalars, which sqlite3 can bind (numpy ones it cannot)
+                columns.append(values.tolist())
+            return list(zip(*columns))
+        
+        result = []
+        for row in rows:
+            if isinstance(row, dict):
+                row = tuple(row.get(column) for column in cls.TRANSACTION_COLUMNS)
+            elif len(row) == 5:
+                row = tuple(row) + (None,)
+            elif len(row) != 6:
+                raise ValueError("Transaction rows are (date, description, amount, category, type[, user_id])")
+            result.append(row)
+        return result
+    
+    def add_transactions(self, rows):
+        """Insert many transactions in a single database transaction and return their ids.
+        
+        `rows` may be (date, description, amount, category, type[, user_id]) tuples,
+        dicts keyed by column name, or a DataFrame / pyarrow Table with those columns.
+        """
+        rows = self._transaction_rows(rows)
+        if not rows:
+            return []
+        
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            # Holding the write lock from the start keeps the new ids contiguous
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.executemany('''
+                INSERT INTO transactions (date, description, amount, category, type, user_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', rows)
+            last_id = cursor.execute('SELECT last_insert_rowid()').fetchone()[0]
+            
+            # Dependent aggregates change once per batch, not once per row
+            for user_id in {row[5] for row in rows}:
+                self.bump_data_version(cursor, user_id)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
         
-        query = "SELECT * FROM transactions"
+        return list(range(last_id - len(rows) + 1, last_id + 1))
+    
+    @staticmethod
+    def _transaction_filters(start_date=None, end_date=None, user_id=None):
+        """WHERE clause and parameters shared by the transaction queries"""
+        conditions = []
         params = []
         
         if start_date and end_date:
-            query += " WHERE date BETWEEN ? AND ?"
-            params = [start_date, end_date]
+            conditions.append("date BETWEEN ? AND ?")
+            params += [start_date, end_date]
         elif start_date:
-            query += " WHERE date >= ?"
-            params = [start_date]
+            conditions.append("date >= ?")
+            params.append(start_date)
         elif end_date:
-            query += " WHERE date <= ?"
-            params = [end_date]
+            conditions.append("date <= ?")
+            params.append(end_date)
+        
+        if user_id is not None:
+            conditions.append("user_id = ?")
+            params.append(user_id)
+        
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        return where, params
+    
+    def get_transactions(self, start_date=None, end_date=None, user_id=None):
+        """Get transactions from the database"""
+        import pandas as pd
+        conn = self.connect()
         
-        query += " ORDER BY date DESC"
+        where, params = self._transaction_filters(start_date, end_date, user_id)
+        query = "SELECT * FROM transactions" + where + " ORDER BY date DESC"
         
         df = pd.read_sql_query(query, conn, params=params)
         conn.close()
         return df
     
+    def get_transactions_page(self, page=1, page_size=50, start_date=None, end_date=None, user_id=None):
+        """One page of transactions (newest first) and the total number of matching rows"""
+        import pandas as pd
+        conn = self.connect()
+        
+        where, params = self._transaction_filters(start_date, end_date, user_id)
+        total = conn.execute("SELECT COUNT(*) FROM transactions" + where, params).fetchone()[0]
+        df = pd.read_sql_query(
+            "SELECT * FROM transactions" + where + " ORDER BY date DESC, id DESC LIMIT ? OFFSET ?",
+            conn, params=params + [page_size, (page - 1) * page_size]
+        )
+        conn.close()
+        return df, total
+    
     def get_categories(self, category_type=None):
         """Get categories from the database"""
-        conn = sqlite3.connect(self.db_path)
+        import pandas as pd
+        conn = self.connect()
         
         if category_type:
             df = pd.read_sql_query(
@@ -166,11 +430,30 @@ class BudgetDatabase:
         conn.close()
         return df
     
+    def get_category_buckets(self):
+        """Get the 50/30/20 bucket of every classified category as a dict"""
+        return self.categories.buckets()
+    
+    def set_category_bucket(self, category, bucket):
+        """Assign a category to the 'needs', 'wants' or 'savings' bucket (None to unclassify)"""
+        if bucket not in ('needs', 'wants', 'savings', None):
+            raise ValueError(f"Unknown budget bucket: {bucket}")
+        
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("UPDATE categories SET bucket = ? WHERE name = ?", (bucket, category))
+        self.bump_data_version(cursor)
+        conn.commit()
+        conn.close()
+        CategoryRegistry.invalidate_path(self.db_path)
+    
     def delete_transaction(self, transaction_id):
         """Delete a transaction from the database"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM transactions WHERE id = ?", (transaction_id,))
+        cursor.execute("DELETE FROM transactions WHERE id = ? RETURNING user_id", (transaction_id,))
+        for (user_id,) in cursor.fetchall():
+            self.bump_data_version(cursor, user_id)
         conn.commit()
         conn.close()
     
@@ -182,8 +465,8 @@ class BudgetDatabase:
     
     def import_from_csv(self, filepath):
         """Import transactions from CSV"""
+        import pandas as pd
         df = pd.read_csv(filepath)
-        conn = sqlite3.connect(self.db_path)
         
         # Validate required columns
         required_columns = ['date', 'description', 'amount', 'category', 'type']
@@ -191,13 +474,11 @@ class BudgetDatabase:
             raise ValueError(f"CSV must contain columns: {required_columns}")
         
         # Insert data
-        df[required_columns].to_sql('transactions', conn, if_exists='append', index=False)
-        conn.close()
-        return len(df)
+        return len(self.add_transactions(df[required_columns]))
     
     def set_budget_target(self, category, monthly_target):
         """Set or update budget target for a category"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         # Check if target already exists for this category
@@ -216,28 +497,31 @@ class BudgetDatabase:
                 "INSERT INTO budget_targets (category, monthly_target) VALUES (?, ?)",
                 (category, monthly_target)
             )
+        self.bump_data_version(cursor)
         
         conn.commit()
         conn.close()
     
     def get_budget_targets(self):
         """Get all budget targets"""
-        conn = sqlite3.connect(self.db_path)
+        import pandas as pd
+        conn = self.connect()
         df = pd.read_sql_query("SELECT * FROM budget_targets ORDER BY category", conn)
         conn.close()
         return df
     
     def delete_budget_target(self, category):
         """Delete budget target for a category"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         cursor.execute("DELETE FROM budget_targets WHERE category = ?", (category,))
+        self.bump_data_version(cursor)
         conn.commit()
         conn.close()
     
     def create_user(self, email, name=None):
         """Create a new user or return existing user"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         # Check if user already exists
@@ -266,7 +550,7 @@ class BudgetDatabase:
     
     def get_user(self, email):
         """Get user by email (legacy method)"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
         user = cursor.fetchone()
@@ -275,7 +559,7 @@ class BudgetDatabase:
     
     def get_user_by_email(self, email):
         """Get user by email with dictionary format"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         cursor.execute("""
             SELECT id, email, name, password_hash, created_at, last_login, login_count, is_active 
@@ -299,7 +583,7 @@ class BudgetDatabase:
     
     def create_user_with_password(self, email, name, password_hash):
         """Create a new user with password authentication"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         try:
@@ -318,7 +602,7 @@ class BudgetDatabase:
     
     def update_user_login(self, user_id):
         """Update user login timestamp and count"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         cursor.execute('''
             UPDATE users 
@@ -330,7 +614,7 @@ class BudgetDatabase:
     
     def start_user_session(self, user_id):
         """Start a new user session"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO user_sessions (user_id) VALUES (?)
@@ -342,7 +626,7 @@ class BudgetDatabase:
     
     def update_session_activity(self, session_id):
         """Update session with page visit"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         cursor.execute('''
             UPDATE user_sessions 
@@ -352,29 +636,18 @@ class BudgetDatabase:
         conn.commit()
         conn.close()
     
+    @property
+    def admin_metrics(self):
+        return AdminMetrics(self)
+    
+    @property
+    def session_tokens(self):
+        """Process-wide session token store of this database file"""
+        return SessionTokenStore.get(self)
+    
     def get_user_stats(self):
         """Get user statistics for admin dashboard"""
-        conn = sqlite3.connect(self.db_path)
-        
-        # Total users
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM users")
-        total_users = cursor.fetchone()[0]
-        
-        # Active users (logged in within last 30 days)
-        cursor.execute('''
-            SELECT COUNT(*) FROM users 
-            WHERE last_login >= datetime('now', '-30 days')
-        ''')
-        active_users = cursor.fetchone()[0]
-        
-        # Total sessions
-        cursor.execute("SELECT COUNT(*) FROM user_sessions")
-        total_sessions = cursor.fetchone()[0]
-        
-        conn.close()
-        return {
-            'total_users': total_users,
-            'active_users': active_users,
-            'total_sessions': total_sessions
-        } 
\ No newline at end of file
+        stats = self.admin_metrics.overview()
+        # Active users (logged in or visiting within the last 30 days)
+        stats['active_users'] = self.admin_metrics.recent_active_users(30)
+        return stats
\ No newline at end of file
@@ -1,26 +1,23 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-import random
-import json
-import os
+from budget_classifier import BudgetClassifier
+from tips_repository import TipsRepository, DEFAULT_TIPS_PATH
 
 class FinancialAdvisor:
-    def __init__(self):
-        self.financial_tips = self.load_tips_from_json()
+    def __init__(self, category_buckets=None, tips_path=DEFAULT_TIPS_PATH):
+        self.tips_repository = TipsRepository.get(tips_path, self.get_fallback_tips())
+        self.classifier = BudgetClassifier(category_buckets)
+    
+    @property
+    def financial_tips(self):
+        """All loaded tips (served from the shared tips repository)"""
+        return list(self.tips_repository.tips_for())
     
     def load_tips_from_json(self):
         """Load financial tips from tips.json file"""
-        try:
-            if os.path.exists('tips.json'):
-                with open('tips.json', 'r') as f:
-                    data = json.load(f)
-                    return data.get('tips', [])
-            else:
-                # Fallback to embedded tips if JSON file doesn't exist
-                return self.get_fallback_tips()
-        except Exception as e:
-            print(f"Error loading tips from JSON: {e}")
-            return self.get_fallback_tips()
+        self.tips_repository.refresh()
+        return self.financial_tips
     
     def get_fallback_tips(self):
         """Fallback tips if JSON loading fails"""
@@ -37,11 +34,17 @@ class FinancialAdvisor:
             }
         ]
     
-    def get_random_tip(self):
-        """Get a random financial tip"""
-        return random.choice(self.financial_tips)
+    def get_random_tip(self, category=None, deck=None):
+        """Get a random financial tip (weighted), or the next tip of a session deck"""
+        if deck is not None:
+            return deck.next_tip()
+        return self.tips_repository.choose(category)
+    
+    def new_tip_deck(self, category=None):
+        """Non-repeating tip order for one user session"""
+        return self.tips_repository.new_deck(category)
     
-    def analyze_budget(self, transactions_df):
+    def analyze_budget(self, transactions_df, month=None):
         """Analyze spending patterns and provide advice"""
         if transactions_df.empty:
             return {
@@ -51,8 +54,8 @@ class FinancialAdvisor:
             }
         
         # Calculate monthly totals
-        current_month = datetime.now().strftime('%Y-%m')
-        monthly_data = transactions_df[transactions_df['date'].str.startswith(current_month)]
+        month = month or self.classifier.current_month()
+        monthly_data = transactions_df[self.classifier.month_keys(transactions_df['date']) == month]
         
         if monthly_data.empty:
             return {
@@ -61,8 +64,9 @@ class FinancialAdvisor:
                 "advice": []
             }
         
-        total_income = monthly_data[monthly_data['type'] == 'income']['amount'].sum()
-        total_expenses = monthly_data[monthly_data['type'] == 'expense']['amount'].sum()
+        summary = self.classifier.summarize(monthly_data).iloc[0]
+        total_income = summary['income']
+        total_expenses = summary['expenses']
         
         if total_income == 0:
             return {
@@ -72,14 +76,39 @@ class FinancialAdvisor:
             }
         
         # Calculate percentages
-        expense_ratio = total_expenses / total_income
-        remaining_ratio = 1 - expense_ratio
+        expense_ratio = summary['expense_ratio']
         
         # Analyze by category
         expense_by_category = (monthly_data[monthly_data['type'] == 'expense']
                               .groupby('category')['amount'].sum()
                               .sort_values(ascending=False))
         
+        top_category = expense_by_category.index[0] if not expense_by_category.empty else None
+        top_percentage = expense_by_category.iloc[0] / total_income if top_category else None
+        
+        advice = self.build_advice(
+            expense_ratio,
+            summary['needs_ratio'],
+            summary['wants_ratio'],
+            summary['savings_ratio'],
+            top_category,
+            top_percentage
+        )
+        
+        return {
+            "status": "success",
+            "total_income": total_income,
+            "total_expenses": total_expenses,
+            "savings_potential": total_income - total_expenses,
+            "expense_ratio": expense_ratio,
+            "needs_spending": summary['needs'],
+            "wants_spending": summary['wants'],
+            "advice": advice
+        }
+    
+    def build_advice(self, expense_ratio, needs_ratio, wants_ratio, savings_ratio,
+                     top_category=None, top_percentage=None, expense_ratio_change=None):
+        """Turn one month's ratio metrics into advice cards"""
         advice = []
         
         # Overall spending analysis
@@ -102,19 +131,8 @@ class FinancialAdvisor:
                 "message": f"Excellent! You're only spending {expense_ratio:.1%} of your income. Keep up the good work!"
             })
         
-        # 50/30/20 rule analysis
-        if not expense_by_category.empty:
-            needs_categories = ['Housing', 'Utilities', 'Food & Dining', 'Healthcare', 'Transportation']
-            wants_categories = ['Entertainment', 'Shopping', 'Other']
-            
-            needs_spending = sum(expense_by_category.get(cat, 0) for cat in needs_categories)
-            wants_spending = sum(expense_by_category.get(cat, 0) for cat in wants_categories)
-            
-            needs_ratio = needs_spending / total_income
-            wants_ratio = wants_spending / total_income
-            savings_ratio = remaining_ratio
-            
-            # 50/30/20 rule advice
+        # 50/30/20 rule analysis (only when there are expenses to split)
+        if top_category is not None:
             rule_advice = {
                 "type": "info",
                 "title": "50/30/20 Rule Analysis",
@@ -136,26 +154,97 @@ class FinancialAdvisor:
             advice.append(rule_advice)
         
         # Category-specific advice
-        if not expense_by_category.empty:
-            top_category = expense_by_category.index[0]
-            top_amount = expense_by_category.iloc[0]
-            top_percentage = top_amount / total_income
-            
-            if top_percentage > 0.3:
+        if top_category is not None and top_percentage > 0.3:
+            advice.append({
+                "type": "warning",
+                "title": f"High {top_category} Spending",
+                "message": f"Your {top_category.lower()} expenses are {top_percentage:.1%} of your income. Consider ways to reduce this category."
+            })
+        
+        # Month-over-month trend
+        if expense_ratio_change is not None and not pd.isna(expense_ratio_change):
+            if expense_ratio_change >= 0.05:
                 advice.append({
-                    "type": "warning",
-                    "title": f"High {top_category} Spending",
-                    "message": f"Your {top_category.lower()} expenses are {top_percentage:.1%} of your income. Consider ways to reduce this category."
+                    "type": "caution",
+                    "title": "Spending Trending Up",
+                    "message": f"Your spending grew by {expense_ratio_change:.1%} of your income compared with last month."
+                })
+            elif expense_ratio_change <= -0.05:
+                advice.append({
+                    "type": "success",
+                    "title": "Spending Trending Down",
+                    "message": f"You cut spending by {-expense_ratio_change:.1%} of your income compared with last month. Nice!"
                 })
         
-        return {
-            "status": "success",
-            "total_income": total_income,
-            "total_expenses": total_expenses,
-            "savings_potential": total_income - total_expenses,
-            "expense_ratio": expense_ratio,
-            "advice": advice
-        }
+        return advice
+    
+    def analyze_budget_batch(self, transactions_df, include_advice=False):
+        """Ratio metrics and advice codes for every (user, month) in one vectorized pass.
+        
+        Groups by ('user_id', 'month') when the frame has a user_id column, otherwise by month.
+        Set include_advice to also attach the advice cards for each row.
+        """
+        by = ['user_id', 'month'] if 'user_id' in transactions_df.columns else ['month']
+        summary = self.classifier.summarize(transactions_df, by=by)
+        
+        if summary.empty:
+            return summary
+        
+        # Largest expense category per group: sum into a (group x category) grid and take the row max
+        expenses = transactions_df[transactions_df['type'] == 'expense']
+        by_category = (expenses['amount'].astype(float)
+                       .groupby(self.classifier.group_keys(expenses, by) + [expenses['category']], observed=True)
+                       .sum()
+                       .unstack('category', fill_value=0.0))
+        grid = by_category.to_numpy()
+        top = pd.DataFrame({
+            'top_category': by_category.columns.to_numpy()[grid.argmax(axis=1)],
+            'top_amount': grid.max(axis=1)
+        }, index=by_category.index)
+        
+        summary = summary.join(top)
+        summary['top_category_ratio'] = summary.pop('top_amount') / summary['income'].where(summary['income'] > 0)
+        
+        has_income = (summary['income'] > 0).to_numpy()
+        ratio = summary['expense_ratio'].to_numpy()
+        
+        # Status columns are built as integer codes and stored as categoricals
+        summary['status'] = pd.Categorical.from_codes(
+            np.where(has_income, 0, 1), ['success', 'no_income'])
+        summary['spending_level'] = pd.Categorical.from_codes(
+            np.where(has_income, np.select([ratio > 0.8, ratio > 0.5], [0, 1], 2), -1),
+            ['warning', 'caution', 'success'])
+        summary['rule_status'] = pd.Categorical.from_codes(
+            np.where(has_income, np.select(
+                [summary['needs_ratio'] > 0.5, summary['wants_ratio'] > 0.3, summary['savings_ratio'] >= 0.2],
+                [0, 1, 2], 3), -1),
+            ['reduce_needs', 'reduce_wants', 'on_target', 'balanced'])
+        
+        # Month-over-month change, per user when users are present, against the previous
+        # calendar month only (a month without transactions in between leaves it empty)
+        summary = summary.sort_index()
+        months = summary.index.get_level_values('month').astype(str)
+        month_number = pd.Series(months.str[:4].astype(int) * 12 + months.str[5:7].astype(int), index=summary.index)
+        if 'user_id' in by:
+            previous_ratio = summary.groupby(level='user_id')['expense_ratio'].shift()
+            previous_month = month_number.groupby(level='user_id').shift()
+        else:
+            previous_ratio = summary['expense_ratio'].shift()
+            previous_month = month_number.shift()
+        summary['expense_ratio_change'] = (summary['expense_ratio'] - previous_ratio).where(
+            month_number - previous_month == 1)
+        
+        if include_advice:
+            summary['advice'] = [
+                self.build_advice(
+                    row.expense_ratio, row.needs_ratio, row.wants_ratio, row.savings_ratio,
+                    row.top_category if isinstance(row.top_category, str) else None,
+                    row.top_category_ratio, row.expense_ratio_change
+                ) if row.status == 'success' else []
+                for row in summary.itertuples()
+            ]
+        
+        return summary
     
     def get_savings_goals_advice(self, monthly_income, current_savings=0):
         """Provide savings goals advice"""
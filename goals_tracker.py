@@ -4,6 +4,39 @@ import plotly.graph_objects as go
 from datetime import datetime, date
 from database import BudgetDatabase
 import json
+import sqlite3
+import uuid
+import numpy as np
+
+# Average month length used to turn daily rates into monthly ones
+DAYS_PER_MONTH = 30.44
+
+# Contributions older than this do not count towards a goal's current velocity
+PROJECTION_WINDOW_DAYS = 90
+
+# Shortest span a velocity is averaged over
+MIN_VELOCITY_DAYS = 30
+
+STATUS_LABELS = {
+    'completed': '🎉 Completed',
+    'on_track': '✅ On track',
+    'behind': '⚠️ Behind',
+    'stalled': '💤 No recent contributions',
+    'overdue': '⏰ Overdue',
+    'no_deadline': '📅 No deadline'
+}
+
+# Goal cards rendered per page on the goals page
+GOALS_PER_PAGE = 10
+
+STATUS_COLORS = {
+    'completed': '#00C851',
+    'on_track': '#2196F3',
+    'behind': '#FF9800',
+    'stalled': '#9E9E9E',
+    'overdue': '#F44336',
+    'no_deadline': '#2196F3'
+}
 
 class SavingsGoalsTracker:
     def __init__(self, db):
@@ -13,8 +46,7 @@ class SavingsGoalsTracker:
     def init_goals_table(self):
         """Initialize the savings goals table in database"""
         conn = self.db.db_path
-        import sqlite3
-        conn = sqlite3.connect(self.db.db_path)
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -31,46 +63,126 @@ class SavingsGoalsTracker:
             )
         ''')
         
+        # Ledger of every amount added to a goal, the history projections are based on
+        has_ledger = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'goal_contributions'"
+        ).fetchone()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS goal_contributions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                goal_id INTEGER NOT NULL,
+                amount REAL NOT NULL,
+                contributed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                idempotency_key TEXT,
+                FOREIGN KEY (goal_id) REFERENCES savings_goals (id)
+            )
+        ''')
+        try:
+            # Client-chosen key that makes retried contributions apply once
+            cursor.execute('ALTER TABLE goal_contributions ADD COLUMN idempotency_key TEXT')
+        except sqlite3.OperationalError:
+            # Column already exists
+            pass
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_goal_contributions_goal
+            ON goal_contributions (goal_id, contributed_at, amount)
+        ''')
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_goal_contributions_key
+            ON goal_contributions (idempotency_key)
+        ''')
+        if not has_ledger:
+            self.record_opening_balances(cursor)
+        
         conn.commit()
         conn.close()
     
+    @staticmethod
+    def record_opening_balances(cursor, after_goal_id=0):
+        """Give goals saved into before the ledger existed one contribution dated at their creation"""
+        cursor.execute('''
+            INSERT INTO goal_contributions (goal_id, amount, contributed_at)
+            SELECT id, current_amount, COALESCE(created_at, CURRENT_TIMESTAMP) FROM savings_goals
+            WHERE id > ? AND current_amount > 0
+        ''', (after_goal_id,))
+    
     def add_goal(self, name, target_amount, target_date, category="General", emoji="🎯"):
         """Add a new savings goal"""
-        import sqlite3
-        conn = sqlite3.connect(self.db.db_path)
+        conn = self.db.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
             INSERT INTO savings_goals (name, target_amount, target_date, category, emoji)
             VALUES (?, ?, ?, ?, ?)
         ''', (name, target_amount, target_date, category, emoji))
+        self.db.bump_data_version(cursor)
         
         conn.commit()
         conn.close()
     
-    def update_goal_progress(self, goal_id, amount_to_add):
-        """Add money to a savings goal"""
-        import sqlite3
-        conn = sqlite3.connect(self.db.db_path)
-        cursor = conn.cursor()
+    def update_goal_progress(self, goal_id, amount_to_add, idempotency_key=None):
+        """Add money to a savings goal; returns 0 if the goal is gone or the key was already used"""
+        return self.add_contributions([(goal_id, amount_to_add, idempotency_key)])
+    
+    @staticmethod
+    def _contribution_rows(contributions):
+        rows = []
+        for contribution in contributions:
+            if isinstance(contribution, dict):
+                contribution = (contribution['goal_id'], contribution['amount'], contribution.get('idempotency_key'))
+            goal_id, amount, *key = contribution
+            rows.append((int(goal_id), float(amount), key[0] if key else None, int(goal_id)))
+        return rows
+    
+    def add_contributions(self, contributions):
+        """Apply many contributions in one transaction and return how many were applied.
         
-        cursor.execute('''
-            UPDATE savings_goals 
-            SET current_amount = current_amount + ?,
-                is_completed = CASE 
-                    WHEN current_amount + ? >= target_amount THEN TRUE 
-                    ELSE FALSE 
-                END
-            WHERE id = ?
-        ''', (amount_to_add, amount_to_add, goal_id))
+        `contributions` are (goal_id, amount[, idempotency_key]) tuples or dicts with
+        those keys. A contribution whose key is already in the ledger (from an
+        earlier call or earlier in the same batch) is skipped, as is one for a
+        deleted goal. Goal balances and is_completed are updated from the ledger
+        rows this call added, in the same transaction.
+        """
+        rows = self._contribution_rows(contributions)
+        if not rows:
+            return 0
         
-        conn.commit()
-        conn.close()
+        conn = self.db.connect()
+        cursor = conn.cursor()
+        try:
+            # Take the write lock up front: the ids read here bound this batch's rows
+            cursor.execute('BEGIN IMMEDIATE')
+            last_id = cursor.execute('SELECT COALESCE(MAX(id), 0) FROM goal_contributions').fetchone()[0]
+            cursor.executemany('''
+                INSERT INTO goal_contributions (goal_id, amount, idempotency_key)
+                SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM savings_goals WHERE id = ?)
+                ON CONFLICT (idempotency_key) DO NOTHING
+            ''', rows)
+            applied = cursor.execute('SELECT COUNT(*) FROM goal_contributions WHERE id > ?', (last_id,)).fetchone()[0]
+            
+            if applied:
+                cursor.execute('''
+                    UPDATE savings_goals
+                    SET current_amount = current_amount + added.amount,
+                        is_completed = current_amount + added.amount >= target_amount
+                    FROM (
+                        SELECT goal_id, SUM(amount) AS amount FROM goal_contributions
+                        WHERE id > ? GROUP BY goal_id
+                    ) AS added
+                    WHERE savings_goals.id = added.goal_id
+                ''', (last_id,))
+                self.db.bump_data_version(cursor)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return applied
     
     def get_goals(self):
         """Get all savings goals"""
-        import sqlite3
-        conn = sqlite3.connect(self.db.db_path)
+        conn = self.db.connect()
         df = pd.read_sql_query('''
             SELECT * FROM savings_goals 
             ORDER BY is_completed ASC, target_date ASC
@@ -80,42 +192,149 @@ class SavingsGoalsTracker:
     
     def delete_goal(self, goal_id):
         """Delete a savings goal"""
-        import sqlite3
-        conn = sqlite3.connect(self.db.db_path)
+        conn = self.db.connect()
         cursor = conn.cursor()
+        cursor.execute("DELETE FROM goal_contributions WHERE goal_id = ?", (goal_id,))
         cursor.execute("DELETE FROM savings_goals WHERE id = ?", (goal_id,))
+        self.db.bump_data_version(cursor)
         conn.commit()
         conn.close()
     
+    def get_contributions(self, goal_id=None):
+        """Contribution history, oldest first"""
+        conn = self.db.connect()
+        query = 'SELECT * FROM goal_contributions'
+        params = []
+        if goal_id is not None:
+            query += ' WHERE goal_id = ?'
+            params.append(goal_id)
+        df = pd.read_sql_query(query + ' ORDER BY contributed_at, id', conn, params=params)
+        conn.close()
+        return df
+    
+    def get_contribution_summary(self, window_start):
+        """Per goal: first contribution, total since window_start and number of contributions"""
+        conn = self.db.connect()
+        df = pd.read_sql_query('''
+            SELECT goal_id,
+                   MIN(contributed_at) AS first_contribution,
+                   SUM(CASE WHEN contributed_at >= ? THEN amount ELSE 0 END) AS recent_amount,
+                   COUNT(*) AS contributions
+            FROM goal_contributions
+            GROUP BY goal_id
+        ''', conn, params=[window_start])
+        conn.close()
+        return df
+    
+    def project(self, goals_df, as_of=None, window_days=PROJECTION_WINDOW_DAYS):
+        """Add velocity, ETA, required monthly rate and on-track status columns to goals_df.
+        
+        Velocity is the amount contributed over the last `window_days`, spread over
+        the part of the window since the goal's first contribution (at least
+        MIN_VELOCITY_DAYS, so one early deposit does not look like a monthly habit).
+        Everything is computed column-wise for all goals at once.
+        """
+        goals = goals_df.copy()
+        as_of = pd.Timestamp(as_of or date.today()).normalize()
+        window_start = as_of - pd.Timedelta(days=window_days)
+        
+        summary = self.get_contribution_summary(window_start.strftime('%Y-%m-%d')) if len(goals) else None
+        if summary is not None and not summary.empty:
+            goals = goals.merge(summary, left_on='id', right_on='goal_id', how='left').drop(columns='goal_id')
+        else:
+            goals['first_contribution'] = None
+            goals['recent_amount'] = 0.0
+            goals['contributions'] = 0
+        goals['recent_amount'] = goals['recent_amount'].fillna(0.0)
+        goals['contributions'] = goals['contributions'].fillna(0).astype(int)
+        
+        target = goals['target_amount'].astype(float)
+        current = goals['current_amount'].astype(float)
+        goals['remaining'] = (target - current).clip(lower=0)
+        goals['progress_pct'] = (current / target.where(target > 0) * 100).fillna(0.0)
+        
+        first = pd.to_datetime(goals['first_contribution'], format='mixed').dt.normalize()
+        observed_from = first.where(first > window_start, window_start)
+        span_days = (as_of - observed_from).dt.days.clip(lower=MIN_VELOCITY_DAYS)
+        daily_velocity = goals['recent_amount'] / span_days
+        goals['monthly_velocity'] = daily_velocity * DAYS_PER_MONTH
+        
+        eta_days = np.ceil(goals['remaining'] / daily_velocity.where(daily_velocity > 0))
+        goals['eta_date'] = as_of + pd.to_timedelta(eta_days, unit='D')
+        
+        target_date = pd.to_datetime(goals['target_date'], format='mixed', errors='coerce')
+        goals['days_to_target'] = (target_date - as_of).dt.days
+        months_left = goals['days_to_target'] / DAYS_PER_MONTH
+        # Past the deadline the whole remainder is due now
+        goals['required_monthly'] = (goals['remaining'] / months_left.where(months_left > 1, 1)).where(
+            target_date.notna())
+        
+        completed = goals['is_completed'].astype(bool) | (goals['remaining'] <= 0)
+        goals['status'] = np.select(
+            [completed, target_date.isna(), goals['days_to_target'] < 0, daily_velocity <= 0,
+             goals['eta_date'] <= target_date],
+            ['completed', 'no_deadline', 'overdue', 'stalled', 'on_track'],
+            default='behind'
+        )
+        
+        # Display columns, so cards and charts only format what they show
+        goals['days_left'] = self.days_left_labels(goals['days_to_target'])
+        goals['progress_bar'] = (goals['progress_pct'] / 100).clip(0, 1)
+        return goals
+    
+    def get_goals_with_projections(self, as_of=None):
+        """All goals with their projection and display columns (the goals page's view model)"""
+        return self.project(self.get_goals(), as_of)
+    
+    @staticmethod
+    def days_left_labels(days_to_target):
+        """calculate_days_left's labels for a whole column of day counts (NaN for no deadline)"""
+        days = pd.Series(days_to_target, dtype=float)
+        counts = days.fillna(0).astype(int).astype(str)
+        return np.select(
+            [days.isna(), days < 0, days == 0, days == 1],
+            ["📅 No deadline", "⏰ Overdue", "🎯 Today!", "📅 Tomorrow"],
+            default="📅 " + counts + " days left"
+        )
+    
     def create_progress_chart(self, goals_df):
         """Create a beautiful progress chart for all goals"""
         if goals_df.empty:
             return None
         
-        fig = go.Figure()
+        if 'status' not in goals_df:
+            goals_df = self.project(goals_df)
         
-        for _, goal in goals_df.iterrows():
-            progress = (goal['current_amount'] / goal['target_amount']) * 100
-            color = '#00C851' if goal['is_completed'] else '#2196F3'
-            
-            fig.add_trace(go.Bar(
-                name=f"{goal['emoji']} {goal['name']}",
-                x=[goal['name']],
-                y=[progress],
-                text=f"${goal['current_amount']:,.0f} / ${goal['target_amount']:,.0f}",
-                textposition='auto',
-                marker_color=color,
-                hovertemplate=f"<b>{goal['name']}</b><br>" +
-                             f"Progress: {progress:.1f}%<br>" +
-                             f"Current: ${goal['current_amount']:,.2f}<br>" +
-                             f"Target: ${goal['target_amount']:,.2f}<br>" +
-                             f"Remaining: ${goal['target_amount'] - goal['current_amount']:,.2f}<extra></extra>"
-            ))
+        # One trace for every goal; positions keep goals that share a name apart
+        positions = np.arange(len(goals_df))
+        customdata = np.column_stack([
+            goals_df['name'].to_numpy(dtype=object),
+            goals_df['current_amount'].to_numpy(dtype=float),
+            goals_df['target_amount'].to_numpy(dtype=float),
+            goals_df['remaining'].to_numpy(dtype=float),
+            goals_df['status'].map(STATUS_LABELS).to_numpy(dtype=object)
+        ])
+        fig = go.Figure(go.Bar(
+            x=positions,
+            y=goals_df['progress_pct'].to_numpy(),
+            customdata=customdata,
+            texttemplate="$%{customdata[1]:,.0f} / $%{customdata[2]:,.0f}",
+            textposition='auto',
+            marker_color=goals_df['status'].map(STATUS_COLORS).to_numpy(dtype=object),
+            hovertemplate="<b>%{customdata[0]}</b><br>" +
+                          "Progress: %{y:.1f}%<br>" +
+                          "Current: $%{customdata[1]:,.2f}<br>" +
+                          "Target: $%{customdata[2]:,.2f}<br>" +
+                          "Remaining: $%{customdata[3]:,.2f}<br>" +
+                          "%{customdata[4]}<extra></extra>"
+        ))
         
         fig.update_layout(
             title="🎯 Savings Goals Progress",
             xaxis_title="Goals",
             yaxis_title="Progress (%)",
+            xaxis=dict(tickmode='array', tickvals=positions,
+                       ticktext=(goals_df['emoji'] + ' ' + goals_df['name']).to_numpy(dtype=object)),
             yaxis=dict(range=[0, 100]),
             showlegend=False,
             height=400,
@@ -125,15 +344,25 @@ class SavingsGoalsTracker:
         
         return fig
     
-    def create_goal_cards(self, goals_df):
-        """Create beautiful cards for each goal"""
+    def create_goal_cards(self, goals_df, page_size=GOALS_PER_PAGE):
+        """Create beautiful cards for each goal, page_size cards at a time"""
         if goals_df.empty:
             st.info("🎯 No savings goals yet! Create your first goal to start saving with purpose.")
             return
         
-        for _, goal in goals_df.iterrows():
-            progress = (goal['current_amount'] / goal['target_amount']) * 100
-            days_left = self.calculate_days_left(goal['target_date'])
+        if 'status' not in goals_df:
+            goals_df = self.project(goals_df)
+        
+        pages = -(-len(goals_df) // page_size)
+        page = 1
+        if pages > 1:
+            page = st.number_input("Page", min_value=1, max_value=pages, value=1, key='goal_cards_page')
+            first = (page - 1) * page_size
+            st.caption(f"Showing goals {first + 1}–{min(first + page_size, len(goals_df))} of {len(goals_df)}")
+        
+        for goal in goals_df.iloc[(page - 1) * page_size:page * page_size].to_dict('records'):
+            progress = goal['progress_pct']
+            days_left = goal['days_left']
             
             # Create card container
             with st.container():
@@ -144,25 +373,26 @@ class SavingsGoalsTracker:
                                unsafe_allow_html=True)
                 
                 with col2:
-                    status = "🎉 COMPLETED!" if goal['is_completed'] else f"📅 {days_left}"
+                    status = "🎉 COMPLETED!" if goal['is_completed'] else days_left
                     st.markdown(f"**{goal['name']}**")
                     st.markdown(f"*{goal['category']} • {status}*")
                     
                     # Progress bar
-                    st.progress(min(progress / 100, 1.0))
+                    st.progress(goal['progress_bar'])
                     st.markdown(f"${goal['current_amount']:,.0f} / ${goal['target_amount']:,.0f} ({progress:.1f}%)")
                 
                 with col3:
-                    remaining = goal['target_amount'] - goal['current_amount']
+                    remaining = goal['remaining']
                     if not goal['is_completed']:
                         st.markdown(f"**${remaining:,.0f}** to go!")
+                        st.caption(self.describe_projection(goal))
                         
                         # Quick add buttons
                         quick_amounts = [10, 25, 50, 100]
                         cols = st.columns(len(quick_amounts))
                         for i, amount in enumerate(quick_amounts):
                             if cols[i].button(f"+${amount}", key=f"add_{goal['id']}_{amount}"):
-                                self.update_goal_progress(goal['id'], amount)
+                                self.quick_add(goal['id'], amount)
                                 st.rerun()
                     else:
                         st.success("🎉 Goal Achieved!")
@@ -174,6 +404,30 @@ class SavingsGoalsTracker:
                 
                 st.markdown("---")
     
+    def quick_add(self, goal_id, amount):
+        """Apply a quick-add click at most once.
+        
+        The key comes from a token kept in session state, which only changes after
+        a click has been applied. If a rerun interrupts the script between the
+        commit and the token change, the replayed click reuses the key and is skipped.
+        """
+        token = st.session_state.setdefault('goal_contribution_token', uuid.uuid4().hex)
+        applied = self.update_goal_progress(goal_id, amount, idempotency_key=f"{token}:{goal_id}:{amount}")
+        st.session_state['goal_contribution_token'] = uuid.uuid4().hex
+        return applied
+    
+    @staticmethod
+    def describe_projection(goal):
+        """One-line summary of a projected goal row for its card"""
+        parts = [STATUS_LABELS[goal['status']]]
+        if goal['monthly_velocity'] > 0:
+            parts.append(f"saving ${goal['monthly_velocity']:,.0f}/month")
+        if pd.notna(goal['eta_date']):
+            parts.append(f"done by {goal['eta_date']:%b %Y}")
+        if goal['status'] in ('behind', 'stalled', 'overdue') and pd.notna(goal['required_monthly']):
+            parts.append(f"needs ${goal['required_monthly']:,.0f}/month")
+        return ' • '.join(parts)
+    
     def calculate_days_left(self, target_date_str):
         """Calculate days remaining until target date"""
         try:
@@ -201,7 +455,7 @@ class SavingsGoalsTracker:
         with col1:
             goal_name = st.text_input("Goal Name", placeholder="e.g., Vacation to Hawaii")
             target_amount = st.number_input("Target Amount ($)", min_value=1.0, step=50.0, format="%.2f")
-            
+        
         with col2:
             target_date = st.date_input("Target Date", value=date.today())
             
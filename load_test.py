@@ -0,0 +1,337 @@
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import tempfile
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+APP_PATH = str(Path(__file__).with_name('app.py'))
+
+LOAD_TEST_PASSWORD = 'loadtest123'
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+def percentiles(values, points=(50, 90, 95, 99)):
+    """Nearest-rank percentiles (plus max) of a list of seconds, in milliseconds"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    result = {f"p{p}": ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000 for p in points}
+    result['max'] = ordered[-1] * 1000
+    return result
+
+def rss_bytes():
+    """Current resident set size of this process"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # Peak RSS is the best portable fallback (KiB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+class SQLiteStats:
+    """Process-wide timing of SQLite writes and commits, where sessions queue for the database lock"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.write_seconds = []
+        self.locked_errors = 0
+        self._original_connect = None
+    
+    def timed(self, method, *args):
+        # Includes the busy-handler wait while another connection holds the write lock
+        start = time.perf_counter()
+        locked = False
+        try:
+            return method(*args)
+        except sqlite3.OperationalError as e:
+            locked = 'locked' in str(e)
+            raise
+        finally:
+            with self.lock:
+                self.write_seconds.append(time.perf_counter() - start)
+                self.locked_errors += locked
+    
+    def install(self):
+        """Route sqlite3.connect through timed connections for the duration of the run"""
+        stats = self
+        
+        class TimedCursor(sqlite3.Cursor):
+            def execute(self, sql, *args):
+                if sql.lstrip().upper().startswith(WRITE_STATEMENTS):
+                    return stats.timed(super().execute, sql, *args)
+                return super().execute(sql, *args)
+        
+        class TimedConnection(sqlite3.Connection):
+            def cursor(self, factory=TimedCursor):
+                return super().cursor(factory)
+            
+            def execute(self, sql, *args):
+                return self.cursor().execute(sql, *args)
+            
+            def commit(self):
+                return stats.timed(super().commit)
+        
+        original_connect = self._original_connect = sqlite3.connect
+        
+        def connect(*args, **kwargs):
+            kwargs.setdefault('factory', TimedConnection)
+            return original_connect(*args, **kwargs)
+        
+        sqlite3.connect = connect
+    
+    def uninstall(self):
+        if self._original_connect is not None:
+            sqlite3.connect = self._original_connect
+            self._original_connect = None
+
+class LoadTest:
+    """Drive N concurrent virtual users through app.py with Streamlit's AppTest, fully offline.
+    
+    AppTest installs a process-global runtime for each rerun, so reruns within one
+    process are serialized (as the GIL largely does for a real server) and the time a
+    session waits for its turn is reported as queue wait. `processes` spreads the
+    sessions over worker processes sharing one database to exercise SQLite locking.
+    """
+    
+    PAGES = {
+        'dashboard': "📊 Dashboard",
+        'add_transaction': "➕ Add Transaction",
+        'analytics': "📈 Analytics",
+        'goals': "🎯 Savings Goals"
+    }
+    
+    def __init__(self, users=10, iterations=3, processes=1, db_path=None, background_users=0, timeout=60):
+        self.users = users
+        self.iterations = iterations
+        self.processes = max(1, min(processes, users))
+        self.db_path = db_path or os.path.join(tempfile.mkdtemp(prefix='budget_coach_load_'), 'load_test.db')
+        self.background_users = background_users
+        self.timeout = timeout
+        self.timings = []
+        self.errors = []
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+    
+    def config(self):
+        return {'users': self.users, 'iterations': self.iterations, 'processes': self.processes,
+                'db_path': self.db_path, 'timeout': self.timeout}
+    
+    def email(self, index):
+        return f"loadtest{index}@example.com"
+    
+    def prepare_database(self):
+        """Create the virtual users' accounts, plus optional synthetic history for realism"""
+        from auth import AuthManager
+        from database import BudgetDatabase
+        
+        db = BudgetDatabase(self.db_path)
+        if self.background_users:
+            from synthetic_data import SyntheticDataGenerator
+            SyntheticDataGenerator(n_users=self.background_users, years=1).load(db)
+        
+        # One PBKDF2 hash shared by every account keeps setup fast
+        password_hash = AuthManager.hash_password(LOAD_TEST_PASSWORD)
+        # The extra accounts are used by each worker's warm-up session
+        for index in range(self.users + self.processes):
+            if not db.get_user_by_email(self.email(index)):
+                db.create_user_with_password(self.email(index), f"Load Tester {index}", password_hash)
+        return db
+    
+    def _run(self, at, step):
+        """One rerun of the session, timed and checked for uncaught exceptions"""
+        queued = time.perf_counter()
+        with self._run_lock:
+            start = time.perf_counter()
+            at.run()
+            finished = time.perf_counter()
+        
+        with self._lock:
+            self.timings.append((step, start - queued, finished - start))
+            for exception in at.exception:
+                self.errors.append((step, exception.value))
+    
+    def _open_page(self, at, step):
+        # The page selectbox's index follows st.session_state.page, so a selection made
+        # right after another page change can be dropped; pick it again like a user would
+        for _ in range(2):
+            [selectbox for selectbox in at.sidebar.selectbox if selectbox.label == "Choose a page:"][0].select(self.PAGES[step])
+            self._run(at, step)
+            if at.session_state['page'] == self.PAGES[step]:
+                return
+        raise RuntimeError(f"Could not navigate to {self.PAGES[step]}")
+    
+    def run_user(self, index, iterations, start_barrier=None):
+        """Login, then dashboard -> add transaction -> analytics -> goals, `iterations` times"""
+        from streamlit.testing.v1 import AppTest
+        
+        at = AppTest.from_file(APP_PATH, default_timeout=self.timeout)
+        if start_barrier is not None:
+            start_barrier.wait()
+        
+        try:
+            self._run(at, 'login_page')
+            at.text_input(key='login_email').input(self.email(index))
+            at.text_input(key='login_password').input(LOAD_TEST_PASSWORD)
+            [button for button in at.button if button.label == "🚀 Sign In"][0].click()
+            self._run(at, 'login')
+            
+            for iteration in range(iterations):
+                self._open_page(at, 'dashboard')
+                
+                self._open_page(at, 'add_transaction')
+                [text for text in at.text_input if text.label == "Description"][0].input(f"Load test {index}-{iteration}")
+                [button for button in at.button if button.label == "💾 Add Transaction"][0].click()
+                self._run(at, 'submit_transaction')
+                
+                self._open_page(at, 'analytics')
+                self._open_page(at, 'goals')
+        except Exception as e:
+            with self._lock:
+                self.errors.append(('flow', repr(e)))
+        return at
+    
+    def run_worker(self, worker, start_barrier=None):
+        """Run this worker's share of the virtual users concurrently in threads"""
+        os.environ['DATABASE_PATH'] = self.db_path
+        indexes = list(range(worker, self.users, self.processes))
+        
+        # Warm up imports and cached resources so memory growth reflects sessions only
+        self.run_user(self.users + worker, 1)
+        self.timings = []
+        rss_before = rss_bytes()
+        
+        sqlite_stats = SQLiteStats()
+        sqlite_stats.install()
+        try:
+            if start_barrier is not None:
+                start_barrier.wait()
+            started = time.time()
+            session_barrier = threading.Barrier(len(indexes))
+            with ThreadPoolExecutor(max_workers=len(indexes)) as pool:
+                sessions = list(pool.map(lambda index: self.run_user(index, self.iterations, session_barrier), indexes))
+            finished = time.time()
+        finally:
+            sqlite_stats.uninstall()
+        
+        # Sessions are still referenced here, so their state counts towards RSS
+        memory_growth = rss_bytes() - rss_before
+        del sessions
+        
+        return {
+            'started': started,
+            'finished': finished,
+            'sessions': len(indexes),
+            'memory_growth': memory_growth,
+            'timings': self.timings,
+            'errors': self.errors,
+            'write_seconds': sqlite_stats.write_seconds,
+            'locked_errors': sqlite_stats.locked_errors
+        }
+    
+    def run(self):
+        """Run every virtual user and return the report"""
+        previous_path = os.environ.get('DATABASE_PATH')
+        self.prepare_database()
+        
+        try:
+            if self.processes == 1:
+                results = [self.run_worker(0)]
+            else:
+                # Spawned workers avoid forking the Streamlit and SQLite state of this process
+                context = multiprocessing.get_context('spawn')
+                barrier = context.Manager().Barrier(self.processes)
+                with ProcessPoolExecutor(self.processes, mp_context=context) as pool:
+                    futures = [pool.submit(_run_worker, self.config(), worker, barrier) for worker in range(self.processes)]
+                    results = [future.result() for future in futures]
+        finally:
+            if previous_path is None:
+                os.environ.pop('DATABASE_PATH', None)
+            else:
+                os.environ['DATABASE_PATH'] = previous_path
+        
+        return self.report(results)
+    
+    def report(self, results):
+        timings = [timing for result in results for timing in result['timings']]
+        write_seconds = [seconds for result in results for seconds in result['write_seconds']]
+        wall_seconds = max(result['finished'] for result in results) - min(result['started'] for result in results)
+        
+        by_step = {}
+        for step, wait, run in timings:
+            by_step.setdefault(step, []).append(wait + run)
+        
+        return {
+            'users': self.users,
+            'iterations': self.iterations,
+            'processes': self.processes,
+            'wall_s': wall_seconds,
+            'reruns': len(timings),
+            'throughput_reruns_per_s': len(timings) / wall_seconds if wall_seconds else 0.0,
+            'flows_per_s': self.users * self.iterations / wall_seconds if wall_seconds else 0.0,
+            'latency_ms': percentiles([wait + run for _, wait, run in timings]),
+            'queue_wait_ms': percentiles([wait for _, wait, _ in timings]),
+            'run_ms': percentiles([run for _, _, run in timings]),
+            'latency_by_step_ms': {step: percentiles(values) for step, values in by_step.items()},
+            'sqlite': {
+                'writes': len(write_seconds),
+                'total_wait_s': sum(write_seconds),
+                'locked_errors': sum(result['locked_errors'] for result in results),
+                'latency_ms': percentiles(write_seconds)
+            },
+            'memory_per_session_mb': sum(result['memory_growth'] for result in results) / self.users / 2 ** 20,
+            'errors': [f"{step}: {error}" for result in results for step, error in result['errors']]
+        }
+
+def _run_worker(config, worker, start_barrier):
+    """Entry point of a worker process"""
+    return LoadTest(**config).run_worker(worker, start_barrier)
+
+def print_report(report):
+    print(f"👥 {report['users']} users x {report['iterations']} iterations on {report['processes']} process(es) "
+          f"in {report['wall_s']:.1f}s")
+    print(f"🚀 {report['throughput_reruns_per_s']:.1f} reruns/s, {report['flows_per_s']:.2f} flows/s")
+    print("⏱️ Rerun latency (ms):")
+    rows = [('all', report['latency_ms']), ('  queue wait', report['queue_wait_ms']), ('  script run', report['run_ms'])]
+    for step, stats in rows + list(report['latency_by_step_ms'].items()):
+        print(f"   {step:<20}" + "  ".join(f"{name} {value:8.1f}" for name, value in stats.items()))
+    sqlite_report = report['sqlite']
+    print(f"🔒 SQLite: {sqlite_report['writes']} writes/commits, {sqlite_report['total_wait_s']:.2f}s total, "
+          f"{sqlite_report['locked_errors']} 'database is locked' errors")
+    if sqlite_report['latency_ms']:
+        print("   " + "  ".join(f"{name} {value:.1f}" for name, value in sqlite_report['latency_ms'].items()))
+    print(f"🧠 Memory: {report['memory_per_session_mb']:.2f} MB per session")
+    print(f"❌ Errors: {len(report['errors'])}")
+    for error in report['errors'][:10]:
+        print(f"   {error}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test of app.py with concurrent virtual users")
+    parser.add_argument('--users', type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument('--iterations', type=int, default=3, help="Dashboard/add/analytics/goals loops per user")
+    parser.add_argument('--processes', type=int, default=1, help="Worker processes sharing the database")
+    parser.add_argument('--db', default=None, help="Database file (defaults to a fresh temporary file)")
+    parser.add_argument('--background-users', type=int, default=0, help="Synthetic users to preload for realistic table sizes")
+    parser.add_argument('--timeout', type=float, default=60, help="Seconds allowed per rerun")
+    parser.add_argument('--json', default=None, help="Also write the report to this JSON file")
+    args = parser.parse_args(argv)
+    
+    report = LoadTest(
+        users=args.users, iterations=args.iterations, processes=args.processes, db_path=args.db,
+        background_users=args.background_users, timeout=args.timeout
+    ).run()
+    
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from database import BudgetDatabase
+
+class MaintenanceScheduler:
+    """Keeps the database file compact and its query statistics fresh while the app runs.
+    
+    Work starts only after no write has been committed for `idle_after` seconds.
+    Every step is short and takes locks briefly: PRAGMA optimize, incremental_vacuum
+    in batches of `vacuum_pages` pages, a passive WAL checkpoint (a truncating
+    one once the WAL grows past `wal_limit` bytes) and deleting expired session
+    tokens. Timings and file sizes of each run go to the maintenance_log table,
+    so growth can be followed over time.
+    """
+    
+    TASKS = ('optimize', 'incremental_vacuum', 'checkpoint', 'expire_tokens')
+    
+    AUTO_VACUUM_MODES = {0: 'none', 1: 'full', 2: 'incremental'}
+    
+    def __init__(self, db=None, interval=300.0, idle_after=30.0, vacuum_pages=256, max_vacuum_seconds=5.0,
+                 wal_limit=64 * 1024 * 1024, busy_timeout=0.1, quiet=False):
+        self.db = db if isinstance(db, BudgetDatabase) else BudgetDatabase(db)
+        self.interval = interval
+        self.idle_after = idle_after
+        self.vacuum_pages = vacuum_pages
+        self.max_vacuum_seconds = max_vacuum_seconds
+        self.wal_limit = wal_limit
+        self.busy_timeout = busy_timeout
+        self.quiet = quiet
+        self._last_version = None
+        self._watch_conn = None
+        self._last_write_at = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+        self.init_log_table()
+    
+    def log(self, message):
+        if not self.quiet:
+            print(message)
+    
+    def init_log_table(self):
+        conn = self.db.connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS maintenance_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ran_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                task TEXT NOT NULL,
+                seconds REAL NOT NULL,
+                result TEXT,
+                db_bytes INTEGER,
+                wal_bytes INTEGER,
+                free_pages INTEGER
+            )
+        ''')
+        conn.commit()
+        conn.close()
+    
+    def _connect(self):
+        # Autocommit, and give up quickly instead of queueing behind the app's writers
+        return sqlite3.connect(self.db.db_path, timeout=self.busy_timeout, isolation_level=None)
+    
+    def storage_stats(self, conn=None):
+        """File sizes and page counts of the database"""
+        own_connection = conn is None
+        conn = conn or self._connect()
+        try:
+            stats = {
+                'page_size': conn.execute('PRAGMA page_size').fetchone()[0],
+                'page_count': conn.execute('PRAGMA page_count').fetchone()[0],
+                'free_pages': conn.execute('PRAGMA freelist_count').fetchone()[0],
+                'auto_vacuum': self.AUTO_VACUUM_MODES[conn.execute('PRAGMA auto_vacuum').fetchone()[0]],
+                'journal_mode': conn.execute('PRAGMA journal_mode').fetchone()[0]
+            }
+        finally:
+            if own_connection:
+                conn.close()
+        wal_path = self.db.db_path + '-wal'
+        stats['db_bytes'] = os.path.getsize(self.db.db_path)
+        stats['wal_bytes'] = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+        return stats
+    
+    def _data_version(self):
+        # PRAGMA data_version changes whenever another connection commits, whatever
+        # table it writes, but only as seen from one connection kept open throughout
+        if self._watch_conn is None:
+            self._watch_conn = sqlite3.connect(self.db.db_path, isolation_level=None, check_same_thread=False)
+        return self._watch_conn.execute('PRAGMA data_version').fetchone()[0]
+    
+    def is_idle(self):
+        """True once no write has been committed for `idle_after` seconds"""
+        version = self._data_version()
+        if version != self._last_version:
+            self._last_version = version
+            self._last_write_at = time.monotonic()
+        return time.monotonic() - self._last_write_at >= self.idle_after
+    
+    # Tasks
+    
+    def optimize(self, conn):
+        """Refresh planner statistics: an ANALYZE the first time, then PRAGMA optimize"""
+        has_stats = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()
+        # Bounds the rows each ANALYZE (including the first, full one) may read per index
+        conn.execute('PRAGMA analysis_limit = 1000')
+        if not has_stats:
+            conn.execute('ANALYZE')
+            return 'analyzed'
+        conn.execute('PRAGMA optimize')
+        return 'optimized'
+    
+    def incremental_vacuum(self, conn):
+        """Release free pages back to the file system, `vacuum_pages` at a time"""
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            return 'skipped: auto_vacuum is not incremental'
+        
+        released = 0
+        deadline = time.monotonic() + self.max_vacuum_seconds
+        while time.monotonic() < deadline:
+            free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if not free_pages:
+                break
+            # One short write transaction per batch. execute() would step the pragma once,
+            # which frees a single page; executescript() runs it to completion
+            conn.executescript(f'PRAGMA incremental_vacuum({self.vacuum_pages})')
+            released += min(free_pages, self.vacuum_pages)
+            time.sleep(0.001)
+        return f'released {released} pages'
+    
+    def checkpoint(self, conn):
+        """Copy the WAL into the database; truncate the WAL file once it is over wal_limit"""
+        if conn.execute('PRAGMA journal_mode').fetchone()[0] != 'wal':
+            return 'skipped: not in WAL mode'
+        wal_path = self.db.db_path + '-wal'
+        wal_bytes = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+        mode = 'TRUNCATE' if wal_bytes > self.wal_limit else 'PASSIVE'
+        busy, log_frames, checkpointed = conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone()
+        return f"{mode.lower()}: {checkpointed}/{log_frames} frames{' (readers active)' if busy else ''}"
+    
+    def expire_tokens(self, conn):
+        """Delete expired session tokens in one statement; the next run's vacuum releases their pages"""
+        return f'deleted {self.db.session_tokens.purge_expired(conn)} tokens'
+    
+    def run_once(self, force=False):
+        """Run every task if the database is idle (or `force`); returns their results"""
+        if not force and not self.is_idle():
+            return None
+        
+        conn = self._connect()
+        results = []
+        try:
+            for task in self.TASKS:
+                start = time.perf_counter()
+                try:
+                    result = getattr(self, task)(conn)
+                except sqlite3.OperationalError as e:
+                    # Busy or locked: traffic picked up, try again next round
+                    result = f'skipped: {e}'
+                stats = self.storage_stats(conn)
+                results.append({'task': task, 'seconds': time.perf_counter() - start, 'result': result,
+                                'db_bytes': stats['db_bytes'], 'wal_bytes': stats['wal_bytes'],
+                                'free_pages': stats['free_pages']})
+        finally:
+            conn.close()
+        
+        conn = self.db.connect()
+        conn.executemany('''
+            INSERT INTO maintenance_log (task, seconds, result, db_bytes, wal_bytes, free_pages)
+            VALUES (:task, :seconds, :result, :db_bytes, :wal_bytes, :free_pages)
+        ''', results)
+        conn.commit()
+        conn.close()
+        
+        # Our own writes (vacuum, token expiry, the log above) are not traffic
+        self._last_version = self._data_version()
+        
+        for row in results:
+            self.log(f"🧹 {row['task']}: {row['result']} in {row['seconds'] * 1000:.0f}ms")
+        return results
+    
+    def enable_incremental_vacuum(self):
+        """Switch an existing database to incremental auto_vacuum.
+        
+        This needs one full VACUUM, which rewrites the whole file and blocks writers
+        while it runs, so do it during downtime.
+        """
+        conn = sqlite3.connect(self.db.db_path, isolation_level=None)
+        try:
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+        finally:
+            conn.close()
+        return self.storage_stats()
+    
+    def history(self, limit=50):
+        """Most recent maintenance_log rows, oldest first"""
+        import pandas as pd
+        conn = self.db.connect()
+        df = pd.read_sql_query('SELECT * FROM maintenance_log ORDER BY id DESC LIMIT ?', conn, params=[limit])
+        conn.close()
+        return df.iloc[::-1].reset_index(drop=True)
+    
+    def report(self, limit=50):
+        """Print recent task timings and how the file sizes moved over that period"""
+        df = self.history(limit)
+        if df.empty:
+            print("No maintenance runs recorded yet")
+            return df
+        
+        print(f"{'ran at':<20} {'task':<19} {'ms':>8} {'db MB':>8} {'wal MB':>8} {'free':>7}  result")
+        for row in df.itertuples():
+            print(f"{row.ran_at:<20} {row.task:<19} {row.seconds * 1000:>8.1f} {row.db_bytes / 1e6:>8.2f} "
+                  f"{row.wal_bytes / 1e6:>8.2f} {row.free_pages:>7}  {row.result}")
+        
+        first, last = df.iloc[0], df.iloc[-1]
+        print(f"📈 Since {first['ran_at']}: database {first['db_bytes'] / 1e6:.2f} → {last['db_bytes'] / 1e6:.2f} MB, "
+              f"WAL {first['wal_bytes'] / 1e6:.2f} → {last['wal_bytes'] / 1e6:.2f} MB")
+        for task, seconds in df.groupby('task')['seconds'].mean().items():
+            print(f"⏱️ {task}: {seconds * 1000:.1f}ms on average")
+        return df
+    
+    def run(self):
+        """Check every `interval` seconds and run maintenance when the database is idle"""
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                self.log(f"❌ Maintenance failed: {e}")
+            self._stop.wait(self.interval)
+    
+    def start(self):
+        """Run the scheduler on a background thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name='db-maintenance', daemon=True)
+        self._thread.start()
+        return self._thread
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._watch_conn is not None:
+            self._watch_conn.close()
+            self._watch_conn = None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run SQLite maintenance (ANALYZE, incremental VACUUM, WAL checkpoints)")
+    parser.add_argument('command', choices=['run', 'schedule', 'report', 'enable-incremental-vacuum'], help="What to do")
+    parser.add_argument('--db', default=None, help="Database file (defaults to DATABASE_PATH or budget_coach.db)")
+    parser.add_argument('--interval', type=float, default=300.0, help="Seconds between idle checks when scheduling")
+    parser.add_argument('--idle-after', type=float, default=30.0, help="Seconds without writes before maintenance runs")
+    parser.add_argument('--wal-limit-mb', type=float, default=64.0, help="WAL size that triggers a truncating checkpoint")
+    parser.add_argument('--limit', type=int, default=50, help="Rows shown by report")
+    args = parser.parse_args(argv)
+    
+    scheduler = MaintenanceScheduler(args.db, interval=args.interval, idle_after=args.idle_after,
+                                     wal_limit=int(args.wal_limit_mb * 1024 * 1024))
+    if args.command == 'run':
+        return scheduler.run_once(force=True)
+    if args.command == 'report':
+        return scheduler.report(args.limit)
+    if args.command == 'enable-incremental-vacuum':
+        stats = scheduler.enable_incremental_vacuum()
+        print(f"✅ auto_vacuum is now {stats['auto_vacuum']} ({stats['db_bytes'] / 1e6:.2f} MB)")
+        return stats
+    
+    print(f"⏰ Running maintenance after {args.idle_after:.0f}s without writes, checking every {args.interval:.0f}s")
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+if __name__ == "__main__":
+    main()
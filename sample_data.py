@@ -63,11 +63,11 @@ def create_sample_data():
     
     print("🚀 Adding sample data to demonstrate Budget Coach...")
     
-    for date, description, amount, category, transaction_type in sample_transactions:
-        try:
-            db.add_transaction(date, description, amount, category, transaction_type)
-        except Exception as e:
-            print(f"Error adding transaction: {e}")
+    try:
+        db.add_transactions(sample_transactions)
+    except Exception as e:
+        print(f"Error adding transactions: {e}")
+        return 0
     
     print(f"✅ Successfully added {len(sample_transactions)} sample transactions!")
     print("💡 You can now see charts, analytics, and financial advice in the app.")
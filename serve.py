@@ -0,0 +1,386 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+APP_DIR = Path(__file__).parent
+
+AFFINITY_COOKIE = 'budget_coach_worker'
+
+COOKIE_PATTERN = re.compile(rf'(?:^|;)\s*{AFFINITY_COOKIE}=(\d+)')
+
+def free_port():
+    """An unused local TCP port"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+class WorkerSupervisor:
+    """Run N Streamlit workers on consecutive local ports and restart any that exit"""
+    
+    HEALTH_PATH = '/_stcore/health'
+    
+    # A worker that stays up this long (seconds) resets its restart backoff
+    STABLE_AFTER = 60.0
+    
+    def __init__(self, workers, app='app.py', base_port=8600, db_path=None, check_interval=1.0,
+                 max_backoff=30.0, quiet=False, ports=None):
+        self.workers = workers
+        self.app = str(APP_DIR / app)
+        self.ports = list(ports) if ports else [base_port + index for index in range(workers)]
+        self.db_path = db_path
+        self.check_interval = check_interval
+        self.max_backoff = max_backoff
+        self.quiet = quiet
+        self.processes = [None] * workers
+        self.started_at = [0.0] * workers
+        self.backoff = [1.0] * workers
+        self.restart_at = [None] * workers
+        self.restarts = [0] * workers
+        self.healthy = [False] * workers
+        self._stop = threading.Event()
+        self._monitor = None
+    
+    def command(self, index):
+        return [
+            sys.executable, '-m', 'streamlit', 'run', self.app,
+            '--server.port', str(self.ports[index]),
+            '--server.address', '127.0.0.1',
+            '--server.headless', 'true',
+            '--browser.gatherUsageStats', 'false'
+        ]
+    
+    def _spawn(self, index):
+        env = dict(os.environ)
+        if self.db_path:
+            env['DATABASE_PATH'] = self.db_path
+        output = subprocess.DEVNULL if self.quiet else None
+        self.processes[index] = subprocess.Popen(self.command(index), cwd=APP_DIR, env=env, stdout=output, stderr=output)
+        self.started_at[index] = time.monotonic()
+        self.restart_at[index] = None
+        self.healthy[index] = False
+    
+    def start(self):
+        """Share the database in WAL mode, start every worker and the monitor thread"""
+        from database import BudgetDatabase
+        BudgetDatabase(self.db_path).enable_wal()
+        
+        for index in range(self.workers):
+            self._spawn(index)
+        self._monitor = threading.Thread(target=self.monitor, name='worker-supervisor', daemon=True)
+        self._monitor.start()
+    
+    def check_health(self, index):
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{self.ports[index]}{self.HEALTH_PATH}", timeout=2) as response:
+                return response.status == 200
+        except OSError:
+            return False
+    
+    def monitor(self):
+        """Restart exited workers with exponential backoff and track which ones are healthy"""
+        while not self._stop.wait(self.check_interval):
+            now = time.monotonic()
+            for index, process in enumerate(self.processes):
+                if self.restart_at[index] is not None:
+                    if now >= self.restart_at[index]:
+                        self.restarts[index] += 1
+                        print(f"🔁 Restarting worker {index} on port {self.ports[index]}")
+                        self._spawn(index)
+                    continue
+                
+                if process.poll() is not None:
+                    self.healthy[index] = False
+                    if now - self.started_at[index] >= self.STABLE_AFTER:
+                        self.backoff[index] = 1.0
+                    print(f"⚠️ Worker {index} exited with code {process.returncode}, restarting in {self.backoff[index]:.0f}s")
+                    self.restart_at[index] = now + self.backoff[index]
+                    self.backoff[index] = min(self.backoff[index] * 2, self.max_backoff)
+                else:
+                    self.healthy[index] = self.check_health(index)
+    
+    def wait_until_healthy(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if all(self.healthy):
+                return True
+            time.sleep(0.2)
+        return False
+    
+    def stop(self):
+        self._stop.set()
+        if self._monitor is not None:
+            self._monitor.join()
+        for process in self.processes:
+            if process is not None and process.poll() is None:
+                process.terminate()
+        for process in self.processes:
+            if process is not None:
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+class StickyProxy:
+    """HTTP/WebSocket reverse proxy that pins each browser to one worker with a cookie.
+    
+    Streamlit keeps session state in the worker's memory, so the page, its websocket
+    and any reconnects must all reach the same process. New browsers go to the
+    healthy worker with the fewest open connections.
+    """
+    
+    MAX_HEADER_BYTES = 65536
+    
+    def __init__(self, supervisor, host='0.0.0.0', port=8501):
+        self.supervisor = supervisor
+        self.host = host
+        self.port = port
+        self.connections = [0] * supervisor.workers
+    
+    def choose_worker(self, head):
+        """(worker index, whether to set the affinity cookie) for a request head"""
+        healthy = [index for index in range(self.supervisor.workers) if self.supervisor.healthy[index]]
+        for line in head.split(b'\r\n')[1:]:
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'cookie':
+                match = COOKIE_PATTERN.search(value)
+                if match and int(match.group(1)) in healthy:
+                    return int(match.group(1)), False
+        
+        candidates = healthy or list(range(self.supervisor.workers))
+        return min(candidates, key=lambda index: self.connections[index]), True
+    
+    @staticmethod
+    def add_cookie(response_head, index):
+        cookie = f"Set-Cookie: {AFFINITY_COOKIE}={index}; Path=/; HttpOnly; SameSite=Lax\r\n".encode()
+        return response_head[:-2] + cookie + b'\r\n'
+    
+    @staticmethod
+    async def pipe(reader, writer):
+        try:
+            while data := await reader.read(65536):
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+    
+    async def handle(self, reader, writer):
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        
+        index, set_cookie = self.choose_worker(head)
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection('127.0.0.1', self.supervisor.ports[index])
+        except OSError:
+            writer.write(b'HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            await writer.drain()
+            writer.close()
+            return
+        
+        self.connections[index] += 1
+        try:
+            upstream_writer.write(head)
+            if set_cookie:
+                # Only the first response of a connection needs rewriting; the rest is streamed as is
+                response_head = await upstream_reader.readuntil(b'\r\n\r\n')
+                writer.write(self.add_cookie(response_head, index))
+            await asyncio.gather(self.pipe(reader, upstream_writer), self.pipe(upstream_reader, writer))
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            upstream_writer.close()
+        finally:
+            self.connections[index] -= 1
+    
+    async def start(self):
+        return await asyncio.start_server(self.handle, self.host, self.port, limit=self.MAX_HEADER_BYTES)
+
+async def serve(supervisor, proxy):
+    server = await proxy.start()
+    print(f"🚀 Budget Coach on http://{proxy.host}:{proxy.port} with {supervisor.workers} workers "
+          f"(ports {supervisor.ports[0]}-{supervisor.ports[-1]})")
+    async with server:
+        await server.serve_forever()
+
+# Scaling benchmark
+
+async def _rerun(websocket, widget_states=()):
+    """Ask the worker to rerun the script and wait until it finishes; returns the widgets it rendered"""
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+    
+    message = BackMsg()
+    message.rerun_script.query_string = ''
+    message.rerun_script.widget_states.widgets.extend(widget_states)
+    await websocket.send(message.SerializeToString())
+    
+    widgets = {}
+    while True:
+        forward = ForwardMsg()
+        forward.ParseFromString(await websocket.recv())
+        if forward.WhichOneof('type') == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+            element = forward.delta.new_element
+            widget = getattr(element, element.WhichOneof('type'))
+            if getattr(widget, 'id', ''):
+                widgets[widget.id] = widget
+        # A run cut short by st.rerun() is followed by another run on the server
+        elif forward.WhichOneof('type') == 'script_finished' and forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+            return widgets
+
+async def _login(websocket, email, password):
+    """Fill in and submit app.py's login form, if the app shows one"""
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+    
+    widgets = await _rerun(websocket)
+    login = {suffix: widget_id for widget_id in widgets
+             for suffix in ('login_email', 'login_password', 'FormSubmitter:login_form')
+             if suffix in widget_id}
+    if len(login) == 3:
+        await _rerun(websocket, [
+            WidgetState(id=login['login_email'], string_value=email),
+            WidgetState(id=login['login_password'], string_value=password),
+            WidgetState(id=login['FormSubmitter:login_form'], trigger_value=True)
+        ])
+
+async def _rerun_until(websocket, deadline, latencies):
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        await _rerun(websocket)
+        latencies.append(time.perf_counter() - start)
+
+def _client_process(port, emails, password, barrier, duration):
+    """Entry point of a benchmark client process: log every session in, then rerun until time is up"""
+    from websockets.asyncio.client import connect
+    latencies = []
+    
+    async def run_sessions():
+        url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        websockets = [await connect(url, subprotocols=['streamlit'], max_size=None) for _ in emails]
+        try:
+            await asyncio.gather(*[_login(websocket, email, password) for websocket, email in zip(websockets, emails)])
+            # Every client process starts measuring at the same moment
+            barrier.wait()
+            deadline = time.monotonic() + duration
+            return await asyncio.gather(*[_rerun_until(websocket, deadline, latencies) for websocket in websockets],
+                                        return_exceptions=True)
+        finally:
+            for websocket in websockets:
+                await websocket.close()
+    
+    errors = [repr(result) for result in asyncio.run(run_sessions()) if isinstance(result, Exception)]
+    return latencies, errors
+
+def benchmark(max_workers, sessions_per_worker=4, duration=15.0, app='app.py'):
+    """Sessions/s and rerun latency through the proxy for 1, 2, 4 ... max_workers workers"""
+    from load_test import LoadTest, LOAD_TEST_PASSWORD, percentiles
+    
+    worker_counts = sorted({min(2 ** power, max_workers) for power in range(max_workers.bit_length() + 1)})
+    db_path = os.path.join(tempfile.mkdtemp(prefix='budget_coach_serve_'), 'serve_benchmark.db')
+    accounts = LoadTest(users=max_workers * sessions_per_worker, db_path=db_path)
+    accounts.prepare_database()
+    
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for workers in worker_counts:
+        ports = [free_port() for _ in range(workers)]
+        supervisor = WorkerSupervisor(workers, app=app, db_path=db_path, quiet=True, ports=ports)
+        supervisor.start()
+        try:
+            if not supervisor.wait_until_healthy():
+                raise RuntimeError("Workers did not become healthy")
+            
+            proxy = StickyProxy(supervisor, host='127.0.0.1', port=free_port())
+            emails = [accounts.email(index) for index in range(workers * sessions_per_worker)]
+            
+            async def run_round():
+                server = await proxy.start()
+                loop = asyncio.get_running_loop()
+                # One client process per worker keeps the load generator from being the bottleneck
+                with context.Manager() as manager, ProcessPoolExecutor(workers, mp_context=context) as pool:
+                    barrier = manager.Barrier(workers)
+                    round_results = await asyncio.gather(*[
+                        loop.run_in_executor(pool, _client_process, proxy.port, emails[client::workers],
+                                             LOAD_TEST_PASSWORD, barrier, duration)
+                        for client in range(workers)
+                    ])
+                server.close()
+                await server.wait_closed()
+                return round_results
+            
+            round_results = asyncio.run(run_round())
+        finally:
+            supervisor.stop()
+        
+        latencies = [latency for client_latencies, _ in round_results for latency in client_latencies]
+        results.append({
+            'workers': workers,
+            'sessions': len(emails),
+            'reruns_per_s': len(latencies) / duration,
+            'latency_ms': percentiles(latencies),
+            'errors': [error for _, client_errors in round_results for error in client_errors]
+        })
+    
+    baseline = results[0]['reruns_per_s'] or 1.0
+    print(f"{'workers':>8} {'sessions':>9} {'reruns/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'speedup':>8} {'efficiency':>11}")
+    for result in results:
+        result['speedup'] = result['reruns_per_s'] / baseline
+        result['efficiency'] = result['speedup'] / result['workers']
+        print(f"{result['workers']:>8} {result['sessions']:>9} {result['reruns_per_s']:>10.1f} "
+              f"{result['latency_ms'].get('p50', 0):>8.1f} {result['latency_ms'].get('p95', 0):>8.1f} "
+              f"{result['speedup']:>7.2f}x {result['efficiency']:>10.0%}")
+        for error in result['errors'][:3]:
+            print(f"   ❌ {error}")
+    print(f"💻 {os.cpu_count()} CPU cores available")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Budget Coach with several Streamlit workers behind a sticky proxy")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Number of Streamlit worker processes")
+    parser.add_argument('--host', default='0.0.0.0', help="Address the proxy listens on")
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', 8501)), help="Port the proxy listens on")
+    parser.add_argument('--base-port', type=int, default=8600, help="First local port used by the workers")
+    parser.add_argument('--app', default='app.py', help="Streamlit script each worker runs")
+    parser.add_argument('--db', default=None, help="Shared database file (defaults to DATABASE_PATH or budget_coach.db)")
+    parser.add_argument('--maintenance-interval', type=float, default=300.0,
+                        help="Seconds between database maintenance checks (0 disables maintenance)")
+    parser.add_argument('--benchmark', action='store_true', help="Measure throughput for 1, 2, 4 ... --workers workers and exit")
+    parser.add_argument('--sessions-per-worker', type=int, default=4, help="Benchmark sessions per worker")
+    parser.add_argument('--duration', type=float, default=15.0, help="Benchmark seconds per worker count")
+    args = parser.parse_args(argv)
+    
+    if args.benchmark:
+        return benchmark(args.workers, args.sessions_per_worker, args.duration, args.app)
+    
+    supervisor = WorkerSupervisor(args.workers, app=args.app, base_port=args.base_port, db_path=args.db)
+    supervisor.start()
+    maintenance = None
+    if args.maintenance_interval > 0:
+        from maintenance import MaintenanceScheduler
+        maintenance = MaintenanceScheduler(args.db, interval=args.maintenance_interval)
+        maintenance.start()
+    try:
+        asyncio.run(serve(supervisor, StickyProxy(supervisor, host=args.host, port=args.port)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("👋 Stopping workers...")
+        if maintenance is not None:
+            maintenance.stop()
+        supervisor.stop()
+
+if __name__ == "__main__":
+    main()
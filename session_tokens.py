@@ -0,0 +1,242 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+class SessionTokenStore:
+    """Signed session tokens that let a returning browser skip the password check.
+    
+    A token reads "<user id>.<expiry>.<token id>.<signature>", signed with HMAC-SHA256
+    under a key kept in the database so every worker process accepts it. A forged or
+    expired token is rejected from the token alone; a valid one is looked up in the
+    auth_tokens table, which is what revocation deletes from, and the answer is kept
+    in a bounded LRU. Cached answers are trusted for MAX_AGE seconds, so a revocation
+    made in another process takes at most that long to apply.
+    """
+    
+    _instances = {}
+    _instances_lock = threading.Lock()
+    
+    # Token lifetime in seconds; resuming a session swaps the token for a fresh one
+    TTL = 12 * 3600
+    
+    # Validated tokens kept in memory per database file
+    MAX_ENTRIES = 10000
+    
+    # Seconds before a cached token is checked against the table again
+    MAX_AGE = 60.0
+    
+    # Least seconds between re-reads of the signing key prompted by bad signatures, so
+    # forged tokens are rejected without I/O; a key replaced elsewhere is seen within it
+    KEY_REFRESH_INTERVAL = 5.0
+    
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._key = None
+        self._key_read_at = float('-inf')
+    
+    @classmethod
+    def get(cls, db):
+        """Shared store for the database file of `db`"""
+        key = os.path.abspath(db.db_path)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(db)
+            return cls._instances[key]
+    
+    @classmethod
+    def invalidate_path(cls, db_path):
+        """Forget cached tokens and the signing key of a database file (e.g. after a restore)"""
+        store = cls._instances.get(os.path.abspath(db_path))
+        if store is not None:
+            store.clear_cache()
+    
+    @staticmethod
+    def install(cursor):
+        """Create the token table and its indexes, and the signing key on first use"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS auth_tokens (
+                token_id TEXT PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                expires_at INTEGER NOT NULL,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            ) WITHOUT ROWID
+        ''')
+        # Bulk revocation per user and bulk expiry both go through an index
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_auth_tokens_user ON auth_tokens (user_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_auth_tokens_expires ON auth_tokens (expires_at)')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS auth_keys (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO auth_keys (name, value) VALUES ('signing_key', ?)",
+                       (secrets.token_hex(32),))
+    
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+            self._key = None
+            self._key_read_at = float('-inf')
+    
+    def _read_key(self, conn):
+        value = conn.execute("SELECT value FROM auth_keys WHERE name = 'signing_key'").fetchone()[0]
+        key = self._key = bytes.fromhex(value)
+        self._key_read_at = time.monotonic()
+        return key
+    
+    def signing_key(self, refresh=False):
+        key = self._key
+        if key is None or refresh:
+            conn = self.db.connect()
+            key = self._read_key(conn)
+            conn.close()
+        return key
+    
+    def _sign(self, payload, key=None):
+        digest = hmac.new(key or self.signing_key(), payload.encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+    
+    def _insert_token(self, cursor, user_id, ttl=None):
+        expires_at = int(time.time() + (ttl or self.TTL))
+        token_id = secrets.token_urlsafe(16)
+        cursor.execute('INSERT INTO auth_tokens (token_id, user_id, expires_at) VALUES (?, ?, ?)',
+                       (token_id, user_id, expires_at))
+        # Signed with the key as of this write, in case revoke_all replaced it in another process
+        payload = f'{user_id}.{expires_at}.{token_id}'
+        return f'{payload}.{self._sign(payload, self._read_key(cursor))}'
+    
+    def issue(self, user_id, ttl=None):
+        """Create and store a token for user_id, valid for `ttl` seconds"""
+        conn = self.db.connect()
+        token = self._insert_token(conn.cursor(), user_id, ttl)
+        conn.commit()
+        conn.close()
+        return token
+    
+    def rotate(self, token, ttl=None):
+        """Exchange a valid token for a new one, so each token signs in only once.
+        
+        Returns (user, new token), or (None, None) if the token is invalid or was
+        already used, e.g. by a concurrent reconnect in another worker.
+        """
+        user = self.validate(token)
+        if user is None:
+            return None, None
+        token_id = self.parse(token)[2]
+        conn = self.db.connect()
+        cursor = conn.cursor()
+        new_token = None
+        if cursor.execute('DELETE FROM auth_tokens WHERE token_id = ?', (token_id,)).rowcount:
+            new_token = self._insert_token(cursor, user['id'], ttl)
+        conn.commit()
+        conn.close()
+        self._forget([token_id])
+        return (user, new_token) if new_token else (None, None)
+    
+    def parse(self, token):
+        """(user_id, expires_at, token_id) of a well-signed token, else None"""
+        try:
+            user_id, expires_at, token_id, signature = token.split('.')
+            user_id, expires_at = int(user_id), int(expires_at)
+        except (AttributeError, ValueError):
+            return None
+        payload = f'{user_id}.{expires_at}.{token_id}'
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            # The key may have been replaced by revoke_all in another process
+            if time.monotonic() - self._key_read_at < self.KEY_REFRESH_INTERVAL:
+                return None
+            key = self._key
+            if self.signing_key(refresh=True) == key or not hmac.compare_digest(signature, self._sign(payload)):
+                return None
+        return user_id, expires_at, token_id
+    
+    def validate(self, token):
+        """User dict (id, email, name, login_count) the token belongs to, or None"""
+        parsed = self.parse(token)
+        if parsed is None or parsed[1] <= time.time():
+            return None
+        user_id, expires_at, token_id = parsed
+        
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(token_id)
+            if entry is not None and now - entry[1] < self.MAX_AGE:
+                self._cache.move_to_end(token_id)
+                return entry[0]
+        
+        conn = self.db.connect()
+        row = conn.execute('''
+            SELECT u.id, u.email, u.name, u.login_count
+            FROM auth_tokens t JOIN users u ON u.id = t.user_id
+            WHERE t.token_id = ? AND t.user_id = ? AND t.expires_at > ? AND u.is_active = 1
+        ''', (token_id, user_id, int(time.time()))).fetchone()
+        conn.close()
+        user = dict(zip(('id', 'email', 'name', 'login_count'), row)) if row else None
+        
+        # Rejections are cached as well; a revoked token id never becomes valid again
+        with self._lock:
+            self._cache[token_id] = (user, now)
+            self._cache.move_to_end(token_id)
+            while len(self._cache) > self.MAX_ENTRIES:
+                self._cache.popitem(last=False)
+        return user
+    
+    def _forget(self, token_ids):
+        with self._lock:
+            for token_id in token_ids:
+                self._cache.pop(token_id, None)
+    
+    def revoke(self, token):
+        """Revoke one token (e.g. on logout); True if it was still stored"""
+        parsed = self.parse(token)
+        if parsed is None:
+            return False
+        conn = self.db.connect()
+        deleted = conn.execute('DELETE FROM auth_tokens WHERE token_id = ?', (parsed[2],)).rowcount
+        conn.commit()
+        conn.close()
+        self._forget([parsed[2]])
+        return bool(deleted)
+    
+    def revoke_user(self, user_id):
+        """Revoke every token of a user (e.g. after a password change); returns how many"""
+        conn = self.db.connect()
+        token_ids = [token_id for token_id, in conn.execute(
+            'DELETE FROM auth_tokens WHERE user_id = ? RETURNING token_id', (user_id,))]
+        conn.commit()
+        conn.close()
+        self._forget(token_ids)
+        return len(token_ids)
+    
+    def revoke_all(self):
+        """Revoke every token by replacing the signing key; returns how many were stored"""
+        conn = self.db.connect()
+        cursor = conn.cursor()
+        deleted = cursor.execute('DELETE FROM auth_tokens').rowcount
+        cursor.execute("UPDATE auth_keys SET value = ? WHERE name = 'signing_key'", (secrets.token_hex(32),))
+        conn.commit()
+        conn.close()
+        self.clear_cache()
+        return deleted
+    
+    def purge_expired(self, conn=None):
+        """Delete expired tokens in one statement; returns how many"""
+        own_connection = conn is None
+        conn = conn or self.db.connect()
+        try:
+            deleted = conn.execute('DELETE FROM auth_tokens WHERE expires_at <= ?', (int(time.time()),)).rowcount
+            if own_connection:
+                conn.commit()
+        finally:
+            if own_connection:
+                conn.close()
+        return deleted
@@ -1,9 +1,11 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, date, timedelta
-import sqlite3
 import re
 import os
+import tempfile
+from connection_pool import SQLiteConnectionPool
+from category_registry import CategoryRegistry
 try:
     import plotly.express as px
     import plotly.graph_objects as go
@@ -44,85 +46,54 @@ if not st.session_state.authenticated:
     login_form()
     st.stop()
 
+def create_schema(conn):
+    """Create tables and default categories (runs on the writer connection)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            description TEXT NOT NULL,
+            amount REAL NOT NULL,
+            category TEXT NOT NULL,
+            type TEXT NOT NULL
+        )
+    ''')
+    
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS categories (
+            name TEXT PRIMARY KEY,
+            type TEXT NOT NULL
+        )
+    ''')
+    
+    # Default categories
+    categories = [
+        ('Housing', 'expense'), ('Transportation', 'expense'), ('Food & Dining', 'expense'),
+        ('Entertainment', 'expense'), ('Shopping', 'expense'), ('Healthcare', 'expense'),
+        ('Utilities', 'expense'), ('Other', 'expense'), ('Salary', 'income'), 
+        ('Freelance', 'income'), ('Investment', 'income'), ('Other Income', 'income')
+    ]
+    conn.executemany('INSERT OR IGNORE INTO categories VALUES (?, ?)', categories)
+
 # Database setup with better error handling for deployment
 @st.cache_resource
 def init_database():
+    # Sessions share one pool: concurrent pooled readers and a single writer thread
     try:
         # Use a more deployment-friendly database path
         db_path = os.getenv('DATABASE_PATH', 'budget_coach.db')
-        conn = sqlite3.connect(db_path, check_same_thread=False)
-        cursor = conn.cursor()
-        
-        # Create transactions table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                description TEXT NOT NULL,
-                amount REAL NOT NULL,
-                category TEXT NOT NULL,
-                type TEXT NOT NULL
-            )
-        ''')
-        
-        # Create categories table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS categories (
-                name TEXT PRIMARY KEY,
-                type TEXT NOT NULL
-            )
-        ''')
-        
-        # Default categories
-        categories = [
-            ('Housing', 'expense'), ('Transportation', 'expense'), ('Food & Dining', 'expense'),
-            ('Entertainment', 'expense'), ('Shopping', 'expense'), ('Healthcare', 'expense'),
-            ('Utilities', 'expense'), ('Other', 'expense'), ('Salary', 'income'), 
-            ('Freelance', 'income'), ('Investment', 'income'), ('Other Income', 'income')
-        ]
-        
-        for name, cat_type in categories:
-            cursor.execute('INSERT OR IGNORE INTO categories VALUES (?, ?)', (name, cat_type))
-        
-        conn.commit()
-        return conn
+        pool = SQLiteConnectionPool(db_path)
+        pool.submit(create_schema).result()
+        CategoryRegistry.invalidate_path(db_path)
+        return pool
     except Exception as e:
         st.error(f"Database initialization failed: {str(e)}")
-        # Fallback to in-memory database
-        conn = sqlite3.connect(':memory:', check_same_thread=False)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                description TEXT NOT NULL,
-                amount REAL NOT NULL,
-                category TEXT NOT NULL,
-                type TEXT NOT NULL
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE categories (
-                name TEXT PRIMARY KEY,
-                type TEXT NOT NULL
-            )
-        ''')
-        
-        categories = [
-            ('Housing', 'expense'), ('Transportation', 'expense'), ('Food & Dining', 'expense'),
-            ('Entertainment', 'expense'), ('Shopping', 'expense'), ('Healthcare', 'expense'),
-            ('Utilities', 'expense'), ('Other', 'expense'), ('Salary', 'income'), 
-            ('Freelance', 'income'), ('Investment', 'income'), ('Other Income', 'income')
-        ]
-        
-        for name, cat_type in categories:
-            cursor.execute('INSERT INTO categories VALUES (?, ?)', (name, cat_type))
-        
-        conn.commit()
+        # Fallback to a temporary database file (in-memory databases can't be pooled)
+        pool = SQLiteConnectionPool(os.path.join(tempfile.mkdtemp(), 'budget_coach.db'))
+        pool.submit(create_schema).result()
+        CategoryRegistry.invalidate_path(pool.db_path)
         st.warning("⚠️ Using temporary database - data will not persist between sessions")
-        return conn
+        return pool
 
 db = init_database()
 
@@ -163,15 +134,13 @@ page = st.sidebar.selectbox("Choose a page:", ["📊 Dashboard", "➕ Add Transa
 
 # Helper functions
 def add_transaction(date, description, amount, category, transaction_type):
-    cursor = db.cursor()
-    cursor.execute('''
+    return db.write('''
         INSERT INTO transactions (date, description, amount, category, type)
         VALUES (?, ?, ?, ?, ?)
     ''', (date, description, amount, category, transaction_type))
-    db.commit()
 
 def get_transactions():
-    return pd.read_sql_query("SELECT * FROM transactions ORDER BY date DESC", db)
+    return db.read_sql("SELECT * FROM transactions ORDER BY date DESC")
 
 # Page content
 if page == "📊 Dashboard":
@@ -226,8 +195,7 @@ elif page == "➕ Add Transaction":
         transaction_type = st.selectbox("Transaction Type", ["expense", "income"])
         
         # Get categories
-        categories_df = pd.read_sql_query(f"SELECT name FROM categories WHERE type = '{transaction_type}'", db)
-        category_options = categories_df['name'].tolist()
+        category_options = list(CategoryRegistry.get(db.db_path).names(transaction_type))
         
         category = st.selectbox("Category", category_options)
         amount = st.number_input("Amount ($)", min_value=0.01, step=0.01)
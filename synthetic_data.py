@@ -0,0 +1,360 @@
+import argparse
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+from database import BudgetDatabase
+
+class SyntheticDataGenerator:
+    """Seeded, vectorized generator of realistic multi-user workloads for benchmarks"""
+    
+    # Discretionary spending mix: category -> (share of transactions, lognormal mu, sigma)
+    SPENDING_MIX = {
+        'Food & Dining': (0.42, 3.0, 0.7),
+        'Transportation': (0.16, 3.4, 0.5),
+        'Shopping': (0.14, 3.8, 0.9),
+        'Entertainment': (0.12, 3.2, 0.8),
+        'Healthcare': (0.06, 3.9, 0.9),
+        'Education': (0.03, 4.0, 0.8),
+        'Other': (0.07, 3.2, 1.0)
+    }
+    
+    DESCRIPTIONS = {
+        'Food & Dining': ['Groceries', 'Coffee Shop', 'Lunch Out', 'Dinner Date', 'Takeaway'],
+        'Transportation': ['Gas Station', 'Bus Pass', 'Ride Share', 'Parking'],
+        'Shopping': ['Clothes', 'Electronics', 'Home Goods', 'Online Order'],
+        'Entertainment': ['Movie Night', 'Concert Tickets', 'Streaming Subscription', 'Games'],
+        'Healthcare': ['Pharmacy', 'Doctor Visit', 'Gym Membership'],
+        'Education': ['Book Purchase', 'Online Course'],
+        'Other': ['Gift', 'Donation', 'Miscellaneous']
+    }
+    
+    # Month-of-year multipliers on discretionary spending (Jan..Dec)
+    SEASONALITY = np.array([0.85, 0.9, 0.95, 1.0, 1.0, 1.1, 1.15, 1.1, 1.0, 1.0, 1.15, 1.45])
+    
+    GOAL_TEMPLATES = [
+        ('Emergency Fund', '🏠 Emergency Fund', '🏠'),
+        ('Summer Vacation', '🏖️ Vacation', '🏖️'),
+        ('New Car', '🚗 Transportation', '🚗'),
+        ('Laptop', '💍 Special Purchase', '💍'),
+        ('Course Fees', '🎓 Education', '🎓'),
+        ('Index Fund', '💰 Investment', '💰')
+    ]
+    
+    # Probability that a synthetic user has earned each achievement
+    ACHIEVEMENT_RATES = {
+        'first_transaction': 1.0, 'first_week': 0.9, 'first_month': 0.8, 'transaction_50': 0.7,
+        'transaction_100': 0.5, 'first_100': 0.6, 'first_1000': 0.3, 'streak_7': 0.2, 'goal_crusher': 0.1
+    }
+    
+    def __init__(self, n_users=100, years=2, seed=42, start_month='2023-01', transactions_per_month=25,
+                 chunk_users=1000):
+        self.n_users = n_users
+        self.years = years
+        self.seed = seed
+        self.transactions_per_month = transactions_per_month
+        # Chunk size is part of the seed schedule: keep it fixed for reproducible output
+        self.chunk_users = chunk_users
+        
+        self.months = pd.period_range(start_month, periods=12 * years, freq='M')
+        self.month_start_days = self.months.to_timestamp().to_numpy().astype('datetime64[D]').astype(np.int64)
+        self.days_in_month = self.months.days_in_month.to_numpy()
+        self.month_of_year = self.months.month.to_numpy() - 1
+        
+        categories = list(self.SPENDING_MIX)
+        self.categories = np.array(categories, dtype=object)
+        shares = np.array([self.SPENDING_MIX[c][0] for c in categories])
+        self.category_shares = shares / shares.sum()
+        self.category_mu = np.array([self.SPENDING_MIX[c][1] for c in categories])
+        self.category_sigma = np.array([self.SPENDING_MIX[c][2] for c in categories])
+        
+        # Flattened description table indexed by (category offset + random slot)
+        self.description_table = np.array([d for c in categories for d in self.DESCRIPTIONS[c]], dtype=object)
+        self.description_counts = np.array([len(self.DESCRIPTIONS[c]) for c in categories])
+        self.description_offsets = np.concatenate([[0], np.cumsum(self.description_counts)[:-1]])
+    
+    def _rng(self, stream, chunk=0):
+        return np.random.default_rng([self.seed, stream, chunk])
+    
+    @staticmethod
+    def _dates(day_numbers):
+        """Days since epoch -> 'YYYY-MM-DD' strings"""
+        return day_numbers.astype('datetime64[D]').astype(str).astype(object)
+    
+    def user_profiles(self, first_user, count):
+        """Per-user salary, rent share and spending intensity"""
+        rng = self._rng(0, first_user)
+        return pd.DataFrame({
+            'user_id': np.arange(first_user, first_user + count),
+            'salary': np.round(rng.lognormal(8.1, 0.35, count), -1),
+            'rent_share': rng.uniform(0.22, 0.38, count),
+            'intensity': rng.gamma(4.0, 0.25, count),
+            'freelancer': rng.random(count) < 0.2
+        })
+    
+    def generate_transactions(self, first_user=1, count=None):
+        """Transactions for users [first_user, first_user + count) as one DataFrame"""
+        count = self.n_users - first_user + 1 if count is None else count
+        profiles = self.user_profiles(first_user, count)
+        rng = self._rng(1, first_user)
+        n_months = len(self.months)
+        
+        user_ids = profiles['user_id'].to_numpy()
+        salary = profiles['salary'].to_numpy()
+        
+        # Recurring rows: one per user and month
+        grid_user = np.repeat(np.arange(count), n_months)
+        grid_month = np.tile(np.arange(n_months), count)
+        month_start = self.month_start_days[grid_month]
+        
+        frames = []
+        frames.append(pd.DataFrame({
+            'user_id': user_ids[grid_user],
+            'day': month_start + 24,
+            'description': 'Monthly Salary',
+            'amount': salary[grid_user],
+            'category': 'Salary',
+            'type': 'income'
+        }))
+        frames.append(pd.DataFrame({
+            'user_id': user_ids[grid_user],
+            'day': month_start,
+            'description': 'Rent Payment',
+            'amount': np.round(salary[grid_user] * profiles['rent_share'].to_numpy()[grid_user], 0),
+            'category': 'Housing',
+            'type': 'expense'
+        }))
+        # Utilities peak in winter and summer
+        utility_season = 1 + 0.25 * np.cos(2 * np.pi * self.month_of_year[grid_month] / 6)
+        frames.append(pd.DataFrame({
+            'user_id': user_ids[grid_user],
+            'day': month_start + rng.integers(3, 10, grid_user.size),
+            'description': 'Electric Bill',
+            'amount': np.round(rng.normal(95, 15, grid_user.size) * utility_season, 2),
+            'category': 'Utilities',
+            'type': 'expense'
+        }))
+        
+        # Occasional freelance income
+        freelance = profiles['freelancer'].to_numpy()[grid_user] & (rng.random(grid_user.size) < 0.4)
+        frames.append(pd.DataFrame({
+            'user_id': user_ids[grid_user][freelance],
+            'day': month_start[freelance] + rng.integers(0, 28, freelance.sum()),
+            'description': 'Freelance Project',
+            'amount': np.round(rng.lognormal(6.2, 0.6, freelance.sum()), 2),
+            'category': 'Freelance',
+            'type': 'income'
+        }))
+        
+        # Discretionary spending: Poisson count per (user, month), seasonal
+        lam = (self.transactions_per_month * profiles['intensity'].to_numpy()[:, None]
+               * self.SEASONALITY[self.month_of_year][None, :])
+        counts = rng.poisson(lam).ravel()
+        cell = np.repeat(np.arange(count * n_months), counts)
+        row_user, row_month = cell // n_months, cell % n_months
+        category = rng.choice(len(self.categories), size=cell.size, p=self.category_shares)
+        slot = (rng.random(cell.size) * self.description_counts[category]).astype(np.int64)
+        
+        frames.append(pd.DataFrame({
+            'user_id': user_ids[row_user],
+            'day': self.month_start_days[row_month] + (rng.random(cell.size) * self.days_in_month[row_month]).astype(np.int64),
+            'description': self.description_table[self.description_offsets[category] + slot],
+            'amount': np.round(rng.lognormal(self.category_mu[category], self.category_sigma[category])
+                               * self.SEASONALITY[self.month_of_year[row_month]], 2),
+            'category': self.categories[category],
+            'type': 'expense'
+        }))
+        
+        transactions = pd.concat(frames, ignore_index=True)
+        transactions.insert(1, 'date', self._dates(transactions.pop('day').to_numpy()))
+        return transactions[['user_id', 'date', 'description', 'amount', 'category', 'type']]
+    
+    def iter_transaction_chunks(self):
+        """Yield transaction DataFrames chunk_users users at a time"""
+        for first_user in range(1, self.n_users + 1, self.chunk_users):
+            yield self.generate_transactions(first_user, min(self.chunk_users, self.n_users - first_user + 1))
+    
+    def generate_users(self, user_offset=0):
+        """User accounts (no password, so they cannot log in)"""
+        user_ids = np.arange(1, self.n_users + 1) + user_offset
+        return pd.DataFrame({
+            'id': user_ids,
+            'email': [f"user{i}@example.com" for i in user_ids],
+            'name': [f"Synthetic User {i}" for i in user_ids]
+        })
+    
+    def generate_goals(self):
+        """Roughly 1.5 savings goals per user"""
+        rng = self._rng(2)
+        per_user = rng.poisson(1.5, self.n_users)
+        user_ids = np.repeat(np.arange(1, self.n_users + 1), per_user)
+        template = rng.integers(0, len(self.GOAL_TEMPLATES), user_ids.size)
+        target = np.round(rng.lognormal(7.5, 0.8, user_ids.size), -1)
+        progress = rng.beta(2, 2.5, user_ids.size) * 1.1
+        end_day = self.month_start_days[-1] + rng.integers(30, 730, user_ids.size)
+        
+        names, categories, emojis = zip(*self.GOAL_TEMPLATES)
+        return pd.DataFrame({
+            'user_id': user_ids,
+            'name': np.array(names, dtype=object)[template],
+            'target_amount': target,
+            'current_amount': np.round(np.minimum(progress, 1.0) * target, 2),
+            'target_date': self._dates(end_day),
+            'category': np.array(categories, dtype=object)[template],
+            'emoji': np.array(emojis, dtype=object)[template],
+            'is_completed': progress >= 1.0
+        })
+    
+    def generate_goal_contributions(self, goals, first_goal_id=1, months=6):
+        """Each goal's saved amount as equal monthly contributions over the last `months` months"""
+        months = min(months, len(self.months))
+        current = goals['current_amount'].to_numpy()
+        share = np.round(current / months, 2)
+        amounts = np.repeat(share, months)
+        # The last contribution absorbs the rounding so they add up to current_amount
+        amounts[months - 1::months] = np.round(current - share * (months - 1), 2)
+        contributions = pd.DataFrame({
+            'goal_id': np.repeat(np.arange(first_goal_id, first_goal_id + len(goals)), months),
+            'amount': amounts,
+            'contributed_at': np.tile(self._dates(self.month_start_days[-months:]), len(goals))
+        })
+        return contributions[contributions['amount'] > 0]
+    
+    def generate_budget_targets(self):
+        """One monthly target per expense category (targets are not per user)"""
+        rng = self._rng(3)
+        categories = ['Housing', 'Utilities'] + list(self.SPENDING_MIX)
+        return pd.DataFrame({
+            'category': categories,
+            'monthly_target': np.round(rng.uniform(50, 400, len(categories)), -1) + np.where(
+                np.array(categories) == 'Housing', 1000, 0)
+        })
+    
+    def generate_achievements(self):
+        """Earned achievements per user drawn from ACHIEVEMENT_RATES"""
+        rng = self._rng(4)
+        ids = np.array(list(self.ACHIEVEMENT_RATES), dtype=object)
+        rates = np.array(list(self.ACHIEVEMENT_RATES.values()))
+        earned = rng.random((self.n_users, ids.size)) < rates
+        users, achievements = np.nonzero(earned)
+        return pd.DataFrame({'user_id': users + 1, 'achievement_id': ids[achievements]})
+    
+    @staticmethod
+    def _columns(conn, table):
+        return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    
+    @staticmethod
+    def _insert(conn, table, df, batch_size):
+        """executemany in batches, one transaction per batch"""
+        columns = list(df.columns)
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        for start in range(0, len(df), batch_size):
+            batch = df.iloc[start:start + batch_size]
+            conn.execute('BEGIN')
+            conn.executemany(sql, batch.itertuples(index=False, name=None))
+            conn.execute('COMMIT')
+        return len(df)
+    
+    def load(self, db, batch_size=50000, progress=None, replace_targets=False):
+        """Bulk-load users, transactions, goals, budget targets and achievements into db.
+        
+        Budget targets already in db are kept; with replace_targets the generated ones
+        replace them, for the generated categories only.
+        """
+        # Feature tables are created by their owning modules
+        from goals_tracker import SavingsGoalsTracker
+        from achievements import AchievementSystem
+        SavingsGoalsTracker(db)
+        AchievementSystem(db)
+        
+        conn = sqlite3.connect(db.db_path, isolation_level=None)
+        # Bulk-load settings for this connection only
+        conn.execute('PRAGMA synchronous = OFF')
+        conn.execute('PRAGMA cache_size = -65536')
+        
+        counts = {}
+        try:
+            # Append after any existing users so a database can be extended
+            user_offset = conn.execute('SELECT COALESCE(MAX(id), 0) FROM users').fetchone()[0]
+            counts['users'] = self._insert(conn, 'users', self.generate_users(user_offset), batch_size)
+            
+            counts['transactions'] = 0
+            for chunk in self.iter_transaction_chunks():
+                chunk['user_id'] += user_offset
+                counts['transactions'] += self._insert(conn, 'transactions', chunk, batch_size)
+                if progress:
+                    progress(counts['transactions'])
+            
+            # Per-user columns are only written where the schema has them
+            goals = self.generate_goals()
+            goals['user_id'] += user_offset
+            if 'user_id' not in self._columns(conn, 'savings_goals'):
+                goals = goals.drop(columns='user_id')
+            goal_offset = conn.execute('SELECT COALESCE(MAX(id), 0) FROM savings_goals').fetchone()[0]
+            counts['goals'] = self._insert(conn, 'savings_goals', goals, batch_size)
+            counts['goal_contributions'] = self._insert(
+                conn, 'goal_contributions', self.generate_goal_contributions(goals, goal_offset + 1), batch_size)
+            
+            targets = self.generate_budget_targets()
+            if replace_targets:
+                conn.executemany('DELETE FROM budget_targets WHERE category = ?',
+                                 ((category,) for category in targets['category']))
+            else:
+                existing = [category for category, in conn.execute('SELECT DISTINCT category FROM budget_targets')]
+                targets = targets[~targets['category'].isin(existing)]
+            counts['budget_targets'] = self._insert(conn, 'budget_targets', targets, batch_size)
+            
+            achievements = self.generate_achievements()
+            achievements['user_id'] += user_offset
+            if 'user_id' not in self._columns(conn, 'user_achievements'):
+                achievements = achievements.drop(columns='user_id').drop_duplicates()
+            counts['achievements'] = self._insert(conn, 'user_achievements', achievements, batch_size)
+            
+            # Invalidate cached API responses of the shared data and of every loaded user
+            db.bump_data_version(conn)
+            conn.execute('''
+                INSERT INTO data_versions (scope, version)
+                SELECT 'user:' || id, 1 FROM users WHERE id > ?
+                ON CONFLICT (scope) DO UPDATE SET version = version + 1
+            ''', (user_offset,))
+            
+            conn.execute('ANALYZE')
+        finally:
+            conn.close()
+        
+        return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a reproducible synthetic Budget Coach database for benchmarks")
+    parser.add_argument('--db', default='budget_coach_synthetic.db', help="Database file to create or extend")
+    parser.add_argument('--users', type=int, default=1000, help="Number of users")
+    parser.add_argument('--years', type=int, default=2, help="Years of history per user")
+    parser.add_argument('--start-month', default='2023-01', help="First month of history (YYYY-MM)")
+    parser.add_argument('--tx-per-month', type=float, default=25, help="Mean discretionary transactions per user per month")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed")
+    parser.add_argument('--batch-size', type=int, default=50000, help="Rows per insert transaction")
+    parser.add_argument('--replace-targets', action='store_true',
+                        help="Overwrite existing budget targets of the generated categories")
+    args = parser.parse_args(argv)
+    
+    generator = SyntheticDataGenerator(
+        n_users=args.users, years=args.years, seed=args.seed,
+        start_month=args.start_month, transactions_per_month=args.tx_per_month
+    )
+    
+    print(f"🚀 Generating {args.users} users x {args.years} years into {args.db}...")
+    start = time.perf_counter()
+    counts = generator.load(
+        BudgetDatabase(args.db), batch_size=args.batch_size, replace_targets=args.replace_targets,
+        progress=lambda n: print(f"   {n:,} transactions", end='\r')
+    )
+    elapsed = time.perf_counter() - start
+    
+    print()
+    for table, count in counts.items():
+        print(f"✅ {table}: {count:,} rows")
+    print(f"⏱️ {elapsed:.1f}s ({counts['transactions'] / elapsed:,.0f} transactions/s)")
+    return counts
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import os
+import sqlite3
+import sys
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from database import BudgetDatabase
+from financial_advisor import FinancialAdvisor
+from synthetic_data import SyntheticDataGenerator
+
+# Benchmark sizes in synthetic users (about 300 transactions per user-year).
+# Override with e.g. BENCH_USERS=10,100,1000 for larger runs.
+BENCH_USERS = [int(n) for n in os.getenv('BENCH_USERS', '5,50').split(',')]
+BENCH_YEARS = int(os.getenv('BENCH_YEARS', '1'))
+
+# Regression threshold used by `python test_benchmarks.py`
+COMPARE_FAIL = os.getenv('BENCH_COMPARE_FAIL', 'mean:25%')
+
+@pytest.fixture(scope='module', params=BENCH_USERS, ids=lambda n: f"{n}users")
+def bench_db(request, tmp_path_factory):
+    """Synthetic database built once per size"""
+    db_path = str(tmp_path_factory.mktemp('bench') / f"bench_{request.param}.db")
+    db = BudgetDatabase(db_path)
+    SyntheticDataGenerator(n_users=request.param, years=BENCH_YEARS, seed=42).load(db)
+    return db
+
+@pytest.fixture(scope='module')
+def transactions(bench_db):
+    return bench_db.get_transactions()
+
+@pytest.fixture(scope='module')
+def last_month(transactions):
+    return transactions['date'].max()[:7]
+
+@pytest.fixture(scope='module')
+def visualizer():
+    from visualizations import BudgetVisualizer
+    return BudgetVisualizer()
+
+# Database
+
+def test_get_transactions_all(benchmark, bench_db):
+    df = benchmark(bench_db.get_transactions)
+    assert not df.empty
+
+def test_get_transactions_date_filter(benchmark, bench_db, last_month):
+    df = benchmark(bench_db.get_transactions, f"{last_month}-01", f"{last_month}-31")
+    assert not df.empty
+
+def test_get_transactions_user_filter(benchmark, bench_db):
+    df = benchmark(bench_db.get_transactions, user_id=1)
+    assert not df.empty
+
+def test_export_to_csv(benchmark, bench_db, tmp_path):
+    count = benchmark(bench_db.export_to_csv, str(tmp_path / 'export.csv'))
+    assert count > 0
+
+def test_import_from_csv(benchmark, bench_db, tmp_path):
+    csv_path = str(tmp_path / 'import.csv')
+    bench_db.export_to_csv(csv_path)
+    targets = iter(range(10 ** 6))
+    
+    def fresh_database():
+        return (BudgetDatabase(str(tmp_path / f"import_{next(targets)}.db")), csv_path), {}
+    
+    count = benchmark.pedantic(BudgetDatabase.import_from_csv, setup=fresh_database, rounds=5)
+    assert count > 0
+
+@pytest.mark.parametrize('n_rows', [10000, 100000])
+def test_add_transactions(benchmark, transactions, tmp_path, n_rows):
+    rows = transactions.sample(n_rows, replace=True, random_state=42)
+    targets = iter(range(10 ** 6))
+    
+    def fresh_database():
+        return (BudgetDatabase(str(tmp_path / f"bulk_{next(targets)}.db")), rows), {}
+    
+    ids = benchmark.pedantic(BudgetDatabase.add_transactions, setup=fresh_database, rounds=3)
+    assert len(ids) == n_rows
+    if benchmark.stats:
+        benchmark.extra_info['rows_per_second'] = n_rows / benchmark.stats.stats.mean
+
+# Analytics
+
+def test_analyze_budget(benchmark, transactions, last_month):
+    advisor = FinancialAdvisor()
+    user_transactions = transactions[transactions['user_id'] == 1]
+    analysis = benchmark(advisor.analyze_budget, user_transactions, month=last_month)
+    assert analysis['status'] == 'success'
+
+def test_analyze_budget_batch(benchmark, transactions):
+    batch = benchmark(FinancialAdvisor().analyze_budget_batch, transactions)
+    assert not batch.empty
+
+@pytest.mark.parametrize('method, kwargs', [
+    ('create_spending_by_category_pie', {}),
+    ('create_monthly_trend', {}),
+    # Synthetic data ends in the past, so chart its whole range rather than the last 30 days
+    ('create_daily_spending_bar', {'days': None}),
+    ('create_income_breakdown', {})
+])
+def test_visualizer_charts(benchmark, visualizer, transactions, method, kwargs):
+    fig = benchmark(getattr(visualizer, method), transactions, **kwargs)
+    assert fig is not None
+
+def test_visualizer_gauge(benchmark, visualizer):
+    assert benchmark(visualizer.create_50_30_20_gauge, 5000, 2400, 1300) is not None
+
+def test_visualizer_budget_vs_actual(benchmark, visualizer, bench_db, transactions, last_month):
+    # The chart covers the current month, so replay the last synthetic month as this one
+    import pandas as pd
+    from datetime import date
+    current = transactions[transactions['date'].str.startswith(last_month)].copy()
+    current['date'] = date.today().strftime('%Y-%m') + current['date'].str[7:]
+    targets = bench_db.get_budget_targets()
+    fig = benchmark(visualizer.create_budget_vs_actual_chart, pd.concat([transactions, current]), targets)
+    assert fig is not None
+    assert [trace.name for trace in fig.data] == ['Budget Target', 'Actual Spending']
+    assert set(targets['category']) <= set(fig.data[0].x)
+
+@pytest.fixture(scope='module')
+def goals_tracker(tmp_path_factory):
+    """1,000 synthetic goals with six months of contributions each"""
+    from goals_tracker import SavingsGoalsTracker
+    db = BudgetDatabase(str(tmp_path_factory.mktemp('goals') / 'goals.db'))
+    tracker = SavingsGoalsTracker(db)
+    generator = SyntheticDataGenerator(n_users=800, seed=42)
+    goals = generator.generate_goals().drop(columns='user_id').head(1000)
+    conn = sqlite3.connect(db.db_path)
+    conn.executemany(f"INSERT INTO savings_goals ({', '.join(goals.columns)}) VALUES ({', '.join('?' * len(goals.columns))})",
+                     goals.itertuples(index=False, name=None))
+    conn.executemany('INSERT INTO goal_contributions (goal_id, amount, contributed_at) VALUES (?, ?, ?)',
+                     generator.generate_goal_contributions(goals).itertuples(index=False, name=None))
+    conn.commit()
+    conn.close()
+    return tracker
+
+def test_goal_view(benchmark, goals_tracker):
+    goals = benchmark(goals_tracker.get_goals_with_projections)
+    assert len(goals) == 1000
+
+def test_goal_progress_chart(benchmark, goals_tracker):
+    goals = goals_tracker.get_goals_with_projections()
+    fig = benchmark(goals_tracker.create_progress_chart, goals)
+    assert len(fig.data) == 1
+
+def test_check_and_award_achievements(benchmark, bench_db, transactions):
+    from achievements import AchievementSystem
+    achievement_system = AchievementSystem(bench_db)
+    
+    def reset_awards():
+        conn = sqlite3.connect(bench_db.db_path)
+        conn.execute("DELETE FROM user_achievements")
+        conn.commit()
+        conn.close()
+        AchievementSystem.invalidate_path(bench_db.db_path)
+        return (transactions.copy(),), {}
+    
+    awarded = benchmark.pedantic(achievement_system.check_and_award_achievements, setup=reset_awards, rounds=5)
+    assert 'first_transaction' in awarded
+
+# Calculators
+
+@pytest.mark.parametrize('years', [15, 30])
+def test_calculate_amortization(benchmark, years):
+    from calculators import FinancialCalculators
+    schedule = benchmark(FinancialCalculators().calculate_amortization, 300000, 0.065 / 12, years * 12)
+    assert len(schedule) == years * 12
+
+@pytest.mark.parametrize('n_debts', [2, 20])
+def test_simulate_debt_payoff(benchmark, n_debts):
+    from calculators import FinancialCalculators
+    calculators = FinancialCalculators()
+    debts = [{'name': f"Debt {i}", 'balance': 1000 + 250 * i, 'rate': 12 + i % 10, 'minimum': 40 + 5 * i}
+             for i in range(n_debts)]
+    
+    result = benchmark(lambda: calculators.simulate_debt_payoff([debt.copy() for debt in debts], 200))
+    assert result['months'] < 600
+
+if __name__ == '__main__':
+    # Save a JSON baseline for this run and fail if it regressed against the previous one
+    storage = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.benchmarks')
+    args = [__file__, '-q', '--benchmark-autosave', f"--benchmark-storage={storage}"]
+    if os.path.isdir(storage) and any(name.endswith('.json') for _, _, files in os.walk(storage) for name in files):
+        args += ['--benchmark-compare', f"--benchmark-compare-fail={COMPARE_FAIL}"]
+    print("⏱️ Running Budget Coach benchmarks...")
+    sys.exit(pytest.main(args + sys.argv[1:]))
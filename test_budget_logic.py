@@ -183,6 +183,1639 @@ class TestFinancialTips(unittest.TestCase):
         # At least one of these should be present in our sample
         self.assertTrue(has_emergency_fund or has_compound_interest or has_50_30_20)
 
+class TestBudgetClassifier(unittest.TestCase):
+    
+    def setUp(self):
+        from budget_classifier import BudgetClassifier
+        self.classifier = BudgetClassifier()
+        self.transactions = pd.DataFrame([
+            {'user_id': 1, 'date': '2024-01-15', 'amount': 3000, 'type': 'income', 'category': 'Salary'},
+            {'user_id': 1, 'date': '2024-01-16', 'amount': 1200, 'type': 'expense', 'category': 'Housing'},
+            {'user_id': 1, 'date': '2024-01-17', 'amount': 300, 'type': 'expense', 'category': 'Entertainment'},
+            {'user_id': 1, 'date': '2024-01-18', 'amount': 100, 'type': 'expense', 'category': 'Education'},
+            {'user_id': 1, 'date': '2024-02-15', 'amount': 2000, 'type': 'income', 'category': 'Salary'},
+            {'user_id': 2, 'date': '2024-01-05', 'amount': 500, 'type': 'expense', 'category': 'Shopping'},
+        ])
+    
+    def test_summarize_by_user_and_month(self):
+        """Test needs, wants and savings for several users and months at once"""
+        summary = self.classifier.summarize(self.transactions, by=['user_id', 'month'])
+        self.assertEqual(len(summary), 3)
+        
+        january = summary.loc[(1, '2024-01')]
+        self.assertEqual(january['needs'], 1200)
+        self.assertEqual(january['wants'], 300)
+        self.assertEqual(january['expenses'], 1600)  # unclassified Education still counts
+        self.assertEqual(january['savings'], 1400)
+        self.assertAlmostEqual(january['needs_ratio'], 0.4)
+        
+        # No income means ratios are undefined rather than infinite
+        self.assertTrue(pd.isna(summary.loc[(2, '2024-01')]['expense_ratio']))
+    
+    def test_summarize_month_filter_and_custom_buckets(self):
+        """Test restricting months and overriding category buckets"""
+        from budget_classifier import BudgetClassifier
+        classifier = BudgetClassifier({'Education': 'savings', 'Housing': 'needs'})
+        summary = classifier.summarize(self.transactions[self.transactions['user_id'] == 1], months='2024-01')
+        
+        self.assertEqual(list(summary.index), ['2024-01'])
+        self.assertEqual(summary.loc['2024-01', 'wants'], 0)
+        self.assertEqual(summary.loc['2024-01', 'savings'], 1500)
+    
+    def test_category_buckets_stored_in_database(self):
+        """Test default buckets are seeded and can be changed"""
+        db_path = tempfile.mktemp()
+        db = BudgetDatabase(db_path)
+        try:
+            buckets = db.get_category_buckets()
+            self.assertEqual(buckets['Housing'], 'needs')
+            self.assertEqual(buckets['Shopping'], 'wants')
+            self.assertNotIn('Salary', buckets)
+            
+            db.set_category_bucket('Education', 'savings')
+            self.assertEqual(db.get_category_buckets()['Education'], 'savings')
+            with self.assertRaises(ValueError):
+                db.set_category_bucket('Education', 'luxuries')
+        finally:
+            os.remove(db_path)
+    
+    def test_advisor_uses_classifier_for_month(self):
+        """Test analyze_budget reports the 50/30/20 split for an explicit month"""
+        analysis = FinancialAdvisor().analyze_budget(self.transactions[self.transactions['user_id'] == 1], month='2024-01')
+        self.assertEqual(analysis['status'], 'success')
+        self.assertEqual(analysis['needs_spending'], 1200)
+        self.assertEqual(analysis['wants_spending'], 300)
+        self.assertEqual(analysis['total_expenses'], 1600)
+
+class TestCategoryRegistry(unittest.TestCase):
+    
+    def setUp(self):
+        self.db_path = tempfile.mktemp()
+        self.db = BudgetDatabase(self.db_path)
+    
+    def tearDown(self):
+        os.remove(self.db_path)
+    
+    def test_lookups(self):
+        """Test names by type, color and bucket lookups"""
+        categories = self.db.categories
+        self.assertIn('Housing', categories.names('expense'))
+        self.assertNotIn('Salary', categories.names('expense'))
+        self.assertEqual(list(categories.names('income')), sorted(categories.names('income')))
+        self.assertEqual(categories.category_type('Salary'), 'income')
+        self.assertEqual(categories.color('Housing'), '#ff7f0e')
+        self.assertEqual(categories.bucket('Shopping'), 'wants')
+        self.assertIsNone(categories.bucket('Education'))
+        self.assertNotIn('Education', categories.buckets())
+        self.assertIn('Utilities', categories)
+    
+    def test_loaded_once_and_invalidated_on_write(self):
+        """Test the registry is shared per file and reloads after a category write"""
+        from category_registry import CategoryRegistry
+        registry = CategoryRegistry.get(self.db_path)
+        self.assertIs(registry, BudgetDatabase(self.db_path).categories)
+        self.assertIs(registry.snapshot(), registry.snapshot())
+        
+        self.db.set_category_bucket('Education', 'needs')
+        self.assertEqual(registry.bucket('Education'), 'needs')
+        self.assertEqual(self.db.get_category_buckets()['Education'], 'needs')
+
+class TestBatchBudgetAnalysis(unittest.TestCase):
+    
+    def setUp(self):
+        self.advisor = FinancialAdvisor()
+        self.transactions = pd.DataFrame([
+            {'user_id': 1, 'date': '2024-01-01', 'amount': 3000, 'type': 'income', 'category': 'Salary'},
+            {'user_id': 1, 'date': '2024-01-02', 'amount': 1200, 'type': 'expense', 'category': 'Housing'},
+            {'user_id': 1, 'date': '2024-01-03', 'amount': 300, 'type': 'expense', 'category': 'Shopping'},
+            {'user_id': 1, 'date': '2024-02-01', 'amount': 3000, 'type': 'income', 'category': 'Salary'},
+            {'user_id': 1, 'date': '2024-02-02', 'amount': 1200, 'type': 'expense', 'category': 'Housing'},
+            {'user_id': 1, 'date': '2024-02-03', 'amount': 1500, 'type': 'expense', 'category': 'Shopping'},
+            {'user_id': 2, 'date': '2024-01-10', 'amount': 80, 'type': 'expense', 'category': 'Entertainment'},
+        ])
+    
+    def test_batch_metrics_per_user_month(self):
+        """Test ratios and status codes for every (user, month) pair"""
+        batch = self.advisor.analyze_budget_batch(self.transactions)
+        self.assertEqual(list(batch.index), [(1, '2024-01'), (1, '2024-02'), (2, '2024-01')])
+        
+        january, february = batch.loc[(1, '2024-01')], batch.loc[(1, '2024-02')]
+        self.assertAlmostEqual(january['expense_ratio'], 0.5)
+        self.assertEqual(january['spending_level'], 'success')
+        self.assertEqual(january['top_category'], 'Housing')
+        self.assertEqual(february['spending_level'], 'warning')
+        self.assertEqual(february['rule_status'], 'reduce_wants')
+        self.assertAlmostEqual(february['expense_ratio_change'], 0.4)
+        
+        self.assertEqual(batch.loc[(2, '2024-01')]['status'], 'no_income')
+    
+    def test_batch_matches_single_month_analysis(self):
+        """Test that batch advice agrees with analyze_budget and adds trend advice"""
+        batch = self.advisor.analyze_budget_batch(self.transactions, include_advice=True)
+        single = self.advisor.analyze_budget(self.transactions[self.transactions['user_id'] == 1], month='2024-02')
+        
+        february_advice = batch.loc[(1, '2024-02'), 'advice']
+        self.assertEqual(february_advice[:len(single['advice'])], single['advice'])
+        self.assertEqual(february_advice[-1]['title'], 'Spending Trending Up')
+        self.assertEqual(batch.loc[(2, '2024-01'), 'advice'], [])
+    
+    def test_trend_follows_calendar_months(self):
+        """Test month-over-month changes for newest-first or shuffled rows and skipped months"""
+        march = pd.DataFrame([
+            {'user_id': 1, 'date': '2024-03-01', 'amount': 3000, 'type': 'income', 'category': 'Salary'},
+            {'user_id': 1, 'date': '2024-03-02', 'amount': 600, 'type': 'expense', 'category': 'Housing'},
+            {'user_id': 2, 'date': '2024-03-10', 'amount': 1000, 'type': 'income', 'category': 'Salary'},
+        ])
+        transactions = pd.concat([self.transactions, march], ignore_index=True)
+        for rows in (transactions.sort_values('date', ascending=False), transactions.sample(frac=1, random_state=3)):
+            batch = self.advisor.analyze_budget_batch(rows)
+            self.assertEqual(list(batch.index),
+                             [(1, '2024-01'), (1, '2024-02'), (1, '2024-03'), (2, '2024-01'), (2, '2024-03')])
+            changes = batch['expense_ratio_change']
+            self.assertTrue(pd.isna(changes[(1, '2024-01')]))
+            self.assertAlmostEqual(changes[(1, '2024-02')], 0.4)
+            self.assertAlmostEqual(changes[(1, '2024-03')], -0.7)
+            # February is missing for user 2, so March has nothing to compare with
+            self.assertTrue(pd.isna(changes[(2, '2024-03')]))
+        
+        batch = self.advisor.analyze_budget_batch(transactions.drop(columns='user_id').iloc[::-1])
+        self.assertEqual(list(batch.index), ['2024-01', '2024-02', '2024-03'])
+        self.assertTrue(pd.isna(batch['expense_ratio_change'].iloc[0]))
+    
+    def test_batch_without_user_column(self):
+        """Test that frames without user_id are grouped by month only"""
+        batch = self.advisor.analyze_budget_batch(self.transactions.drop(columns='user_id'))
+        self.assertEqual(list(batch.index), ['2024-01', '2024-02'])
+
+class TestChartDownsampling(unittest.TestCase):
+    
+    def setUp(self):
+        from visualizations import BudgetVisualizer
+        self.visualizer = BudgetVisualizer(max_points=200)
+        
+        # Ten years of daily income and expenses
+        dates = pd.date_range('2015-01-01', periods=3650, freq='D').strftime('%Y-%m-%d')
+        self.history = pd.DataFrame({
+            'date': list(dates) * 2,
+            'amount': [100.0] * 3650 + [40.0] * 3650,
+            'type': ['income'] * 3650 + ['expense'] * 3650,
+            'category': ['Salary'] * 3650 + ['Food & Dining'] * 3650
+        })
+    
+    def test_choose_resolution(self):
+        """Test that the bucket size grows with the visible range"""
+        start = pd.Timestamp('2024-01-01')
+        self.assertEqual(self.visualizer.choose_resolution(start, start + pd.Timedelta(days=30))[0], 'D')
+        self.assertEqual(self.visualizer.choose_resolution(start, start + pd.Timedelta(days=700))[0], 'W')
+        self.assertEqual(self.visualizer.choose_resolution(start, start + pd.Timedelta(days=3650))[0], 'M')
+    
+    def test_lttb_keeps_endpoints_and_budget(self):
+        """Test LTTB returns the requested number of ordered points including both ends"""
+        y = [0, 1, 0, 5, 0, 1, 0, 1, 9, 1]
+        keep = self.visualizer.lttb_downsample(range(10), y, 5)
+        self.assertEqual(len(keep), 5)
+        self.assertEqual(keep[0], 0)
+        self.assertEqual(keep[-1], 9)
+        self.assertTrue(all(a < b for a, b in zip(keep, keep[1:])))
+        self.assertIn(3, keep)  # the peak survives
+        self.assertIn(8, keep)
+    
+    def test_all_time_daily_chart_payload(self):
+        """Test that the all-time spending chart stays within the point budget"""
+        import time
+        
+        start = time.perf_counter()
+        fig = self.visualizer.create_daily_spending_bar(self.history, days=None)
+        elapsed = time.perf_counter() - start
+        
+        self.assertLessEqual(len(fig.data[0].x), 200)
+        self.assertEqual(sum(fig.data[0].y), 40.0 * 3650)
+        self.assertLess(len(fig.to_json()), 50000)
+        self.assertLess(elapsed, 2.0)
+    
+    def test_daily_chart_caps_monthly_buckets(self):
+        """Test that ranges with more months than the point budget are downsampled too"""
+        self.visualizer.max_points = 24
+        fig = self.visualizer.create_daily_spending_bar(self.history, days=None)
+        
+        x = list(fig.data[0].x)
+        self.assertEqual(len(x), 24)
+        self.assertEqual((str(x[0])[:7], str(x[-1])[:7]), ('2015-01', '2024-12'))
+    
+    def test_monthly_trend_payload(self):
+        """Test that long trend lines are downsampled to the point budget"""
+        self.visualizer.max_points = 50
+        fig = self.visualizer.create_monthly_trend(self.history)
+        
+        self.assertEqual(len(fig.data), 3)
+        for trace in fig.data:
+            self.assertLessEqual(len(trace.x), 50)
+        self.assertNotIn('year_month', self.history.columns)
+        self.assertLess(len(fig.to_json()), 30000)
+
+class TestTipsRepository(unittest.TestCase):
+    
+    def setUp(self):
+        from tips_repository import TipsRepository
+        self.tips_path = tempfile.mktemp(suffix='.json')
+        self.write_tips([
+            {'id': 1, 'title': 'Budget', 'content': 'Plan it', 'category': 'budgeting'},
+            {'id': 2, 'title': 'Save', 'content': 'Save it', 'category': 'savings', 'weight': 3},
+            {'id': 3, 'title': 'Invest', 'content': 'Grow it', 'category': 'investing'},
+            {'title': 'Broken tip'},
+        ])
+        self.repository = TipsRepository(self.tips_path)
+    
+    def tearDown(self):
+        if os.path.exists(self.tips_path):
+            os.remove(self.tips_path)
+    
+    def write_tips(self, tips):
+        import json
+        with open(self.tips_path, 'w') as f:
+            json.dump({'tips': tips}, f)
+    
+    def test_validation_and_indexes(self):
+        """Test invalid tips are dropped and tips are indexed by id and category"""
+        self.assertEqual(len(self.repository.tips), 3)
+        self.assertEqual(self.repository.get_tip(2)['title'], 'Save')
+        self.assertEqual(self.repository.categories(), ['budgeting', 'investing', 'savings'])
+        self.assertEqual(self.repository.choose('savings')['id'], 2)
+        self.assertIsNone(self.repository.choose('unknown'))
+    
+    def test_deck_does_not_repeat(self):
+        """Test a session deck shows every tip once before repeating"""
+        import random
+        deck = self.repository.new_deck(rng=random.Random(7))
+        first_round = [deck.next_tip()['id'] for _ in range(3)]
+        self.assertEqual(sorted(first_round), [1, 2, 3])
+        self.assertIn(deck.next_tip()['id'], [1, 2, 3])
+    
+    def test_hot_reload_on_mtime_change(self):
+        """Test the file is re-read only when its mtime changes"""
+        self.repository.RELOAD_CHECK_INTERVAL = 0
+        self.assertFalse(self.repository.refresh())
+        
+        self.write_tips([{'id': 9, 'title': 'New', 'content': 'Fresh', 'category': 'credit'}])
+        os.utime(self.tips_path, ns=(0, 10 ** 18))
+        self.assertTrue(self.repository.refresh())
+        self.assertEqual([tip['id'] for tip in self.repository.tips], [9])
+    
+    def test_shared_repository_per_path(self):
+        """Test advisors share one loaded repository"""
+        self.assertIs(FinancialAdvisor().tips_repository, FinancialAdvisor().tips_repository)
+
+class TestColdStartImports(unittest.TestCase):
+    """Import-time regression checks for the modules loaded before the login form"""
+    
+    # Modules that must stay off the login path; they are loaded per page in app.py
+    # (plotly.graph_objects is not listed because streamlit itself imports it)
+    DEFERRED_MODULES = ['pandas', 'numpy', 'plotly.express', 'plotly.subplots',
+                        'visualizations', 'calculators', 'goals_tracker', 'achievements', 'financial_advisor']
+    
+    # Budget for the login path on top of streamlit, as a share of streamlit's own import
+    # time in the same process, so a slow or busy machine slows both sides alike
+    LOGIN_IMPORT_BUDGET_RATIO = 0.25
+    
+    def import_times(self, module):
+        """Run `python -X importtime -c 'import <module>'` and return {name: cumulative_ms}"""
+        import subprocess
+        import sys
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        )
+        times = {}
+        for line in result.stderr.splitlines():
+            if line.startswith('import time:') and '|' in line:
+                _, cumulative, name = line[len('import time:'):].split('|')
+                if cumulative.strip().isdigit():
+                    times[name.strip()] = int(cumulative) / 1000
+        return times
+    
+    def test_login_path_defers_heavy_imports(self):
+        """Test that importing auth does not pull in pandas, plotly or feature modules"""
+        times = self.import_times('auth')
+        self.assertIn('auth', times)
+        for module in self.DEFERRED_MODULES:
+            self.assertNotIn(module, times, f"{module} is imported on the login path")
+    
+    def test_login_path_import_budget(self):
+        """Test the login path's own import cost stays small next to streamlit's"""
+        times = self.import_times('auth')
+        overhead = times['auth'] - times['streamlit']
+        self.assertLess(overhead, self.LOGIN_IMPORT_BUDGET_RATIO * times['streamlit'])
+
+class TestSyntheticData(unittest.TestCase):
+    
+    def setUp(self):
+        from synthetic_data import SyntheticDataGenerator
+        self.generator = SyntheticDataGenerator(n_users=12, years=1, seed=7, transactions_per_month=10, chunk_users=5)
+    
+    def test_generation_is_reproducible(self):
+        """Test the same seed gives identical transactions"""
+        from synthetic_data import SyntheticDataGenerator
+        again = SyntheticDataGenerator(n_users=12, years=1, seed=7, transactions_per_month=10, chunk_users=5)
+        first = pd.concat(self.generator.iter_transaction_chunks(), ignore_index=True)
+        second = pd.concat(again.iter_transaction_chunks(), ignore_index=True)
+        pd.testing.assert_frame_equal(first, second)
+    
+    def test_recurring_income_and_rent(self):
+        """Test every user gets a salary and rent payment each month"""
+        transactions = self.generator.generate_transactions()
+        salaries = transactions[transactions['description'] == 'Monthly Salary']
+        rent = transactions[transactions['category'] == 'Housing']
+        self.assertEqual(len(salaries), 12 * 12)
+        self.assertEqual(len(rent), 12 * 12)
+        self.assertEqual(sorted(transactions['user_id'].unique()), list(range(1, 13)))
+        self.assertTrue(transactions['date'].str.match(r'^2023-\d{2}-\d{2}$').all())
+    
+    def test_bulk_load(self):
+        """Test loading every generated table into a database"""
+        db_path = tempfile.mktemp()
+        try:
+            db = BudgetDatabase(db_path)
+            counts = self.generator.load(db, batch_size=100)
+            
+            transactions = db.get_transactions(user_id=3)
+            self.assertGreater(len(transactions), 24)
+            self.assertEqual(len(db.get_transactions()), counts['transactions'])
+            self.assertEqual(counts['users'], 12)
+            self.assertGreater(counts['goals'], 0)
+            self.assertEqual(len(db.get_budget_targets()), counts['budget_targets'])
+            
+            from goals_tracker import SavingsGoalsTracker
+            tracker = SavingsGoalsTracker(db)
+            saved = tracker.get_contributions().groupby('goal_id')['amount'].sum()
+            goals = tracker.get_goals().set_index('id')
+            self.assertTrue(((saved - goals.loc[saved.index, 'current_amount']).abs() < 0.01).all())
+        finally:
+            os.remove(db_path)
+    
+    def test_load_keeps_existing_budget_targets(self):
+        """Test loading into a database keeps its budget targets unless asked to replace them"""
+        db_path = tempfile.mktemp()
+        try:
+            db = BudgetDatabase(db_path)
+            db.set_budget_target('Housing', 1800)
+            db.set_budget_target('Pets', 75)
+            
+            counts = self.generator.load(db, batch_size=100)
+            targets = db.get_budget_targets().set_index('category')['monthly_target']
+            self.assertEqual((targets['Housing'], targets['Pets']), (1800, 75))
+            self.assertEqual(len(targets), counts['budget_targets'] + 2)
+            
+            self.generator.load(db, batch_size=100, replace_targets=True)
+            targets = db.get_budget_targets().set_index('category')['monthly_target']
+            self.assertNotEqual(targets['Housing'], 1800)
+            self.assertEqual(targets['Pets'], 75)
+            self.assertTrue(targets.index.is_unique)
+        finally:
+            os.remove(db_path)
+
+class TestLoadTest(unittest.TestCase):
+    
+    def test_database_path_from_environment(self):
+        """Test DATABASE_PATH is the default database file"""
+        db_path = tempfile.mktemp()
+        other_path = tempfile.mktemp()
+        os.environ['DATABASE_PATH'] = db_path
+        try:
+            self.assertEqual(BudgetDatabase().db_path, db_path)
+            self.assertEqual(BudgetDatabase(other_path).db_path, other_path)
+        finally:
+            del os.environ['DATABASE_PATH']
+            os.remove(db_path)
+            os.remove(other_path)
+    
+    def test_virtual_users_complete_flows(self):
+        """Test two concurrent virtual users log in, add transactions and browse every page"""
+        from load_test import LoadTest
+        load_test = LoadTest(users=2, iterations=1)
+        report = load_test.run()
+        
+        self.assertEqual(report['errors'], [])
+        self.assertEqual(set(report['latency_by_step_ms']),
+                         {'login_page', 'login', 'dashboard', 'add_transaction', 'submit_transaction', 'analytics', 'goals'})
+        self.assertGreater(report['sqlite']['writes'], 0)
+        # One transaction per virtual user plus one from the warm-up session
+        self.assertEqual(len(BudgetDatabase(load_test.db_path).get_transactions()), 3)
+
+class TestStickyProxy(unittest.TestCase):
+    
+    def setUp(self):
+        from serve import StickyProxy, WorkerSupervisor
+        self.supervisor = WorkerSupervisor(3, ports=[9001, 9002, 9003])
+        self.supervisor.healthy = [True, True, True]
+        self.proxy = StickyProxy(self.supervisor)
+    
+    def test_affinity_cookie_pins_worker(self):
+        """Test requests carrying the affinity cookie stay on their worker"""
+        head = b'GET /_stcore/stream HTTP/1.1\r\nHost: localhost\r\nCookie: theme=dark; budget_coach_worker=2\r\n\r\n'
+        self.assertEqual(self.proxy.choose_worker(head), (2, False))
+    
+    def test_new_browser_gets_least_loaded_worker(self):
+        """Test new browsers and browsers pinned to an unhealthy worker are reassigned"""
+        self.proxy.connections = [4, 1, 3]
+        self.assertEqual(self.proxy.choose_worker(b'GET / HTTP/1.1\r\nHost: localhost\r\n\r\n'), (1, True))
+        
+        self.supervisor.healthy[1] = False
+        head = b'GET / HTTP/1.1\r\nCookie: budget_coach_worker=1\r\n\r\n'
+        self.assertEqual(self.proxy.choose_worker(head), (2, True))
+    
+    def test_add_cookie(self):
+        """Test the affinity cookie is added to the response headers"""
+        response = self.proxy.add_cookie(b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n', 1)
+        self.assertTrue(response.endswith(b'Set-Cookie: budget_coach_worker=1; Path=/; HttpOnly; SameSite=Lax\r\n\r\n'))
+    
+    def test_enable_wal(self):
+        """Test the shared database is switched to write-ahead logging"""
+        db_path = tempfile.mktemp()
+        try:
+            self.assertEqual(BudgetDatabase(db_path).enable_wal(), 'wal')
+        finally:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+
+class TestConnectionPool(unittest.TestCase):
+    
+    def setUp(self):
+        from connection_pool import SQLiteConnectionPool
+        self.db_path = tempfile.mktemp()
+        self.pool = SQLiteConnectionPool(self.db_path)
+        self.pool.submit(lambda conn: conn.execute(
+            'CREATE TABLE transactions (id INTEGER PRIMARY KEY, session INTEGER, amount REAL)'
+        )).result()
+    
+    def tearDown(self):
+        self.pool.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+    
+    def test_concurrent_sessions(self):
+        """Test 50 concurrent sessions adding and reading transactions"""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        def session(session_id):
+            for i in range(20):
+                self.pool.write('INSERT INTO transactions (session, amount) VALUES (?, ?)', (session_id, i + 1))
+                # Each session reads back its own committed writes
+                rows = self.pool.read_sql('SELECT amount FROM transactions WHERE session = ?', (session_id,))
+                assert len(rows) == i + 1, f"session {session_id} saw {len(rows)} rows after {i + 1} writes"
+            return session_id
+        
+        with ThreadPoolExecutor(max_workers=50) as executor:
+            finished = list(executor.map(session, range(50)))
+        
+        self.assertEqual(finished, list(range(50)))
+        self.assertEqual(self.pool.fetchall('SELECT COUNT(*), SUM(amount) FROM transactions')[0], (1000, 50 * 210.0))
+    
+    def test_failed_write_does_not_affect_others(self):
+        """Test a failing write only fails its own caller"""
+        import sqlite3
+        good = self.pool.submit(lambda conn: conn.execute('INSERT INTO transactions (session, amount) VALUES (1, 5)'))
+        bad = self.pool.submit(lambda conn: conn.execute('INSERT INTO missing_table VALUES (1)'))
+        
+        self.assertIsNotNone(good.result())
+        with self.assertRaises(sqlite3.OperationalError):
+            bad.result()
+        self.assertEqual(self.pool.fetchall('SELECT COUNT(*) FROM transactions')[0][0], 1)
+    
+    def test_readers_are_read_only(self):
+        """Test pooled reader connections reject writes"""
+        import sqlite3
+        with self.assertRaises(sqlite3.OperationalError):
+            with self.pool.reader() as conn:
+                conn.execute('DELETE FROM transactions')
+    
+    def test_streamlit_app_uses_pool(self):
+        """Test the deployed entry point adds and lists transactions through the pool"""
+        import sqlite3
+        from streamlit.testing.v1 import AppTest
+        os.environ['DATABASE_PATH'] = self.db_path + '.app'
+        try:
+            at = AppTest.from_file('streamlit_app.py', default_timeout=30)
+            at.run()
+            at.text_input[0].input('tester@example.com')
+            at.button[0].click()
+            at.run()
+            
+            at.sidebar.selectbox[0].select("➕ Add Transaction")
+            at.run()
+            at.text_input[0].input('Groceries')
+            [button for button in at.button if button.label == "💾 Add Transaction"][0].click()
+            at.run()
+            
+            self.assertEqual(len(at.exception), 0)
+            conn = sqlite3.connect(self.db_path + '.app')
+            self.assertEqual(conn.execute('SELECT description FROM transactions').fetchall(), [('Groceries',)])
+            conn.close()
+        finally:
+            import streamlit as st
+            st.cache_resource.clear()
+            del os.environ['DATABASE_PATH']
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(self.db_path + '.app' + suffix):
+                    os.remove(self.db_path + '.app' + suffix)
+
+class TestAsyncBudgetDatabase(unittest.TestCase):
+    
+    def setUp(self):
+        from async_database import AsyncBudgetDatabase
+        self.db_path = tempfile.mktemp()
+        self.adb = AsyncBudgetDatabase(self.db_path, max_workers=2)
+    
+    def tearDown(self):
+        self.adb.close()
+        os.remove(self.db_path)
+    
+    def test_concurrent_requests(self):
+        """Test transactions, categories, targets, goals, achievements and users through the facade"""
+        import asyncio
+        
+        async def scenario():
+            await asyncio.gather(*[
+                self.adb.add_transaction('2024-01-0%d' % day, 'Coffee', 4.5, 'Food & Dining', 'expense')
+                for day in range(1, 6)
+            ])
+            await self.adb.set_budget_target('Food & Dining', 300)
+            await self.adb.add_goal('Trip', 1000, '2030-01-01')
+            user_id = await self.adb.create_user_with_password('async@example.com', 'Async', 'x' * 40)
+            
+            return await asyncio.gather(
+                self.adb.get_transactions(), self.adb.category_names('income'), self.adb.get_budget_targets(),
+                self.adb.get_goals(), self.adb.check_and_award_achievements(), self.adb.get_user_by_email('async@example.com')
+            ), user_id
+        
+        (transactions, income, targets, goals, awarded, user), user_id = asyncio.run(scenario())
+        self.assertEqual(len(transactions), 5)
+        self.assertIn('Salary', income)
+        self.assertEqual(targets[['category', 'monthly_target']].values.tolist(), [['Food & Dining', 300.0]])
+        self.assertEqual(goals['name'].tolist(), ['Trip'])
+        self.assertIn('first_transaction', awarded)
+        self.assertEqual(user['id'], user_id)
+    
+    def test_timeout_interrupts_query(self):
+        """Test a timed-out query is interrupted instead of occupying a worker thread"""
+        import asyncio
+        import time
+        
+        def slow_query():
+            conn = self.adb.db.connect()
+            try:
+                return conn.execute(
+                    'WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT COUNT(*) FROM n'
+                ).fetchone()
+            finally:
+                conn.close()
+        
+        async def scenario():
+            with self.assertRaises(asyncio.TimeoutError):
+                await self.adb.run(slow_query, timeout=0.2)
+            start = time.perf_counter()
+            # Both workers must be free again once the interrupted queries unwind
+            await asyncio.gather(self.adb.get_budget_targets(), self.adb.get_budget_targets())
+            return time.perf_counter() - start
+        
+        self.assertLess(asyncio.run(scenario()), 2.0)
+
+class TestBudgetAPI(unittest.TestCase):
+    
+    def setUp(self):
+        from api import BudgetAPI
+        self.db_path = tempfile.mktemp()
+        self.db = BudgetDatabase(self.db_path)
+        for day in range(1, 6):
+            self.db.add_transaction('2024-01-0%d' % day, 'Coffee', 4.5, 'Food & Dining', 'expense', user_id=1)
+        self.db.add_transaction('2024-01-01', 'Salary', 3000, 'Salary', 'income', user_id=1)
+        self.db.add_transaction('2024-01-02', 'Rent', 1200, 'Housing', 'expense', user_id=2)
+        self.tokens = {}
+        for user_id in (1, 2):
+            self.assertEqual(self.db.create_user_with_password(f'api{user_id}@example.com', 'API', 'x' * 64), user_id)
+            self.tokens[user_id] = self.db.session_tokens.issue(user_id)
+        self.api = BudgetAPI(self.db, max_workers=2)
+    
+    def tearDown(self):
+        self.api.close()
+        os.remove(self.db_path)
+    
+    def get(self, path, query='', etag=None, method='GET', user_id=1, token=None):
+        """Drive the ASGI application the way a server would, signed in as user_id"""
+        import asyncio
+        import json
+        
+        token = token or self.tokens.get(user_id)
+        headers = [(b'authorization', f'Bearer {token}'.encode())] if token else []
+        if etag:
+            headers.append((b'if-none-match', etag.encode()))
+        scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query.encode(),
+                 'headers': headers}
+        messages = []
+        
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+        
+        async def send(message):
+            messages.append(message)
+        
+        asyncio.run(self.api(scope, receive, send))
+        headers = {name.decode(): value.decode() for name, value in messages[0]['headers']}
+        body = messages[1]['body']
+        return messages[0]['status'], headers, json.loads(body) if body else None
+    
+    def test_paginated_transactions(self):
+        """Test pages of a user's transactions, newest first"""
+        status, _, body = self.get('/api/transactions', 'page=2&page_size=4')
+        self.assertEqual(status, 200)
+        self.assertEqual((body['total'], body['pages'], body['page']), (6, 2, 2))
+        self.assertEqual([item['date'] for item in body['items']], ['2024-01-01', '2024-01-01'])
+        
+        self.assertEqual(self.get('/api/transactions', 'page=0')[0], 400)
+        self.assertEqual(self.get('/api/transactions', method='POST')[0], 405)
+        self.assertEqual(self.get('/api/unknown')[0], 404)
+    
+    def test_rollups_and_analysis(self):
+        """Test monthly rollups and budget analysis come from the shared classifier and advisor"""
+        _, _, body = self.get('/api/rollups/monthly')
+        self.assertEqual(body['months'][0]['month'], '2024-01')
+        self.assertAlmostEqual(body['months'][0]['expenses'], 22.5)
+        
+        _, _, body = self.get('/api/analysis', 'month=2024-01')
+        self.assertEqual(body['status'], 'success')
+        self.assertEqual(body['total_income'], 3000)
+        self.assertEqual(self.get('/api/analysis', 'month=January')[0], 400)
+    
+    def test_etag_follows_user_data_version(self):
+        """Test unchanged data answers 304 and only writes the response depends on invalidate it"""
+        status, headers, _ = self.get('/api/transactions')
+        etag = headers['etag']
+        self.assertEqual(status, 200)
+        self.assertEqual(self.get('/api/transactions', etag=etag)[0], 304)
+        
+        # Another user's write leaves user 1's responses valid
+        self.db.add_transaction('2024-01-03', 'Bus', 2.5, 'Transportation', 'expense', user_id=2)
+        self.assertEqual(self.get('/api/transactions', etag=etag)[0], 304)
+        # ...and user 1's tag never matches another user's response
+        self.assertEqual(self.get('/api/transactions', etag=etag, user_id=2)[0], 200)
+        
+        self.db.add_transaction('2024-01-03', 'Bus', 2.5, 'Transportation', 'expense', user_id=1)
+        status, headers, body = self.get('/api/transactions', etag=etag)
+        self.assertEqual(status, 200)
+        self.assertNotEqual(headers['etag'], etag)
+        self.assertEqual(body['total'], 7)
+    
+    def test_etag_follows_bulk_frame_with_missing_user_ids(self):
+        """Test a DataFrame whose user_id column has gaps bumps the integer user scopes"""
+        import sqlite3
+        status, headers, _ = self.get('/api/transactions', user_id=2)
+        etag = headers['etag']
+        
+        frame = pd.DataFrame([
+            {'date': '2024-01-04', 'description': 'Gym', 'amount': 30.0, 'category': 'Healthcare', 'type': 'expense', 'user_id': 2},
+            {'date': '2024-01-04', 'description': 'Gift', 'amount': 20.0, 'category': 'Other', 'type': 'expense', 'user_id': None}
+        ])
+        self.assertEqual(frame['user_id'].dtype, float)
+        self.db.add_transactions(frame)
+        
+        status, headers, body = self.get('/api/transactions', etag=etag, user_id=2)
+        self.assertEqual(status, 200)
+        self.assertEqual(body['total'], 2)
+        conn = sqlite3.connect(self.db_path)
+        scopes = [scope for scope, in conn.execute('SELECT scope FROM data_versions')]
+        user_ids = conn.execute("SELECT typeof(user_id) FROM transactions WHERE description = 'Gym'").fetchone()
+        conn.close()
+        self.assertNotIn('user:2.0', scopes)
+        self.assertEqual(user_ids, ('integer',))
+    
+    def test_goals_and_achievements(self):
+        """Test goal and achievement endpoints and their invalidation"""
+        from goals_tracker import SavingsGoalsTracker
+        status, headers, body = self.get('/api/goals')
+        self.assertEqual((status, body['goals']), (200, []))
+        
+        SavingsGoalsTracker(self.db).add_goal('Trip', 1000, '2030-01-01')
+        status, _, body = self.get('/api/goals', etag=headers['etag'])
+        self.assertEqual(status, 200)
+        self.assertEqual(body['goals'][0]['name'], 'Trip')
+        
+        _, _, body = self.get('/api/achievements')
+        self.assertEqual(body['earned'], [])
+        self.assertEqual(body['total_points'], 0)
+    
+    def test_requires_session_token(self):
+        """Test data endpoints answer 401 without a valid token and serve the token's user only"""
+        status, headers, body = self.get('/api/transactions', user_id=None)
+        self.assertEqual(status, 401)
+        self.assertEqual(headers['www-authenticate'], 'Bearer')
+        self.assertEqual(self.get('/api/goals', user_id=None)[0], 401)
+        self.assertEqual(self.get('/api/transactions', token=self.tokens[1] + 'x')[0], 401)
+        self.assertEqual(self.get('/api/health', user_id=None)[0], 200)
+        
+        # A user_id in the query string does not reach another user's data
+        _, _, body = self.get('/api/transactions', 'user_id=1', user_id=2)
+        self.assertEqual([item['description'] for item in body['items']], ['Rent'])
+        
+        self.db.session_tokens.revoke(self.tokens[1])
+        self.assertEqual(self.get('/api/transactions')[0], 401)
+
+class TestAddTransactions(unittest.TestCase):
+    
+    def setUp(self):
+        self.db_path = tempfile.mktemp()
+        self.db = BudgetDatabase(self.db_path)
+    
+    def tearDown(self):
+        os.remove(self.db_path)
+    
+    def test_bulk_insert_returns_ids(self):
+        """Test tuples, dicts and DataFrames insert in one batch and return contiguous ids"""
+        first = self.db.add_transaction('2024-01-01', 'Coffee', 4.5, 'Food & Dining', 'expense')
+        ids = self.db.add_transactions([
+            ('2024-01-02', 'Salary', 3000, 'Salary', 'income', 1),
+            {'date': '2024-01-03', 'description': 'Bus', 'amount': 2.5, 'category': 'Transportation', 'type': 'expense'}
+        ])
+        frame = pd.DataFrame({
+            'date': pd.to_datetime(['2024-01-04', '2024-01-05']),
+            'description': ['Rent', 'Lunch'],
+            'amount': [1200.0, 12.0],
+            'category': ['Housing', 'Food & Dining'],
+            'type': ['expense', 'expense'],
+            'user_id': [2, None]
+        })
+        ids += self.db.add_transactions(frame)
+        
+        self.assertEqual(ids, list(range(first + 1, first + 5)))
+        df = self.db.get_transactions().set_index('id')
+        self.assertEqual(df.loc[ids[2], 'date'], '2024-01-04')
+        self.assertEqual(df.loc[ids[2], 'user_id'], 2)
+        self.assertTrue(pd.isna(df.loc[ids[3], 'user_id']))
+        self.assertEqual(self.db.add_transactions([]), [])
+    
+    def test_batch_is_atomic_and_versioned_once(self):
+        """Test a failing batch inserts nothing and a batch bumps each user's version once"""
+        with self.assertRaises(ValueError):
+            self.db.add_transactions(pd.DataFrame({'date': ['2024-01-01'], 'amount': [1.0]}))
+        with self.assertRaises(Exception):
+            self.db.add_transactions([('2024-01-01', 'ok', 1.0, 'Other', 'expense'),
+                                      ('2024-01-01', None, 1.0, 'Other', 'expense')])
+        self.assertTrue(self.db.get_transactions().empty)
+        
+        self.db.add_transactions([('2024-01-0%d' % day, 'Coffee', 4.5, 'Food & Dining', 'expense', 7)
+                                  for day in range(1, 8)])
+        self.assertEqual(self.db.get_data_versions(['all', 'user:7']), {'all': 1, 'user:7': 1})
+
+class TestSnapshotService(unittest.TestCase):
+    
+    def setUp(self):
+        from synthetic_data import SyntheticDataGenerator
+        self.workdir = tempfile.mkdtemp()
+        self.db = BudgetDatabase(os.path.join(self.workdir, 'live.db'))
+        self.db.enable_wal()
+        SyntheticDataGenerator(n_users=10, years=1, seed=1).load(self.db)
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.workdir)
+    
+    def test_retention_and_verified_restore(self):
+        """Test compressed snapshots are pruned and restore brings back the data and moves versions on"""
+        from backup import SnapshotService
+        service = SnapshotService(self.db, directory=os.path.join(self.workdir, 'snapshots'), keep=2, quiet=True)
+        for _ in range(3):
+            service.snapshot()
+        self.assertEqual(len(service.snapshots()), 2)
+        self.assertTrue(all(path.suffix == '.gz' for path in service.snapshots()))
+        
+        count = len(self.db.get_transactions())
+        versions_before = self.db.get_data_versions(['all'])
+        self.db.add_transactions([('2024-01-01', 'Extra', 1.0, 'Other', 'expense', 1)] * 5)
+        service.restore()
+        self.assertEqual(len(self.db.get_transactions()), count)
+        # Old ETags must not match the restored data
+        self.assertGreater(self.db.get_data_versions(['all'])['all'], versions_before['all'] + 1)
+        
+        corrupt = os.path.join(self.workdir, 'snapshots', 'budget_coach-corrupt.db')
+        with open(corrupt, 'wb') as f:
+            f.write(b'not a database' * 100)
+        with self.assertRaises(ValueError):
+            service.restore(corrupt)
+        self.assertEqual(len(self.db.get_transactions()), count)
+    
+    def test_restore_drops_cached_achievements_and_tokens(self):
+        """Test points and session tokens cached from the replaced data are forgotten on restore"""
+        from backup import SnapshotService
+        from achievements import AchievementSystem
+        service = SnapshotService(self.db, directory=os.path.join(self.workdir, 'snapshots'), quiet=True)
+        system = AchievementSystem(self.db, user_id=1)
+        points = system.get_total_points()
+        service.snapshot()
+        
+        system.award_achievement('streak_7')
+        token = self.db.session_tokens.issue(1)
+        self.assertIsNotNone(self.db.session_tokens.validate(token))
+        self.assertEqual(system.get_total_points(), points + 50)
+        
+        service.restore()
+        self.assertEqual(system.get_total_points(), points)
+        self.assertIsNone(self.db.session_tokens.validate(token))
+        self.assertIsNotNone(self.db.session_tokens.validate(self.db.session_tokens.issue(1)))
+    
+    def test_backup_does_not_stall_dashboard(self):
+        """Test a paced online backup leaves concurrent reads and writes at their normal latency"""
+        import statistics
+        import threading
+        import time
+        
+        def dashboard_request():
+            start = time.perf_counter()
+            self.db.add_transaction('2024-01-01', 'Coffee', 4.5, 'Food & Dining', 'expense', 1)
+            self.db.get_transactions(user_id=1)
+            return time.perf_counter() - start
+        
+        baseline = statistics.median(dashboard_request() for _ in range(20))
+        rows_before = len(self.db.get_transactions())
+        
+        snapshot_path = os.path.join(self.workdir, 'snapshot.db')
+        started, done = threading.Event(), threading.Event()
+        progress = lambda status, remaining, total: started.set()
+        backup = threading.Thread(target=lambda: (self.db.backup(snapshot_path, pages=2, sleep=0.005, progress=progress),
+                                                  done.set()))
+        backup.start()
+        started.wait()
+        during = []
+        while not done.is_set():
+            during.append(dashboard_request())
+        backup.join()
+        
+        self.assertGreaterEqual(len(during), 10)
+        self.assertLess(max(during), 0.5)
+        self.assertLess(statistics.median(during), max(3 * baseline, baseline + 0.02))
+        
+        # The snapshot is one consistent point in time despite the concurrent writes
+        from backup import SnapshotService
+        SnapshotService.verify(snapshot_path)
+        self.assertEqual(len(BudgetDatabase(snapshot_path).get_transactions()), rows_before)
+
+class TestMaintenanceScheduler(unittest.TestCase):
+    
+    def setUp(self):
+        self.db_path = tempfile.mktemp()
+        self.db = BudgetDatabase(self.db_path)
+        self.db.enable_wal()
+        self.db.add_transactions([('2024-01-%02d' % (i % 28 + 1), 'Coffee ' * 20, 4.5, 'Food & Dining', 'expense', i % 10)
+                                  for i in range(5000)])
+    
+    def tearDown(self):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+    
+    def test_reclaims_space_and_logs_runs(self):
+        """Test deleted pages are released, statistics gathered and each task timed in maintenance_log"""
+        from maintenance import MaintenanceScheduler
+        scheduler = MaintenanceScheduler(self.db, quiet=True)
+        conn = self.db.connect()
+        conn.execute('DELETE FROM transactions WHERE user_id > 0')
+        conn.commit()
+        conn.close()
+        
+        before = scheduler.storage_stats()
+        self.assertGreater(before['free_pages'], 0)
+        results = scheduler.run_once(force=True)
+        after = scheduler.storage_stats()
+        
+        self.assertEqual([row['task'] for row in results], list(scheduler.TASKS))
+        self.assertEqual(after['free_pages'], 0)
+        self.assertLess(after['page_count'], before['page_count'])
+        conn = self.db.connect()
+        self.assertIsNotNone(conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone())
+        conn.close()
+        self.assertEqual(scheduler.history()['task'].tolist(), list(scheduler.TASKS))
+    
+    def test_waits_for_idle_and_tolerates_traffic(self):
+        """Test maintenance only starts after a quiet period and never fails concurrent writes"""
+        import threading
+        import time
+        from maintenance import MaintenanceScheduler
+        scheduler = MaintenanceScheduler(self.db, idle_after=0.3, quiet=True)
+        self.assertIsNone(scheduler.run_once())
+        self.db.add_transaction('2024-02-01', 'Bus', 2.5, 'Transportation', 'expense', 1)
+        self.assertIsNone(scheduler.run_once())
+        
+        errors = []
+        stop = threading.Event()
+        
+        def writer():
+            while not stop.is_set():
+                try:
+                    self.db.add_transaction('2024-02-02', 'Bus', 2.5, 'Transportation', 'expense', 2)
+                    self.db.delete_transaction(self.db.add_transaction('2024-02-02', 'Tmp', 1.0, 'Other', 'expense', 2))
+                except Exception as e:
+                    errors.append(e)
+        
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            for _ in range(3):
+                scheduler.run_once(force=True)
+        finally:
+            stop.set()
+            thread.join()
+        self.assertEqual(errors, [])
+        
+        time.sleep(0.35)
+        scheduler.is_idle()
+        time.sleep(0.35)
+        self.assertIsNotNone(scheduler.run_once())
+    
+    def test_any_commit_counts_as_traffic(self):
+        """Test writes that leave the data version counters alone still postpone maintenance"""
+        import time
+        from maintenance import MaintenanceScheduler
+        scheduler = MaintenanceScheduler(self.db, idle_after=0.2, quiet=True)
+        scheduler.is_idle()
+        time.sleep(0.25)
+        self.assertTrue(scheduler.is_idle())
+        
+        session_id = self.db.start_user_session(1)
+        self.db.update_session_activity(session_id)
+        self.assertFalse(scheduler.is_idle())
+        time.sleep(0.25)
+        # Maintenance's own writes do not reset the quiet period
+        self.assertIsNotNone(scheduler.run_once())
+        self.assertTrue(scheduler.is_idle())
+        scheduler.stop()
+    
+    def test_first_analyze_is_bounded(self):
+        """Test analysis_limit is set before the first ANALYZE"""
+        import sqlite3
+        from maintenance import MaintenanceScheduler
+        statements = []
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn.set_trace_callback(statements.append)
+        self.assertEqual(MaintenanceScheduler(self.db, quiet=True).optimize(conn), 'analyzed')
+        conn.close()
+        self.assertLess(statements.index('PRAGMA analysis_limit = 1000'), statements.index('ANALYZE'))
+    
+    def test_legacy_database_needs_conversion(self):
+        """Test incremental vacuum is skipped until an old database is converted"""
+        import sqlite3
+        from maintenance import MaintenanceScheduler
+        legacy_path = tempfile.mktemp()
+        conn = sqlite3.connect(legacy_path)
+        conn.execute('CREATE TABLE legacy (x)')
+        conn.close()
+        
+        scheduler = MaintenanceScheduler(BudgetDatabase(legacy_path), quiet=True)
+        self.assertEqual(scheduler.storage_stats()['auto_vacuum'], 'none')
+        self.assertTrue(scheduler.run_once(force=True)[1]['result'].startswith('skipped'))
+        self.assertEqual(scheduler.enable_incremental_vacuum()['auto_vacuum'], 'incremental')
+        os.remove(legacy_path)
+
+class TestAnalyticsSnapshot(unittest.TestCase):
+    
+    def setUp(self):
+        from analytics_snapshot import PYARROW_AVAILABLE
+        if not PYARROW_AVAILABLE:
+            self.skipTest("pyarrow is not installed")
+        self.workdir = tempfile.mkdtemp()
+        self.db = BudgetDatabase(os.path.join(self.workdir, 'live.db'))
+        self.db.add_transactions(
+            [('2024-01-%02d' % day, 'Salary', 3000.0, 'Salary', 'income', user_id) for day, user_id in ((1, 1), (1, 2))]
+            + [('2024-01-%02d' % day, 'Coffee', 5.0, 'Food & Dining', 'expense', day % 2 + 1) for day in range(2, 12)]
+            + [('2024-02-03', 'Rent', 1200.0, 'Housing', 'expense', 1)]
+        )
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.workdir)
+    
+    def test_incremental_export(self):
+        """Test only months whose rows changed are rewritten, and emptied months are dropped"""
+        from analytics_snapshot import AnalyticsSnapshot
+        snapshot = AnalyticsSnapshot(self.db, os.path.join(self.workdir, 'analytics'))
+        self.assertEqual(snapshot.export()['exported'], ['2024-01', '2024-02'])
+        self.assertEqual(snapshot.export()['exported'], [])
+        
+        self.db.add_transaction('2024-02-10', 'Bus', 2.5, 'Transportation', 'expense', 2)
+        stats = snapshot.export()
+        self.assertEqual((stats['exported'], stats['unchanged'], stats['rows']), (['2024-02'], 1, 2))
+        
+        for transaction_id in self.db.get_transactions('2024-02-01', '2024-02-28')['id']:
+            self.db.delete_transaction(int(transaction_id))
+        self.assertEqual(snapshot.export()['removed'], ['2024-02'])
+        self.assertFalse((snapshot.dataset_dir / 'month=2024-02').exists())
+    
+    def test_reports_match_live_database(self):
+        """Test snapshot reports agree with SQLite and month filters prune partitions"""
+        from analytics_snapshot import AnalyticsSnapshot
+        from analytics_queries import AnalyticsQueries
+        directory = os.path.join(self.workdir, 'analytics')
+        AnalyticsSnapshot(self.db, directory).export()
+        queries = AnalyticsQueries(directory)
+        
+        totals = queries.monthly_totals().set_index('month')
+        self.assertEqual(totals.loc['2024-01', 'income'], 6000.0)
+        self.assertEqual(totals.loc['2024-01', 'expenses'], 50.0)
+        self.assertEqual(totals.loc['2024-02', 'active_users'], 1)
+        self.assertEqual(queries.category_totals()['category'].tolist(), ['Housing', 'Food & Dining'])
+        
+        live = self.db.get_transactions('2024-01-01', '2024-01-31', user_id=2)
+        rows = queries.transactions(start_month='2024-01', end_month='2024-01', user_ids=[2])
+        self.assertEqual(sorted(rows['id']), sorted(live['id']))
+        
+        month_filter = queries.build_filter(start_month='2024-02', end_month='2024-02')
+        self.assertEqual(len(list(queries.dataset().get_fragments(filter=month_filter))), 1)
+        
+        retention = queries.cohort_retention()
+        self.assertEqual(retention.loc['2024-01', 0], 1.0)
+        self.assertEqual(retention.loc['2024-01', 1], 0.5)
+
+class TestAdminMetrics(unittest.TestCase):
+    
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.db = BudgetDatabase(os.path.join(self.workdir, 'admin.db'))
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.workdir)
+    
+    def counters(self):
+        conn = self.db.connect()
+        rows = conn.execute('SELECT name, value FROM admin_counters WHERE value != 0').fetchall()
+        conn.close()
+        return dict(rows)
+    
+    def test_counters_follow_writes(self):
+        """Test logins, sessions and page views update the statistics without recounting"""
+        alice = self.db.create_user('alice@example.com', 'Alice')
+        bob = self.db.create_user('bob@example.com', 'Bob')
+        session_id = self.db.start_user_session(alice)
+        self.db.start_user_session(alice)
+        self.db.start_user_session(bob)
+        for _ in range(6):
+            self.db.update_session_activity(session_id)
+        self.db.update_user_login(alice)
+        
+        stats = self.db.get_user_stats()
+        self.assertEqual((stats['total_users'], stats['total_sessions'], stats['active_users']), (2, 3, 2))
+        # Both users were active today, and repeat activity is only counted once
+        self.assertEqual((stats['dau'], stats['wau'], stats['mau'], stats['sessions_today']), (2, 2, 2, 3))
+        
+        histograms = self.db.admin_metrics.session_histograms()
+        self.assertEqual(sum(histograms['by_hour']), 3)
+        self.assertEqual(histograms['pages_per_session'], {'0': 2, '1': 0, '2-4': 0, '5-9': 1, '10-19': 0, '20+': 0})
+        
+        series = self.db.admin_metrics.activity_series('day', 7)
+        self.assertEqual(len(series), 7)
+        self.assertEqual(series.iloc[-1][['active_users', 'sessions', 'new_users']].tolist(), [2, 3, 2])
+    
+    def test_backfill_matches_triggers(self):
+        """Test recounting from the tables gives the counters the triggers maintained"""
+        conn = self.db.connect()
+        conn.executemany('INSERT INTO users (email, last_login) VALUES (?, ?)',
+                         [(f'user{i}@example.com', f'2024-0{i % 3 + 1}-1{i} 08:00:00') for i in range(6)])
+        conn.executemany('INSERT INTO user_sessions (user_id, session_start, pages_visited) VALUES (?, ?, ?)',
+                         [(i % 6 + 1, f'2024-03-{i % 28 + 1:02d} {i % 24:02d}:30:00', i) for i in range(40)])
+        conn.commit()
+        conn.close()
+        
+        from datetime import datetime
+        maintained = self.counters()
+        self.db.admin_metrics.rebuild()
+        self.assertEqual(self.counters(), maintained)
+        self.assertEqual(self.db.admin_metrics.active_users('month', datetime(2024, 3, 15)), 6)
+        self.assertEqual(self.db.admin_metrics.active_users('day', datetime(2024, 1, 10)), 1)
+        
+        # Deleted sessions leave the totals and histograms, but past activity stays counted
+        conn = self.db.connect()
+        conn.execute('DELETE FROM user_sessions WHERE id = 5')
+        conn.commit()
+        conn.close()
+        maintained = {name: value for name, value in self.counters().items() if not name.startswith('active:')}
+        self.db.admin_metrics.rebuild()
+        recounted = {name: value for name, value in self.counters().items() if not name.startswith('active:')}
+        self.assertEqual(maintained, recounted)
+        self.assertEqual(maintained['sessions'], 39)
+    
+    def test_existing_database_is_backfilled(self):
+        """Test a database created before the counters existed gets them on open"""
+        from admin_metrics import AdminMetrics
+        conn = self.db.connect()
+        for trigger in AdminMetrics.TRIGGERS:
+            conn.execute(f'DROP TRIGGER {trigger}')
+        conn.execute('DROP TABLE admin_counters')
+        conn.execute('DROP TABLE user_activity')
+        conn.execute("INSERT INTO users (email) VALUES ('old@example.com')")
+        conn.commit()
+        conn.close()
+        
+        self.assertEqual(BudgetDatabase(self.db.db_path).get_user_stats()['total_users'], 1)
+    
+    def test_recent_active_users_by_last_active_day(self):
+        """Test the rolling 30-day count follows each user's latest activity, counted once"""
+        from datetime import datetime, timedelta, timezone
+        now = datetime.now(timezone.utc)
+        
+        def days_ago(days):
+            return (now - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+        
+        conn = self.db.connect()
+        conn.executemany('INSERT INTO users (email, last_login) VALUES (?, ?)',
+                         [('recent@example.com', days_ago(3)), ('lapsed@example.com', days_ago(45)),
+                          ('returning@example.com', days_ago(60))])
+        # Sessions arrive out of order; an older one must not move a user's last day back
+        conn.executemany('INSERT INTO user_sessions (user_id, session_start) VALUES (?, ?)',
+                         [(1, days_ago(1)), (1, days_ago(20)), (3, days_ago(10)), (3, days_ago(40))])
+        conn.commit()
+        conn.close()
+        
+        self.assertEqual(self.db.get_user_stats()['active_users'], 2)
+        self.assertEqual(self.db.admin_metrics.recent_active_users(5), 1)
+        maintained = self.counters()
+        self.db.admin_metrics.rebuild()
+        self.assertEqual(self.counters(), maintained)
+        
+        # Databases whose counters predate user_last_active get it filled on open
+        conn = self.db.connect()
+        conn.execute('DROP TRIGGER admin_last_active')
+        conn.execute('DROP TABLE user_last_active')
+        conn.execute("DELETE FROM admin_counters WHERE name LIKE 'last_active:%'")
+        conn.commit()
+        conn.close()
+        self.assertEqual(BudgetDatabase(self.db.db_path).get_user_stats()['active_users'], 2)
+
+class TestGoalProjections(unittest.TestCase):
+    
+    def setUp(self):
+        from goals_tracker import SavingsGoalsTracker
+        self.test_db_path = tempfile.mktemp()
+        self.db = BudgetDatabase(self.test_db_path)
+        self.tracker = SavingsGoalsTracker(self.db)
+    
+    def tearDown(self):
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+    
+    def add_goal(self, name, target_amount, target_date, contributions):
+        self.tracker.add_goal(name, target_amount, target_date)
+        goal_id = int(self.tracker.get_goals().query('name == @name')['id'].iloc[0])
+        conn = self.db.connect()
+        conn.executemany('INSERT INTO goal_contributions (goal_id, amount, contributed_at) VALUES (?, ?, ?)',
+                         [(goal_id, amount, day) for day, amount in contributions])
+        conn.execute('UPDATE savings_goals SET current_amount = ? WHERE id = ?',
+                     (sum(amount for _, amount in contributions), goal_id))
+        conn.commit()
+        conn.close()
+        return goal_id
+    
+    def test_progress_updates_are_recorded(self):
+        """Test update_goal_progress writes the ledger and delete_goal clears it"""
+        self.tracker.add_goal('Trip', 1000, '2030-01-01')
+        goal_id = int(self.tracker.get_goals()['id'].iloc[0])
+        self.tracker.update_goal_progress(goal_id, 25)
+        self.tracker.update_goal_progress(goal_id, 50)
+        self.tracker.update_goal_progress(goal_id + 1, 10)
+        self.assertEqual(self.tracker.get_contributions(goal_id)['amount'].tolist(), [25.0, 50.0])
+        
+        self.tracker.delete_goal(goal_id)
+        self.assertTrue(self.tracker.get_contributions().empty)
+    
+    def test_batched_contributions_are_idempotent(self):
+        """Test repeated keys apply once, deleted goals are skipped and is_completed follows the balance"""
+        self.tracker.add_goal('Trip', 100, '2030-01-01')
+        self.tracker.add_goal('Bike', 500, '2030-01-01')
+        trip, bike = self.tracker.get_goals().sort_values('id')['id'].tolist()
+        
+        applied = self.tracker.add_contributions([
+            (trip, 60, 'click-1'), (trip, 60, 'click-1'), {'goal_id': bike, 'amount': 50},
+            (trip, 40, 'click-2'), (bike + 100, 10, 'click-3')
+        ])
+        self.assertEqual(applied, 3)
+        self.assertEqual(self.tracker.update_goal_progress(trip, 60, idempotency_key='click-2'), 0)
+        
+        goals = self.tracker.get_goals().set_index('id')
+        self.assertEqual(goals.loc[trip, 'current_amount'], 100)
+        self.assertTrue(goals.loc[trip, 'is_completed'])
+        self.assertEqual(goals.loc[bike, 'current_amount'], 50)
+        self.assertFalse(goals.loc[bike, 'is_completed'])
+        
+        # A withdrawal reopens the goal
+        self.tracker.update_goal_progress(trip, -10)
+        self.assertFalse(self.tracker.get_goals().set_index('id').loc[trip, 'is_completed'])
+    
+    def test_concurrent_retries_apply_once(self):
+        """Test the same keys submitted from many threads at once are applied exactly once"""
+        import threading
+        self.tracker.add_goal('Trip', 10000, '2030-01-01')
+        goal_id = int(self.tracker.get_goals()['id'].iloc[0])
+        batch = [(goal_id, 10, f'session-{i}') for i in range(20)]
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.tracker.add_contributions(batch)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(sorted(results), [0] * 7 + [20])
+        self.assertEqual(self.tracker.get_goals()['current_amount'].iloc[0], 200)
+        self.assertEqual(len(self.tracker.get_contributions(goal_id)), 20)
+    
+    def test_projections(self):
+        """Test velocity, ETA, required rate and status for every goal in one pass"""
+        on_track = self.add_goal('Laptop', 1200, '2024-12-31',
+                                 [('2024-04-01', 300), ('2024-05-01', 300), ('2024-06-01', 300)])
+        behind = self.add_goal('Car', 10000, '2024-09-30', [('2024-05-15', 200), ('2024-06-15', 200)])
+        stalled = self.add_goal('Trip', 2000, '2025-06-30', [('2023-01-01', 500)])
+        self.add_goal('Rainy Day', 500, None, [])
+        
+        goals = self.tracker.get_goals_with_projections(as_of='2024-06-30').set_index('id')
+        self.assertEqual(goals.loc[on_track, 'status'], 'on_track')
+        self.assertAlmostEqual(goals.loc[on_track, 'monthly_velocity'], 900 / 90 * 30.44)
+        # $300 left at $10 a day
+        self.assertEqual(goals.loc[on_track, 'eta_date'], pd.Timestamp('2024-07-30'))
+        
+        # First contribution 46 days ago: $400 over 46 days
+        self.assertEqual(goals.loc[behind, 'status'], 'behind')
+        self.assertAlmostEqual(goals.loc[behind, 'monthly_velocity'], 400 / 46 * 30.44)
+        self.assertAlmostEqual(goals.loc[behind, 'required_monthly'], 9600 / (92 / 30.44))
+        
+        self.assertEqual(goals.loc[stalled, 'status'], 'stalled')
+        self.assertTrue(pd.isna(goals.loc[stalled, 'eta_date']))
+        self.assertEqual(goals.set_index('name').loc['Rainy Day', 'status'], 'no_deadline')
+    
+    def test_goal_view_and_chart(self):
+        """Test view columns match the per-goal helpers and the chart is a single trace"""
+        from datetime import date, timedelta
+        for offset in (-5, 0, 1, 40):
+            self.tracker.add_goal(f'Goal {offset}', 100, (date.today() + timedelta(days=offset)).strftime('%Y-%m-%d'))
+        self.tracker.add_goal('Goal 40', 300, None)
+        self.tracker.update_goal_progress(5, 150)
+        
+        goals = self.tracker.get_goals_with_projections()
+        self.assertEqual(goals['days_left'].tolist(),
+                         [self.tracker.calculate_days_left(target_date) for target_date in goals['target_date']])
+        self.assertEqual(goals.set_index('id').loc[5, 'progress_bar'], 0.5)
+        
+        fig = self.tracker.create_progress_chart(goals)
+        self.assertEqual(len(fig.data), 1)
+        self.assertEqual(len(fig.data[0].x), 5)
+        self.assertEqual(list(fig.layout.xaxis.ticktext).count('🎯 Goal 40'), 2)
+
+class TestAchievementRules(unittest.TestCase):
+    
+    def setUp(self):
+        from achievements import AchievementSystem
+        self.test_db_path = tempfile.mktemp()
+        self.db = BudgetDatabase(self.test_db_path)
+        self.system = AchievementSystem(self.db)
+    
+    def tearDown(self):
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+    
+    def transactions(self):
+        rows = []
+        for month in ('2024-01', '2024-02'):
+            rows += [(f'{month}-01', 'Salary', 4000.0, 'Salary', 'income'),
+                     (f'{month}-02', 'Rent', 1500.0, 'Housing', 'expense'),
+                     (f'{month}-10', 'Cinema', 200.0, 'Entertainment', 'expense')]
+        rows += [('2023-12-20', 'Bonus', 1000.0, 'Salary', 'income'),
+                 ('2024-01-05', 'Coffee Shop', 80.0, 'Food & Dining', 'expense'),
+                 ('2024-02-05', 'coffee beans', 30.0, 'Food & Dining', 'expense')]
+        return pd.DataFrame(rows, columns=['date', 'description', 'amount', 'category', 'type'])
+    
+    def test_every_rule_is_evaluated(self):
+        """Test budgeting, coffee and goal achievements are awarded from their declared rules"""
+        from goals_tracker import SavingsGoalsTracker
+        self.db.set_budget_target('Housing', 1500)
+        tracker = SavingsGoalsTracker(self.db)
+        tracker.add_goal('Trip', 100, '2030-01-01')
+        tracker.update_goal_progress(1, 100)
+        
+        awarded = self.system.check_and_award_achievements(self.transactions())
+        self.assertTrue({'first_transaction', 'first_week', 'first_month', 'first_100', 'first_1000',
+                         'emergency_fund', 'budget_follower', 'fifty_thirty_twenty', 'coffee_conscious',
+                         'goal_crusher'} <= set(awarded))
+        self.assertNotIn('transaction_50', awarded)
+        self.assertEqual(self.system.check_and_award_achievements(self.transactions()), [])
+        self.assertTrue(all('rule' in achievement for achievement in self.system.achievements_catalog.values()))
+    
+    def test_current_month_is_not_a_completed_month(self):
+        """Test coffee, budget and 50/30/20 rules ignore the month still in progress"""
+        self.db.set_budget_target('Housing', 1500)
+        rows = pd.DataFrame([
+            ('2024-09-01', 'Salary', 4000.0, 'Salary', 'income'),
+            ('2024-09-03', 'Coffee Shop', 60.0, 'Food & Dining', 'expense'),
+            ('2024-09-05', 'Rent', 2500.0, 'Housing', 'expense'),
+            ('2024-10-01', 'Salary', 4000.0, 'Salary', 'income'),
+            ('2024-10-01', 'Rent', 1200.0, 'Housing', 'expense')
+        ], columns=['date', 'description', 'amount', 'category', 'type'])
+        monthly_rules = {'coffee_conscious', 'budget_follower', 'fifty_thirty_twenty'}
+        
+        # On October 2nd only September is complete, and it earns none of them
+        self.assertFalse(monthly_rules & set(self.system.evaluate(rows, today='2024-10-02')))
+        # Once October is over it counts: no coffee, rent within target and on 50/30/20
+        self.assertEqual(monthly_rules & set(self.system.evaluate(rows, today='2024-11-01')), monthly_rules)
+    
+    def test_metrics_are_shared_and_skipped_once_earned(self):
+        """Test each metric is computed once per evaluation and not at all when its rules are earned"""
+        from unittest import mock
+        calls = []
+        original = self.system.metric_monthly_totals
+        
+        def counted(metrics):
+            calls.append(1)
+            return original(metrics)
+        
+        with mock.patch.object(self.system, 'metric_monthly_totals', counted):
+            self.system.evaluate(self.transactions())
+            self.assertEqual(len(calls), 1)
+            
+            earned = [aid for aid, rule in self.system.rules.items()
+                      if {'total_savings', 'emergency_fund_months', 'fifty_thirty_twenty_months'} & set(rule.metrics)]
+            self.system.evaluate(self.transactions(), earned)
+            self.assertEqual(len(calls), 1)
+    
+    def test_earned_cache(self):
+        """Test earned achievements and points are served from the cache and kept current by awards"""
+        from unittest import mock
+        from achievements import AchievementSystem
+        self.system.award_achievement('first_transaction')
+        self.assertEqual(self.system.get_user_level(), (AchievementSystem.LEVELS[0], 10))
+        
+        # A new instance (as on every app rerun) shares the cached entry
+        other = AchievementSystem(self.db)
+        with mock.patch.object(self.db, 'connect', wraps=self.db.connect) as connect:
+            self.assertEqual(other.get_earned_achievements(), ['first_transaction'])
+            self.system.get_user_level()
+            self.assertEqual(connect.call_count, 0)
+            
+            self.system.award_achievement('first_1000')
+            self.assertEqual(connect.call_count, 1)
+        self.assertEqual(other.get_user_level(), (AchievementSystem.LEVELS[1], 210))
+        
+        # Awards are per user
+        user_system = AchievementSystem(self.db, user_id=7)
+        self.assertEqual(user_system.get_earned_achievements(), [])
+        user_system.award_achievement('streak_7')
+        self.assertEqual(user_system.get_total_points(), 50)
+        self.assertEqual(self.system.get_total_points(), 210)
+        
+        # Rows written by another process show up once the entry expires
+        conn = self.db.connect()
+        conn.execute("INSERT INTO user_achievements (achievement_id, user_id) VALUES ('streak_30', 7)")
+        conn.commit()
+        conn.close()
+        self.assertEqual(user_system.get_total_points(), 50)
+        with mock.patch.object(AchievementSystem, 'MAX_AGE', 0):
+            self.assertEqual(user_system.get_total_points(), 350)
+    
+    def test_award_is_recorded_once(self):
+        """Test awards report whether they were new and duplicates from before the index are removed"""
+        from achievements import AchievementSystem
+        self.assertTrue(self.system.award_achievement('first_transaction'))
+        self.assertFalse(self.system.award_achievement('first_transaction'))
+        self.assertEqual(self.system.award_achievements(['first_transaction', 'streak_7']), ['streak_7'])
+        self.assertEqual(self.system.get_total_points(), 60)
+        
+        conn = self.db.connect()
+        conn.execute('DROP INDEX idx_user_achievements_unique')
+        conn.executemany("INSERT INTO user_achievements (achievement_id, user_id) VALUES (?, ?)",
+                         [('streak_7', None), ('streak_7', 3), ('streak_7', 3)])
+        conn.commit()
+        conn.close()
+        AchievementSystem(self.db)
+        conn = self.db.connect()
+        rows = conn.execute(
+            'SELECT user_id, achievement_id FROM user_achievements ORDER BY id').fetchall()
+        conn.close()
+        self.assertEqual(rows, [(None, 'first_transaction'), (None, 'streak_7'), (3, 'streak_7')])
+    
+    def test_concurrent_awards(self):
+        """Test many threads awarding the same achievements record and report each one once"""
+        import threading
+        from achievements import AchievementSystem
+        AchievementSystem.invalidate_path(self.test_db_path)
+        achievement_ids = ['first_transaction', 'streak_7', 'streak_30', 'first_1000']
+        barrier = threading.Barrier(8)
+        awarded = []
+        errors = []
+        
+        def award(user_id):
+            try:
+                system = AchievementSystem(self.db, user_id=user_id)
+                barrier.wait()
+                for _ in range(5):
+                    awarded.extend((user_id, aid) for aid in system.award_achievements(achievement_ids))
+            except Exception as exc:
+                errors.append(exc)
+        
+        threads = [threading.Thread(target=award, args=(i % 2 + 1,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(awarded), sorted((user_id, aid) for user_id in (1, 2) for aid in achievement_ids))
+        conn = self.db.connect()
+        count = conn.execute('SELECT COUNT(*) FROM user_achievements').fetchone()[0]
+        conn.close()
+        self.assertEqual(count, 8)
+        for user_id in (1, 2):
+            system = AchievementSystem(self.db, user_id=user_id)
+            self.assertEqual(system.reload()['points'], sum(map(system.points_for, achievement_ids)))
+    
+    def test_compile_rule(self):
+        """Test single and combined conditions"""
+        rule = self.system.compile_rule([('streak', '>=', 7), ('transaction_count', '<', 100)])
+        self.assertEqual(rule.metrics, ('streak', 'transaction_count'))
+        self.assertTrue(rule({'streak': 7, 'transaction_count': 10}))
+        self.assertFalse(rule({'streak': 7, 'transaction_count': 100}))
+    
+    def test_streak(self):
+        """Test the streak counts back from today and stops at the first gap"""
+        from datetime import date, timedelta
+        from achievements import AchievementMetrics
+        days = [date.today() - timedelta(days=offset) for offset in (0, 1, 1, 2, 4)]
+        df = pd.DataFrame({'date': [day.strftime('%Y-%m-%d') for day in days], 'amount': 1.0,
+                           'type': 'expense', 'description': 'x', 'category': 'Other'})
+        self.assertEqual(self.system.calculate_streak(df), 3)
+        self.assertEqual(self.system.calculate_streak(df.iloc[1:]), 0)
+        
+        # Evaluated as of another day, the streak counts back from that day
+        yesterday = pd.Timestamp(date.today() - timedelta(days=1))
+        self.assertEqual(AchievementMetrics(self.system, df, today=yesterday)['streak'], 2)
+        self.assertEqual(AchievementMetrics(self.system, df, today=yesterday + pd.Timedelta(days=3))['streak'], 0)
+
+class TestSessionTokens(unittest.TestCase):
+    
+    def setUp(self):
+        self.test_db_path = tempfile.mktemp()
+        self.db = BudgetDatabase(self.test_db_path)
+        self.user_id = self.db.create_user_with_password('token@example.com', 'Token Tester', 'x' * 64)
+        self.tokens = self.db.session_tokens
+    
+    def tearDown(self):
+        from session_tokens import SessionTokenStore
+        SessionTokenStore.invalidate_path(self.test_db_path)
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+    
+    def test_issue_and_validate(self):
+        """Test issued tokens validate from memory and forged or expired ones are rejected"""
+        from unittest import mock
+        token = self.tokens.issue(self.user_id)
+        user = self.tokens.validate(token)
+        self.assertEqual((user['id'], user['email'], user['name']), (self.user_id, 'token@example.com', 'Token Tester'))
+        
+        with mock.patch.object(self.db, 'connect', wraps=self.db.connect) as connect:
+            self.assertEqual(self.tokens.validate(token), user)
+            user_id, expires_at, token_id, signature = token.split('.')
+            self.assertIsNone(self.tokens.validate(f'{user_id}.{int(expires_at) + 3600}.{token_id}.{signature}'))
+            self.assertIsNone(self.tokens.validate(f'{user_id + "0"}.{expires_at}.{token_id}.{signature}'))
+            self.assertIsNone(self.tokens.validate('not-a-token'))
+            self.assertIsNone(self.tokens.validate(None))
+            # Forged tokens are rejected without I/O while the key was read recently...
+            self.assertEqual(connect.call_count, 0)
+            # ...and prompt at most one re-read of the key per interval after that
+            self.tokens._key_read_at -= self.tokens.KEY_REFRESH_INTERVAL
+            for _ in range(100):
+                self.assertIsNone(self.tokens.validate(f'{user_id}.{expires_at}.{token_id}.forged'))
+            self.assertEqual(connect.call_count, 1)
+        
+        self.assertIsNone(self.tokens.validate(self.tokens.issue(self.user_id, ttl=-1)))
+    
+    def test_revocation(self):
+        """Test single, per-user and global revocation, including from another process's store"""
+        from session_tokens import SessionTokenStore
+        first, second = self.tokens.issue(self.user_id), self.tokens.issue(self.user_id)
+        other_id = self.db.create_user_with_password('other@example.com', 'Other', 'x' * 64)
+        other = self.tokens.issue(other_id)
+        for token in (first, second, other):
+            self.assertIsNotNone(self.tokens.validate(token))
+        
+        self.assertTrue(self.tokens.revoke(first))
+        self.assertFalse(self.tokens.revoke(first))
+        self.assertIsNone(self.tokens.validate(first))
+        self.assertEqual(self.tokens.revoke_user(self.user_id), 1)
+        self.assertIsNone(self.tokens.validate(second))
+        self.assertIsNotNone(self.tokens.validate(other))
+        
+        # A store in another worker sees the revocation once its cached answer expires
+        worker_store = SessionTokenStore(BudgetDatabase(self.test_db_path))
+        self.assertIsNotNone(worker_store.validate(other))
+        self.tokens.revoke(other)
+        self.assertIsNotNone(worker_store.validate(other))
+        worker_store.MAX_AGE = 0
+        self.assertIsNone(worker_store.validate(other))
+        
+        # and picks up the signing key that replaced the old one once KEY_REFRESH_INTERVAL has passed
+        older = self.tokens.issue(other_id)
+        self.assertIsNotNone(worker_store.validate(older))
+        self.assertEqual(self.tokens.revoke_all(), 1)
+        self.assertIsNone(self.tokens.validate(older))
+        fresh = self.tokens.issue(other_id)
+        self.assertIsNone(worker_store.validate(fresh))
+        worker_store._key_read_at -= worker_store.KEY_REFRESH_INTERVAL
+        self.assertIsNotNone(worker_store.validate(fresh))
+        self.assertIsNone(worker_store.validate(older))
+    
+    def test_issue_uses_key_replaced_by_another_process(self):
+        """Test tokens issued after another worker's revoke_all validate in every worker"""
+        from session_tokens import SessionTokenStore
+        worker_store = SessionTokenStore(BudgetDatabase(self.test_db_path))
+        self.assertIsNotNone(worker_store.validate(self.tokens.issue(self.user_id)))
+        
+        worker_store.revoke_all()
+        token = self.tokens.issue(self.user_id)
+        self.assertIsNotNone(worker_store.validate(token))
+        self.assertIsNotNone(self.tokens.validate(token))
+    
+    def test_rotate_is_single_use(self):
+        """Test a rotated token is replaced by a working one and cannot be used again"""
+        import time
+        token = self.tokens.issue(self.user_id)
+        user, rotated = self.tokens.rotate(token)
+        self.assertEqual(user['id'], self.user_id)
+        self.assertNotEqual(rotated, token)
+        self.assertIsNone(self.tokens.validate(token))
+        self.assertEqual(self.tokens.rotate(token), (None, None))
+        self.assertIsNotNone(self.tokens.validate(rotated))
+        self.assertLessEqual(int(rotated.split('.')[1]), time.time() + self.tokens.TTL)
+    
+    def test_expired_tokens_purged_by_maintenance(self):
+        """Test expired tokens are deleted in bulk by the maintenance scheduler"""
+        from maintenance import MaintenanceScheduler
+        for _ in range(3):
+            self.tokens.issue(self.user_id, ttl=-1)
+        live = self.tokens.issue(self.user_id)
+        
+        results = MaintenanceScheduler(self.db, quiet=True).run_once(force=True)
+        self.assertEqual(results[-1]['result'], 'deleted 3 tokens')
+        self.assertEqual(self.tokens.purge_expired(), 0)
+        self.assertIsNotNone(self.tokens.validate(live))
+    
+    def test_app_resumes_session_from_cookie(self):
+        """Test a reconnecting browser is signed in from its session cookie without the password check"""
+        import json
+        from unittest import mock
+        from streamlit.testing.v1 import AppTest
+        from auth import AuthManager, TOKEN_COOKIE
+        password = 'secret123'
+        self.db.create_user_with_password('resume@example.com', 'Resumer', AuthManager.hash_password(password))
+        
+        def cookie_written(at):
+            # What the session cookie component was told to store in the browser
+            data = json.loads(at.get('bidi_component')[0].proto.json)
+            self.assertEqual(data['name'], TOKEN_COOKIE)
+            return data['token']
+        
+        def reconnect(cookie):
+            at = AppTest.from_file('app.py', default_timeout=30)
+            with mock.patch.object(AuthManager, '_cookie_token', return_value=cookie):
+                at.run()
+            return at
+        
+        os.environ['DATABASE_PATH'] = self.test_db_path
+        try:
+            at = AppTest.from_file('app.py', default_timeout=30)
+            at.run()
+            self.assertIsNone(cookie_written(at))
+            at.text_input(key='login_email').input('resume@example.com')
+            at.text_input(key='login_password').input(password)
+            [button for button in at.button if button.label == "🚀 Sign In"][0].click()
+            at.run()
+            token = cookie_written(at)
+            self.assertIsNotNone(token)
+            self.assertEqual(dict(at.query_params), {})
+            
+            with mock.patch.object(AuthManager, 'verify_password', side_effect=AssertionError), \
+                 mock.patch.object(BudgetDatabase, 'get_user_by_email', side_effect=AssertionError):
+                reconnected = reconnect(token)
+            self.assertEqual(len(reconnected.exception), 0)
+            self.assertTrue(reconnected.session_state['authenticated'])
+            self.assertEqual(reconnected.session_state['user_email'], 'resume@example.com')
+            rotated = cookie_written(reconnected)
+            self.assertNotEqual(rotated, token)
+            self.assertEqual(dict(reconnected.query_params), {})
+            
+            # The used cookie no longer signs in and is cleared; the rotated one works until revoked
+            for used, signs_in in ((token, False), (rotated, True), (rotated, False)):
+                again = reconnect(used)
+                self.assertEqual('authenticated' in again.session_state, signs_in)
+                if not signs_in:
+                    self.assertIsNone(cookie_written(again))
+        finally:
+            import streamlit as st
+            st.cache_resource.clear()
+            del os.environ['DATABASE_PATH']
+
 if __name__ == '__main__':
     print("🧪 Running Budget Coach Unit Tests...")
     unittest.main() 
\ No newline at end of file
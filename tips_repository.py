@@ -0,0 +1,170 @@
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_TIPS_PATH = Path(__file__).with_name('tips.json')
+
+class TipDeck:
+    """Weighted, non-repeating order of tip ids for one session"""
+    
+    def __init__(self, repository, category=None, rng=None):
+        self.repository = repository
+        self.category = category
+        self.rng = rng or random.Random()
+        self.order = []
+        self.position = 0
+    
+    def shuffle(self):
+        """Weighted random permutation (Efraimidis-Spirakis keys u ** (1 / weight))"""
+        tips = self.repository.tips_for(self.category)
+        keyed = [(self.rng.random() ** (1.0 / tip['weight']), tip['id']) for tip in tips]
+        keyed.sort(reverse=True)
+        self.order = [tip_id for _, tip_id in keyed]
+        self.position = 0
+    
+    def next_tip(self):
+        """Next tip in the deck, reshuffling once every tip has been shown"""
+        for _ in range(2):
+            while self.position < len(self.order):
+                tip = self.repository.get_tip(self.order[self.position])
+                self.position += 1
+                # Tips removed by a hot reload are skipped
+                if tip is not None:
+                    return tip
+            self.shuffle()
+        return None
+
+class TipsRepository:
+    """Tips loaded and validated once per process, indexed by id and category"""
+    
+    _instances = {}
+    _instances_lock = threading.Lock()
+    
+    # How often (seconds) to stat the file for changes
+    RELOAD_CHECK_INTERVAL = 2.0
+    
+    def __init__(self, path=DEFAULT_TIPS_PATH, fallback_tips=None):
+        self.path = Path(path)
+        self.fallback_tips = fallback_tips or []
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self._load()
+    
+    @classmethod
+    def get(cls, path=DEFAULT_TIPS_PATH, fallback_tips=None):
+        """Shared repository for a tips file"""
+        key = str(Path(path).resolve())
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(path, fallback_tips)
+            return cls._instances[key]
+    
+    def validate(self, raw_tips):
+        """Keep well-formed tips and fill in defaults for optional fields"""
+        tips = []
+        seen_ids = set()
+        
+        for index, tip in enumerate(raw_tips):
+            if not isinstance(tip, dict) or not isinstance(tip.get('title'), str) or not isinstance(tip.get('content'), str):
+                print(f"Skipping invalid tip at position {index}")
+                continue
+            
+            tip_id = tip.get('id', index + 1)
+            weight = tip.get('weight', 1)
+            if tip_id in seen_ids or not isinstance(weight, (int, float)) or weight <= 0:
+                print(f"Skipping tip {tip_id!r}: duplicate id or invalid weight")
+                continue
+            
+            seen_ids.add(tip_id)
+            tips.append({**tip, 'id': tip_id, 'category': tip.get('category', 'general'), 'weight': weight})
+        
+        return tips
+    
+    def _load(self):
+        """Read, validate and index the tips file (or the fallback tips)"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path, 'r') as f:
+                tips = self.validate(json.load(f).get('tips', []))
+        except FileNotFoundError:
+            mtime, tips = None, []
+        except Exception as e:
+            print(f"Error loading tips from JSON: {e}")
+            mtime, tips = None, []
+        
+        if not tips:
+            tips = self.validate(self.fallback_tips)
+        
+        by_category = {}
+        for tip in tips:
+            by_category.setdefault(tip['category'], []).append(tip)
+        
+        self.tips = tuple(tips)
+        self.by_id = {tip['id']: tip for tip in tips}
+        self.by_category = {category: tuple(items) for category, items in by_category.items()}
+        # (tips, cumulative weights) per category, None for all tips
+        self._weighted = {category: (items, self._cumulative_weights(items))
+                          for category, items in [(None, self.tips)] + list(self.by_category.items())}
+        self._mtime = mtime
+    
+    @staticmethod
+    def _cumulative_weights(tips):
+        total = 0
+        cum_weights = []
+        for tip in tips:
+            total += tip['weight']
+            cum_weights.append(total)
+        return cum_weights
+    
+    def refresh(self):
+        """Reload the file if its mtime changed (checked at most every RELOAD_CHECK_INTERVAL)"""
+        now = time.monotonic()
+        if now - self._checked_at < self.RELOAD_CHECK_INTERVAL:
+            return False
+        
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                mtime = None
+            
+            if mtime == self._mtime:
+                return False
+            
+            self._load()
+            return True
+    
+    def get_tip(self, tip_id):
+        """Tip by id, or None"""
+        self.refresh()
+        return self.by_id.get(tip_id)
+    
+    def categories(self):
+        """Sorted list of tip categories"""
+        self.refresh()
+        return sorted(self.by_category)
+    
+    def tips_for(self, category=None):
+        """All tips, or the tips of one category"""
+        self.refresh()
+        if category is None:
+            return self.tips
+        return self.by_category.get(category, ())
+    
+    def choose(self, category=None, rng=random):
+        """Weighted random tip, optionally from a single category"""
+        self.refresh()
+        tips, cum_weights = self._weighted.get(category, ((), []))
+        if not tips:
+            return None
+        
+        return rng.choices(tips, cum_weights=cum_weights)[0]
+    
+    def new_deck(self, category=None, rng=None):
+        """Non-repeating deck for one session"""
+        return TipDeck(self, category, rng)
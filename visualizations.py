@@ -1,16 +1,72 @@
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
 class BudgetVisualizer:
-    def __init__(self):
+    # Bucket sizes tried in order when fitting a date range into the point budget
+    RESOLUTIONS = [('D', 'Daily', 1), ('W', 'Weekly', 7), ('M', 'Monthly', 31)]
+    
+    def __init__(self, max_points=400):
         self.color_palette = {
             'income': '#2E8B57',
             'expense': '#DC143C',
             'savings': '#4169E1'
         }
+        # Upper bound on points per trace sent to the browser
+        self.max_points = max_points
+    
+    def choose_resolution(self, start_date, end_date, max_points=None):
+        """Pick the finest bucket (daily, weekly, monthly) that fits the point budget.
+        
+        Monthly is returned when nothing fits, so callers still downsample ranges
+        longer than max_points months.
+        """
+        max_points = max_points or self.max_points
+        span_days = max((end_date - start_date).days + 1, 1)
+        
+        for freq, label, bucket_days in self.RESOLUTIONS:
+            if span_days / bucket_days <= max_points:
+                return freq, label
+        return self.RESOLUTIONS[-1][:2]
+    
+    def lttb_downsample(self, x, y, threshold):
+        """Return indices of the points kept by Largest-Triangle-Three-Buckets downsampling"""
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        n = len(y)
+        
+        if threshold >= n or threshold < 3:
+            return np.arange(n)
+        
+        # Bucket edges for the n - 2 interior points, first and last are always kept
+        edges = np.floor(np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(int) + 1
+        edges[-1] = n - 1
+        
+        selected = np.empty(threshold, dtype=int)
+        selected[0] = 0
+        selected[-1] = n - 1
+        
+        a = 0
+        for i in range(threshold - 2):
+            start, end = edges[i], edges[i + 1]
+            
+            # Average of the next bucket (or the last point for the final bucket)
+            next_start = end
+            next_end = edges[i + 2] if i + 2 < len(edges) else n
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+            
+            areas = np.abs(
+                (x[a] - avg_x) * (y[start:end] - y[a]) -
+                (x[a] - x[start:end]) * (avg_y - y[a])
+            )
+            a = start + int(areas.argmax())
+            selected[i + 1] = a
+        
+        return selected
     
     def create_spending_by_category_pie(self, transactions_df):
         """Create a pie chart showing spending by category"""
@@ -46,48 +102,41 @@ class BudgetVisualizer:
             return None
         
         # Extract year-month from date
-        transactions_df['year_month'] = pd.to_datetime(transactions_df['date']).dt.to_period('M')
+        year_month = pd.to_datetime(transactions_df['date']).dt.to_period('M')
         
-        # Group by month and type
-        monthly_data = (transactions_df.groupby(['year_month', 'type'])['amount']
-                       .sum().reset_index())
+        # Group by month and type, then pivot to get income and expense columns
+        monthly_pivot = (transactions_df.groupby([year_month, 'type'])['amount']
+                        .sum().unstack('type', fill_value=0).sort_index())
         
-        # Pivot to get income and expense columns
-        monthly_pivot = monthly_data.pivot(index='year_month', columns='type', values='amount').fillna(0)
-        monthly_pivot = monthly_pivot.reset_index()
-        monthly_pivot['year_month'] = monthly_pivot['year_month'].astype(str)
+        if 'income' in monthly_pivot.columns and 'expense' in monthly_pivot.columns:
+            monthly_pivot['savings'] = monthly_pivot['income'] - monthly_pivot['expense']
         
-        fig = go.Figure()
+        # Month ordinals give LTTB an evenly spaced numeric x axis
+        month_ordinals = monthly_pivot.index.asi8
+        month_labels = monthly_pivot.index.astype(str)
         
-        if 'income' in monthly_pivot.columns:
-            fig.add_trace(go.Scatter(
-                x=monthly_pivot['year_month'],
-                y=monthly_pivot['income'],
-                mode='lines+markers',
-                name='Income',
-                line=dict(color=self.color_palette['income'], width=3),
-                marker=dict(size=8)
-            ))
+        series = [
+            ('income', 'Income', dict(color=self.color_palette['income'], width=3)),
+            ('expense', 'Expenses', dict(color=self.color_palette['expense'], width=3)),
+            # Add savings line (income - expenses)
+            ('savings', 'Net Savings', dict(color=self.color_palette['savings'], width=3, dash='dash'))
+        ]
         
-        if 'expense' in monthly_pivot.columns:
-            fig.add_trace(go.Scatter(
-                x=monthly_pivot['year_month'],
-                y=monthly_pivot['expense'],
-                mode='lines+markers',
-                name='Expenses',
-                line=dict(color=self.color_palette['expense'], width=3),
-                marker=dict(size=8)
-            ))
+        fig = go.Figure()
         
-        # Add savings line (income - expenses)
-        if 'income' in monthly_pivot.columns and 'expense' in monthly_pivot.columns:
-            monthly_pivot['savings'] = monthly_pivot['income'] - monthly_pivot['expense']
+        for column, name, line in series:
+            if column not in monthly_pivot.columns:
+                continue
+            
+            values = monthly_pivot[column].to_numpy()
+            keep = self.lttb_downsample(month_ordinals, values, self.max_points)
+            
             fig.add_trace(go.Scatter(
-                x=monthly_pivot['year_month'],
-                y=monthly_pivot['savings'],
+                x=month_labels[keep],
+                y=values[keep],
                 mode='lines+markers',
-                name='Net Savings',
-                line=dict(color=self.color_palette['savings'], width=3, dash='dash'),
+                name=name,
+                line=line,
                 marker=dict(size=8)
             ))
         
@@ -102,33 +151,47 @@ class BudgetVisualizer:
         return fig
     
     def create_daily_spending_bar(self, transactions_df, days=30):
-        """Create a bar chart showing daily spending for the last N days"""
+        """Create a bar chart showing spending for the last N days (or the whole frame if days is None)"""
         if transactions_df.empty:
             return None
         
+        dates = pd.to_datetime(transactions_df['date'])
         end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
         
-        # Filter for recent expenses
-        recent_data = transactions_df[
-            (pd.to_datetime(transactions_df['date']) >= start_date) &
-            (transactions_df['type'] == 'expense')
-        ].copy()
+        # Filter for expenses in the visible range
+        mask = transactions_df['type'] == 'expense'
+        if days is not None:
+            start_date = end_date - timedelta(days=days)
+            mask &= dates >= start_date
         
-        if recent_data.empty:
+        if not mask.any():
             return None
         
-        # Group by date
-        daily_spending = (recent_data.groupby('date')['amount']
-                         .sum().reset_index())
-        daily_spending['date'] = pd.to_datetime(daily_spending['date'])
-        daily_spending = daily_spending.sort_values('date')
+        if days is None:
+            start_date = dates[mask].min()
+            end_date = max(dates[mask].max(), start_date)
+        
+        # Coarsen the buckets until the range fits the point budget
+        freq, resolution = self.choose_resolution(start_date, end_date)
+        buckets = dates[mask].dt.to_period(freq).dt.start_time
+        
+        spending = (transactions_df.loc[mask, 'amount']
+                    .groupby(buckets).sum()
+                    .rename_axis('date').reset_index()
+                    .sort_values('date'))
+        
+        # Ranges longer than max_points months keep the most telling months
+        if len(spending) > self.max_points:
+            keep = self.lttb_downsample(spending['date'].astype('int64'), spending['amount'], self.max_points)
+            spending = spending.iloc[keep]
+        
+        range_label = f"Last {days} Days" if days is not None else "Selected Period"
         
         fig = px.bar(
-            daily_spending,
+            spending,
             x='date',
             y='amount',
-            title=f'Daily Spending (Last {days} Days)',
+            title=f'{resolution} Spending ({range_label})',
             labels={'amount': 'Amount ($)', 'date': 'Date'}
         )
         